@@ -0,0 +1,13 @@
+"""Offline performance harnesses for the PDF generators.
+
+Run them from the project directory (next to manage.py), e.g.::
+
+    python -m benchmarks.letterhead --pages 25
+"""
+import os
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ifex.settings')
+    import django
+    django.setup()
@@ -0,0 +1,84 @@
+"""Throughput of the bulk invoice ZIP export by worker count.
+
+    python -m benchmarks.bulk_export --count 1000 --workers 1,2,4,8
+
+Renders ``--count`` synthetic invoices through the same pool task and
+streaming ZIP writer the export view uses, bypassing the PDF cache.
+
+Throughput can only grow with workers up to the number of CPU cores, which
+the first line of the output reports; rows with more workers than cores are
+marked. The results at 1, 2, 4 and 8 cores have NOT been measured: so far
+this has only been run on a single-core machine, where throughput is flat
+across pool sizes. That shows the pool and the streaming ZIP work and cost
+little, not that the export scales. Run it on a machine with at least 8
+cores to get those numbers before sizing PDF_EXPORT_WORKERS.
+"""
+import argparse
+import os
+import time
+
+from benchmarks import setup_django
+
+
+def run(invoice_data, workers):
+    from stats.bulk_export import stream_zip
+    from stats.pdf_workers import make_executor, render_invoice
+
+    executor = make_executor(workers)
+    try:
+        # Start every worker (spawn + django.setup) before timing
+        list(executor.map(render_invoice, [invoice_data[0]] * workers))
+
+        def members():
+            window = 2 * workers
+            futures = []
+            for i, data in enumerate(invoice_data):
+                futures.append((i, executor.submit(render_invoice, data)))
+                if len(futures) >= window:
+                    i, future = futures.pop(0)
+                    yield f"Invoice_{i}.pdf", future.result()
+            for i, future in futures:
+                yield f"Invoice_{i}.pdf", future.result()
+
+        start = time.perf_counter()
+        first_byte = None
+        size = 0
+        for chunk in stream_zip(members()):
+            if first_byte is None and chunk:
+                first_byte = time.perf_counter() - start
+            size += len(chunk)
+        elapsed = time.perf_counter() - start
+    finally:
+        executor.shutdown()
+    return elapsed, first_byte, size
+
+
+def oversubscribed(workers):
+    return "  (more workers than cores)" if workers > (os.cpu_count() or 1) else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=5, help="line items per invoice")
+    parser.add_argument('--workers', default='1,2,4,8')
+    args = parser.parse_args()
+
+    setup_django()
+    from benchmarks.fixtures import make_invoice
+    from stats.invoice_pdf import build_invoice_data
+
+    invoice, items = make_invoice(args.items)
+    data = build_invoice_data(invoice, items, invoice.customer)
+    invoice_data = [dict(data, invoice_number=f"INV{i}") for i in range(args.count)]
+
+    print(f"{args.count} invoices, {args.items} items each, {os.cpu_count()} CPU cores available")
+    print(f"{'workers':>7} {'seconds':>9} {'invoices/s':>11} {'first byte':>11} {'zip MB':>8}")
+    for workers in [int(w) for w in args.workers.split(',')]:
+        elapsed, first_byte, size = run(invoice_data, workers)
+        print(f"{workers:>7} {elapsed:>9.2f} {args.count / elapsed:>11.1f} "
+              f"{first_byte:>10.3f}s {size / 1e6:>8.1f}{oversubscribed(workers)}")
+
+
+if __name__ == '__main__':
+    main()
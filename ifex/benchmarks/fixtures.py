@@ -0,0 +1,78 @@
+"""Synthetic, unsaved model instances for driving the renderers without a database."""
+import datetime
+
+from django.utils import timezone
+
+from stats.models import Customer, Quotation, QuotationItem, Invoice, InvoiceItem
+
+
+DESCRIPTIONS = [
+    "Business Card Printing",
+    "Roll-up banner 85x200cm with premium aluminium stand and carry bag",
+    "A4 flyers, 170gsm gloss, double sided full colour, folded to DL size "
+    "and shrink-wrapped in bundles of 100 for distribution",
+]
+
+
+def make_customer():
+    return Customer(
+        id=1,
+        name="Alfan Emirates LLC",
+        address="Office 12, Al Quoz Industrial Area 3, Dubai",
+        city="Dubai",
+        phone="055 000 0000",
+    )
+
+
+def make_quotation(item_count, description_length=None):
+    customer = make_customer()
+    quotation = Quotation(
+        id=1,
+        quotation_number="IF2001",
+        customer=customer,
+        expected_delivery_date=datetime.date(2025, 6, 13),
+        payment_term="COD",
+        tax=5.0,
+    )
+    quotation.created_at = timezone.now()
+    items = [
+        QuotationItem(
+            quotation=quotation,
+            item_name=_description(i, description_length),
+            quantity=100 + i,
+            price=1.25,
+        )
+        for i in range(item_count)
+    ]
+    quotation.total_price = sum(item.total() for item in items)
+    quotation.grand_total = quotation.total_price * (1 + quotation.tax / 100)
+    return quotation, items
+
+
+def make_invoice(item_count, description_length=None):
+    customer = make_customer()
+    invoice = Invoice(
+        id=1,
+        invoice_number="INV2001",
+        customer=customer,
+        invoice_date=datetime.date(2025, 5, 26),
+        tax=5.0,
+    )
+    items = [
+        InvoiceItem(
+            invoice=invoice,
+            item_name=_description(i, description_length),
+            quantity=100 + i,
+            price=1.25,
+        )
+        for i in range(item_count)
+    ]
+    invoice.total_amount = sum(item.total() for item in items)
+    invoice.grand_total = invoice.total_amount * (1 + invoice.tax / 100)
+    return invoice, items
+
+
+def _description(i, length):
+    if length is None:
+        return DESCRIPTIONS[i % len(DESCRIPTIONS)]
+    return ("Printed item %d " % i + "lorem ipsum dolor sit amet " * (length // 27 + 1))[:length]
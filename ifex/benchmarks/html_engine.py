@@ -0,0 +1,63 @@
+"""ReportLab versus the WeasyPrint (HTML/CSS) quotation, by item count.
+
+    python -m benchmarks.html_engine --items 10,100,1000
+
+"first render" is a one-item quotation rendered before anything else: for
+WeasyPrint that includes parsing the stylesheet, loading the fonts and
+decoding the logos, which html_pdf keeps for the renders after it. The
+table then shows the best of --repeat renders at each size, which is what a
+running server pays per request.
+"""
+import argparse
+import io
+import time
+
+from benchmarks import setup_django
+
+
+def timed(fn):
+    buf = io.BytesIO()
+    start = time.perf_counter()
+    fn(buf)
+    return time.perf_counter() - start, len(buf.getvalue())
+
+
+def best_of(fn, repeat):
+    return min(timed(fn) for _ in range(repeat))
+
+
+def engines(quotation, items):
+    from stats import html_pdf
+    from stats.utils import QUOTATION_TEMPLATE
+
+    return [
+        ('reportlab', lambda f: QUOTATION_TEMPLATE.render(f, quotation, items)),
+        ('weasyprint', lambda f: html_pdf.render_quotation_html(f, quotation, items)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', default='10,100,1000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from benchmarks.fixtures import make_quotation
+    from stats import html_pdf
+
+    if not html_pdf.available():
+        raise SystemExit("WeasyPrint (and the Pango library it needs) is not installed")
+
+    for name, fn in engines(*make_quotation(1)):
+        print(f"first render, {name}: {timed(fn)[0] * 1000:.0f} ms")
+
+    print(f"{'items':>6} {'engine':>10} {'ms':>9} {'KB':>8}")
+    for count in [int(n) for n in args.items.split(',')]:
+        for name, fn in engines(*make_quotation(count)):
+            elapsed, size = best_of(fn, args.repeat)
+            print(f"{count:>6} {name:>10} {elapsed * 1000:>9.0f} {size / 1024:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
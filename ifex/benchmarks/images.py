@@ -0,0 +1,99 @@
+"""Bytes and time saved per document by preparing the PDF images for print.
+
+Renders the tax invoice and the quotation twice: as before (source PNGs
+embedded at full resolution, re-compressed by ReportLab on every render and
+ASCII85-encoded) and with the current PDF_IMAGE_DPI / PDF_IMAGE_JPEG_QUALITY /
+PDF_ASCII85 settings. Also lists what each asset was prepared to.
+
+    python -m benchmarks.images --items 10 --repeat 10
+"""
+import argparse
+import io
+import time
+
+from benchmarks import setup_django
+
+
+def render_invoice(invoice, items):
+    from stats.invoice_pdf import render_invoice_pdf, build_invoice_data
+
+    buf = io.BytesIO()
+    render_invoice_pdf(buf, build_invoice_data(invoice, items, invoice.customer))
+    return buf.getvalue()
+
+
+def render_quotation(quotation, items):
+    from stats.utils import render_quotation_pdf
+
+    buf = io.BytesIO()
+    render_quotation_pdf(buf, quotation, items)
+    return buf.getvalue()
+
+
+def measure(fn, args, repeat):
+    fn(*args)  # registry, fonts
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(pdf)
+
+
+def configure(dpi, ascii85):
+    from django.conf import settings
+    from reportlab import rl_config
+    from stats.assets import registry
+
+    settings.PDF_IMAGE_DPI = dpi
+    rl_config.useA85 = 1 if ascii85 else 0
+    registry.clear()
+    registry.warm()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from stats.assets import registry, PreparedImage
+    from benchmarks.fixtures import make_quotation, make_invoice
+
+    documents = [
+        ('invoice', render_invoice, make_invoice(args.items)),
+        ('quotation', render_quotation, make_quotation(args.items)),
+    ]
+
+    modes = {
+        'before': (None, True),
+        'after': (getattr(settings, 'PDF_IMAGE_DPI', 150), getattr(settings, 'PDF_ASCII85', False)),
+    }
+    results = {}
+    for mode, options in modes.items():
+        configure(*options)
+        for name, fn, fixture in documents:
+            results[name, mode] = measure(fn, fixture, args.repeat)
+
+    print(f"{'document':<10} {'before B':>10} {'after B':>10} {'saved B':>10} "
+          f"{'before ms':>10} {'after ms':>10}")
+    for name, _, _ in documents:
+        (t0, b0), (t1, b1) = results[name, 'before'], results[name, 'after']
+        print(f"{name:<10} {b0:>10} {b1:>10} {b0 - b1:>10} "
+              f"{t0 * 1000:>10.1f} {t1 * 1000:>10.1f}")
+
+    print(f"\n{'asset':<12} {'source px':>11} {'prepared px':>12} {'encoding':>9} {'stream B':>9}")
+    for name in registry.filenames:
+        image = registry.get(name)
+        if not isinstance(image, PreparedImage):
+            continue
+        source = '%dx%d' % image.source_size
+        prepared = '%dx%d' % image.getSize()
+        print(f"{name:<12} {source:>11} {prepared:>12} {image.encoding:>9} {image.stream_bytes:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Quotation item table: one Table per row (old) vs. one measured Table per page (new).
+
+The old renderer built, styled, wrapped and drew a separate single-row Table
+for every item with a fixed 11 items per page. The new one measures each row
+once, splits pages by height and draws one Table per page.
+
+    python -m benchmarks.item_table --items 10 100 1000 5000 --repeat 3
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+from benchmarks import setup_django
+
+
+LETTERHEAD = 'quotation_letterhead'
+
+
+def per_row_tables(quotation, items):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Paragraph, Table, TableStyle
+    from stats.utils import draw_quotation_letterhead
+
+    items_per_page = 11
+    width, height = A4
+    navy_blue = colors.Color(0.039, 0.164, 0.321)
+    col_widths = [20, width - 290, 30, 70, 70]
+    total_pages = max(1, (len(items) + items_per_page - 1) // items_per_page)
+
+    buf = io.BytesIO()
+    p = canvas.Canvas(buf, pagesize=A4, invariant=1)
+    p.beginForm(LETTERHEAD)
+    draw_quotation_letterhead(p, quotation)
+    p.endForm()
+
+    for page in range(total_pages):
+        if page > 0:
+            p.showPage()
+        p.doForm(LETTERHEAD)
+        p.setFont("Helvetica", 8)
+        p.drawRightString(width - 50, 55, f"Page {page + 1} of {total_pages}")
+
+        table_y = height - 380
+        header_table = Table([["NO", "DESCRIPTION", "QTY", "UNIT PRICE", "LINE TOTAL"]], colWidths=col_widths)
+        header_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('BACKGROUND', (0, 0), (-1, 0), navy_blue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.gray),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]))
+        header_table.wrapOn(p, width - 100, height)
+        header_table.drawOn(p, 50, table_y)
+
+        styles = getSampleStyleSheet()
+        item_style = ParagraphStyle('ItemStyle', parent=styles['Normal'], fontSize=9, leading=10)
+        current_y = table_y - 25
+        start = page * items_per_page
+        for idx, item in enumerate(items[start:start + items_per_page], start=start + 1):
+            desc = Paragraph(item.item_name, item_style)
+            row_height = max(22, desc.wrap(col_widths[1], height)[1] + 6)
+            row_table = Table(
+                [[str(idx), desc, str(item.quantity), f"{item.price:.2f}", f"{item.quantity * item.price:.2f}"]],
+                colWidths=col_widths, rowHeights=[row_height],
+            )
+            row_table.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+                ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.gray),
+                ('TOPPADDING', (0, 0), (-1, -1), 3),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+                ('LEFTPADDING', (1, 0), (1, 0), 5),
+                ('RIGHTPADDING', (1, 0), (1, 0), 5),
+            ]))
+            row_table.wrapOn(p, width - 100, height)
+            row_table.drawOn(p, 50, current_y)
+            current_y -= row_height
+    p.save()
+    return buf.getvalue()
+
+
+def page_tables(quotation, items):
+    from stats.utils import render_quotation_pdf
+
+    buf = io.BytesIO()
+    render_quotation_pdf(buf, quotation, items)
+    return buf.getvalue()
+
+
+def measure(fn, quotation, items, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf = fn(quotation, items)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    fn(quotation, items)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from benchmarks.fixtures import make_quotation
+
+    print(f"{'items':>6} {'mode':<8} {'ms':>10} {'peak KiB':>10} {'pages':>6} {'bytes':>10}")
+    for count in args.items:
+        quotation, items = make_quotation(count)
+        for name, fn in (('per-row', per_row_tables), ('per-page', page_tables)):
+            elapsed, peak, pdf = measure(fn, quotation, items, args.repeat)
+            pages = pdf.count(b'/Type /Page\n')
+            print(f"{count:>6} {name:<8} {elapsed * 1000:>10.1f} {peak / 1024:>10.0f} "
+                  f"{pages:>6} {len(pdf):>10}")
+
+
+if __name__ == '__main__':
+    main()
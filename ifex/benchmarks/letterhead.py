@@ -0,0 +1,76 @@
+"""Per-page cost of redrawing the quotation letterhead vs. stamping a form XObject.
+
+    python -m benchmarks.letterhead --pages 25 --repeat 20
+"""
+import argparse
+import io
+import time
+
+from benchmarks import setup_django
+
+
+LETTERHEAD = 'quotation_letterhead'
+
+
+def redraw_every_page(quotation, pages):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from stats.utils import draw_quotation_letterhead
+
+    buf = io.BytesIO()
+    p = canvas.Canvas(buf, pagesize=A4)
+    for page in range(pages):
+        draw_quotation_letterhead(p, quotation)
+        p.drawRightString(A4[0] - 50, 55, f"Page {page + 1} of {pages}")
+        p.showPage()
+    p.save()
+    return buf.getvalue()
+
+
+def stamp_form(quotation, pages):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from stats.utils import draw_quotation_letterhead
+
+    buf = io.BytesIO()
+    p = canvas.Canvas(buf, pagesize=A4)
+    p.beginForm(LETTERHEAD)
+    draw_quotation_letterhead(p, quotation)
+    p.endForm()
+    for page in range(pages):
+        p.doForm(LETTERHEAD)
+        p.drawRightString(A4[0] - 50, 55, f"Page {page + 1} of {pages}")
+        p.showPage()
+    p.save()
+    return buf.getvalue()
+
+
+def measure(fn, quotation, pages, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf = fn(quotation, pages)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(pdf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=25)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from benchmarks.fixtures import make_quotation
+    quotation, _ = make_quotation(0)
+
+    print(f"{'mode':<10} {'ms/page':>10} {'bytes/page':>12} {'total bytes':>12}")
+    for name, fn in (('redraw', redraw_every_page), ('form', stamp_form)):
+        elapsed, size = measure(fn, quotation, args.pages, args.repeat)
+        print(f"{name:<10} {elapsed * 1000 / args.pages:>10.3f} "
+              f"{size / args.pages:>12.0f} {size:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Saving the item lines of a quotation: one query per row versus the bulk diff.
+
+    python -m benchmarks.line_items --lines 10,100,1000
+
+For each line count, times (median of --repeat) and counts the queries of
+
+    create      a new quotation with that many lines
+    edit one    the same lines with one of them changed
+    edit all    every line changed
+
+done the old way (delete every item, then one INSERT per line, each item
+signal firing per row) and through line_items.save_items (bulk_update /
+bulk_create / one DELETE of the difference, in one transaction). Runs
+against a throwaway test database.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django
+
+
+def per_row(quotation, lines):
+    from stats.models import QuotationItem
+
+    quotation.items.all().delete()
+    for line in lines:
+        QuotationItem.objects.create(quotation=quotation, **line)
+
+
+def bulk_diff(quotation, lines):
+    from django.db import transaction
+    from stats.line_items import save_items
+
+    with transaction.atomic():
+        save_items(quotation, lines)
+
+
+def make_lines(count, suffix=''):
+    return [{'item_name': f"Item {n}{suffix}", 'quantity': n + 1, 'price': 2.5} for n in range(count)]
+
+
+def measure(save, quotation, before, after, repeat):
+    """Median time and query count of ``save(quotation, after)`` starting from ``before`` lines."""
+    from django.db import connection
+
+    executed = []
+
+    def count(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    times = []
+    for _ in range(repeat):
+        per_row(quotation, before)
+        executed.clear()
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            save(quotation, after)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times), len(executed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', default='10,100,1000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    import datetime
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from stats.models import Customer, Quotation
+
+    settings.PDF_PRERENDER = False
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    customer = Customer.objects.create(name="Benchmark Customer")
+    quotation = Quotation.objects.create(
+        customer=customer, expected_delivery_date=datetime.date(2025, 6, 13),
+        total_price=0.0, grand_total=0.0,
+    )
+
+    print(f"{'lines':>6} {'save':<9} {'per row ms':>10} {'queries':>7} {'bulk ms':>8} {'queries':>7}")
+    for count in [int(n) for n in args.lines.split(',')]:
+        lines = make_lines(count)
+        one = list(lines)
+        one[count // 2] = {**one[count // 2], 'price': 3.0}
+        cases = [
+            ('create', [], lines),
+            ('edit one', lines, one),
+            ('edit all', lines, make_lines(count, ' (revised)')),
+        ]
+        for label, before, after in cases:
+            old, old_queries = measure(per_row, quotation, before, after, args.repeat)
+            new, new_queries = measure(bulk_diff, quotation, before, after, args.repeat)
+            print(f"{count:>6} {label:<9} {old * 1000:>10.1f} {old_queries:>7} {new * 1000:>8.1f} {new_queries:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Scaling of the paginated list pages with table size.
+
+    python -m benchmarks.pagination --rows 1000,10000,100000,300000
+
+Grows a throwaway test database to each size in turn (as many quotations,
+invoices and customers) and renders, through the real views:
+
+    first   the first page
+    deep    a page near the end (of this month, for invoices), through an
+            ?after= cursor
+
+reporting the median time of --repeat requests and the tracemalloc peak of
+one. With keyset pagination both should stay flat as the tables grow.
+"""
+import argparse
+import datetime
+import gc
+import statistics
+import time
+import tracemalloc
+
+from benchmarks import setup_django
+
+
+def grow(count, start, customers):
+    """Add quotations, invoices and customers up to ``count`` of each."""
+    from django.utils import timezone
+    from stats import rollups
+    from stats.models import Customer, Quotation, Invoice
+
+    base = timezone.now()
+    today = timezone.localdate()
+    batch = 5000
+    # Spread creation times (bulk_create would stamp them all with now)
+    created_at = Quotation._meta.get_field('created_at')
+    created_at.auto_now_add = False
+    try:
+        for first in range(start, count, batch):
+            numbers = range(first, min(first + batch, count))
+            customers += Customer.objects.bulk_create(
+                Customer(name=f"Customer {n}", phone=f"05{n:08d}") for n in numbers
+            )
+            quotations = Quotation.objects.bulk_create(
+                Quotation(
+                    quotation_number=f"IF{n + 2001}",
+                    customer=customers[n % len(customers)],
+                    expected_delivery_date=today,
+                    created_at=base - datetime.timedelta(minutes=n),
+                    total_price=100.0, grand_total=105.0,
+                )
+                for n in numbers
+            )
+            Invoice.objects.bulk_create(
+                Invoice(
+                    invoice_number=f"INV{n + 2001}",
+                    quotation=quotation,
+                    customer=quotation.customer,
+                    # 100 a day, going back from today; the invoice list
+                    # shows the current month
+                    invoice_date=today - datetime.timedelta(days=n // 100),
+                    total_amount=100.0, grand_total=105.0,
+                )
+                for n, quotation in zip(numbers, quotations)
+            )
+    finally:
+        created_at.auto_now_add = True
+    rollups.rebuild()  # bulk_create sends no signals
+
+
+def deep_cursor(queryset, ordering, page_size):
+    from stats.pagination import encode_cursor
+
+    fields = [name.lstrip('-') for name in ordering]
+    # The key of a row about one page from the end
+    row = queryset.order_by(*ordering).values_list(*fields)[queryset.count() - page_size - 1]
+    return encode_cursor(row)
+
+
+def measure(view, request, repeat):
+    def run():
+        response = view(request)
+        assert response.status_code == 200, response.status_code
+        return len(response.content)
+
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = run()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import setup_test_environment
+    from stats import views
+    from stats.models import Customer, Quotation, Invoice
+    from stats.pagination import page_size
+
+    from django.utils import timezone
+
+    settings.PDF_PRERENDER = False
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    factory = RequestFactory()
+    size = page_size(factory.get('/'))
+
+    pages = [
+        ('quotation_list', views.quotation_list, Quotation.objects.all(), views.QUOTATION_ORDER),
+        ('invoice_list', views.invoice_list,
+         Invoice.objects.filter(invoice_date__gte=timezone.localdate().replace(day=1)), views.INVOICE_ORDER),
+        ('customer_list', views.customer_list, Customer.objects.all(), views.CUSTOMER_ORDER),
+        ('invoice_select', views.create_invoice_from_dropdown, Quotation.objects.all(), views.QUOTATION_ORDER),
+    ]
+
+    print(f"{size} rows per page")
+    print(f"{'rows':>8} {'view':<15} {'page':<6} {'ms':>8} {'peak KB':>8} {'HTML KB':>8}")
+    customers, grown = [], 0
+    for count in [int(n) for n in args.rows.split(',')]:
+        grow(count, grown, customers)
+        grown = count
+        for name, view, queryset, ordering in pages:
+            cursor = deep_cursor(queryset, ordering, size)
+            for label, request in (('first', factory.get('/')), ('deep', factory.get('/', {'after': cursor}))):
+                elapsed, peak, html = measure(view, request, args.repeat)
+                print(f"{count:>8} {name:<15} {label:<6} {elapsed * 1000:>8.1f} "
+                      f"{peak / 1024:>8.0f} {html / 1024:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Scaling of parallel page rendering for a large quotation by worker count.
+
+    python -m benchmarks.parallel --items 5000 --workers 1,2,4,8
+
+Times the serial render, then pdf_parallel.render_parallel on pools of each
+size (started and warmed up before timing). Layout is measured once in the
+parent and included in every timing, as in the view.
+
+A speedup needs a core per worker: the first line of the output reports the
+cores available, and rows with more workers than cores are marked. The
+results at 1, 2, 4 and 8 cores have NOT been measured: so far this has only
+been run on a single-core machine, which can show the cost of splitting and
+concatenating but not the scaling. Run it on a machine with at least 8
+cores before relying on PDF_PARALLEL_MIN_ITEMS paying off.
+"""
+import argparse
+import io
+import os
+import time
+
+from benchmarks import setup_django
+
+TEMPLATE = 'stats.utils.QUOTATION_TEMPLATE'
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def serial(quotation, items):
+    from stats.utils import QUOTATION_TEMPLATE
+
+    buf = io.BytesIO()
+    QUOTATION_TEMPLATE.render(buf, quotation, items)
+    return len(buf.getvalue())
+
+
+def parallel(quotation, items, executor, workers):
+    from stats.pdf_parallel import render_parallel
+
+    buf = io.BytesIO()
+    render_parallel(TEMPLATE, buf, quotation, items, executor=executor, workers=workers)
+    return len(buf.getvalue())
+
+
+def oversubscribed(workers):
+    return "  (more workers than cores)" if workers > (os.cpu_count() or 1) else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--workers', default=','.join(str(2 ** i) for i in range(4)))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from benchmarks.fixtures import make_quotation
+    from stats.pdf_parallel import merge_backend
+    from stats.pdf_workers import make_executor, render_pages
+    from stats.utils import QUOTATION_TEMPLATE
+
+    if merge_backend() is None:
+        raise SystemExit("pypdf or pypdfium2 is needed to concatenate the parts")
+
+    quotation, items = make_quotation(args.items)
+    pages = len(QUOTATION_TEMPLATE.layout(items).pages)
+    base, size = best_of(lambda: serial(quotation, items), args.repeat)
+
+    print(f"{args.items} items, {pages} pages, {os.cpu_count()} CPU cores available")
+    print(f"{'workers':>7} {'ms':>9} {'speedup':>8} {'efficiency':>11} {'KB':>8}")
+    print(f"{'serial':>7} {base * 1000:>9.0f} {1:>8.2f} {1:>11.0%} {size / 1024:>8.0f}")
+    for workers in [int(w) for w in args.workers.split(',')]:
+        executor = make_executor(workers)
+        try:
+            # Start every worker (spawn + django.setup) and compile the plan
+            list(executor.map(render_pages, [TEMPLATE] * workers, [quotation] * workers,
+                              [items[:1]] * workers, [None] * workers))
+            elapsed, size = best_of(
+                lambda: parallel(quotation, items, executor, workers), args.repeat,
+            )
+        finally:
+            executor.shutdown()
+        speedup = base / elapsed
+        print(f"{workers:>7} {elapsed * 1000:>9.0f} {speedup:>8.2f} "
+              f"{speedup / workers:>11.0%} {size / 1024:>8.0f}{oversubscribed(workers)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Per-request allocations of PDF layout state: built per render vs. shared.
+
+Before stats.pdf_styles every render called getSampleStyleSheet(), built its
+own ParagraphStyle and colours and a fresh TableStyle for every item row.
+This measures what that construction alone allocates, using tracemalloc
+snapshot diffs, against reading the shared module-level objects.
+
+    python -m benchmarks.styles --rows 11 100 1000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks import setup_django
+
+
+def per_request_layout(rows):
+    """What a quotation render used to build for itself."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+
+    palette = [
+        colors.Color(0.53, 0.81, 0.92), colors.Color(0.039, 0.164, 0.321),
+        colors.Color(0.96, 0.96, 0.97), colors.Color(0.83, 0.69, 0.22),
+        colors.Color(0.3, 0.3, 0.3), colors.Color(1, 1, 1),
+        colors.Color(0, 0, 0), colors.Color(0.95, 0.95, 0.95),
+    ]
+    styles = getSampleStyleSheet()
+    item_style = ParagraphStyle(
+        'ItemStyle', parent=styles['Normal'], fontSize=9, fontName='Helvetica',
+        leading=10, wordWrap='LTR', splitLongWords=True,
+    )
+    header_style = TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('BACKGROUND', (0, 0), (-1, 0), palette[1]),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.gray),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ])
+    row_styles = []
+    for i in range(rows):
+        bg_color = colors.Color(0.95, 0.98, 1.0) if i % 2 == 0 else colors.white
+        row_styles.append(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+            ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BACKGROUND', (0, 0), (-1, -1), bg_color),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.gray),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+            ('LEFTPADDING', (1, 0), (1, 0), 5),
+            ('RIGHTPADDING', (1, 0), (1, 0), 5),
+        ]))
+    return palette, item_style, header_style, row_styles
+
+
+def shared_layout(rows):
+    """The same lookups against stats.pdf_styles."""
+    from stats import pdf_styles
+
+    palette = [
+        pdf_styles.LIGHT_BLUE, pdf_styles.NAVY_BLUE, pdf_styles.SILVER_GRAY,
+        pdf_styles.GOLD_ACCENT, pdf_styles.DARK_GRAY, pdf_styles.WHITE,
+        pdf_styles.BLACK, pdf_styles.LIGHT_GRAY,
+    ]
+    # One table style covers the header and every row of a page
+    return palette, pdf_styles.ITEM_STYLE, pdf_styles.QUOTATION_ITEMS_STYLE, []
+
+
+def allocated(fn, rows):
+    """Bytes and blocks still allocated after ``fn(rows)``, from a snapshot diff."""
+    fn(rows)  # warm imports and caches
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn(rows)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    count = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    top = [stat for stat in stats if stat.size_diff > 0][:3]
+    return size, count, top
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[11, 100, 1000])
+    parser.add_argument('--top', action='store_true', help="show the top allocating files")
+    args = parser.parse_args()
+
+    setup_django()
+
+    print(f"{'rows':>6} {'mode':<12} {'bytes':>10} {'blocks':>8}")
+    for rows in args.rows:
+        for name, fn in (('per-request', per_request_layout), ('shared', shared_layout)):
+            size, count, top = allocated(fn, rows)
+            print(f"{rows:>6} {name:<12} {size:>10} {count:>8}")
+            if args.top:
+                for stat in top:
+                    print(f"{'':>20} {stat}")
+
+
+if __name__ == '__main__':
+    main()
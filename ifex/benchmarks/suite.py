@@ -0,0 +1,266 @@
+"""PDF rendering benchmark and regression suite.
+
+Drives the real PDF views (generate_invoice_pdf, delivery_order_pdf,
+quotation_pdf2 and utils.invoice_pdf) with RequestFactory requests against a
+throwaway test database seeded with synthetic quotations and invoices, so no
+server is needed. Every (view, item count, description length) case runs in its own
+process, which keeps peak RSS per case meaningful, and records:
+
+    wall_time_s       median of --repeat renders (PDF cache cleared each time)
+    peak_rss_bytes    peak resident set size of the case's process
+    alloc_peak_bytes  tracemalloc peak during one render
+    output_bytes      size of the PDF returned
+
+Results are written as JSON. With --baseline the run is compared against an
+earlier JSON file and exits with status 1 if any metric grew by more than the
+threshold:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --baseline before.json --threshold 0.25 \\
+        --threshold wall_time_s=0.5
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from benchmarks import setup_django
+
+
+# view name -> (module, function, record the view takes, PDF cache kind)
+VIEWS = {
+    'generate_invoice_pdf': ('stats.invoice_pdf', 'generate_invoice_pdf', 'invoice', 'invoice'),
+    'delivery_order_pdf': ('stats.invoice_pdf', 'delivery_order_pdf', 'invoice', 'delivery_order'),
+    'quotation_pdf2': ('stats.utils', 'quotation_pdf2', 'quotation', 'quotation'),
+    'utils.invoice_pdf': ('stats.utils', 'invoice_pdf', 'invoice', None),
+}
+
+METRICS = ['wall_time_s', 'peak_rss_bytes', 'alloc_peak_bytes', 'output_bytes']
+
+
+############ CASE (runs in a child process) ############
+
+def _peak_rss():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _seed(item_count, description_length):
+    from stats.models import QuotationItem, InvoiceItem
+    from benchmarks.fixtures import make_quotation, make_invoice
+
+    quotation, quotation_items = make_quotation(item_count, description_length)
+    quotation.customer.save()
+    quotation.save()
+    QuotationItem.objects.bulk_create(quotation_items)
+
+    invoice, invoice_items = make_invoice(item_count, description_length)
+    invoice.customer = quotation.customer
+    invoice.quotation = quotation
+    invoice.save()
+    InvoiceItem.objects.bulk_create(invoice_items)
+    return {'quotation': quotation, 'invoice': invoice}
+
+
+def run_case(view, item_count, description_length, repeat):
+    setup_django()
+    import importlib
+    from asgiref.sync import async_to_sync, iscoroutinefunction
+    from django.conf import settings
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import setup_test_environment
+    from stats import pdf_cache
+
+    module, function, record, cache_kind = VIEWS[view]
+    settings.PDF_CACHE_DIR = tempfile.mkdtemp(prefix='pdf-bench-')
+    settings.PDF_PRERENDER = False
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+
+    obj = _seed(item_count, description_length)[record]
+    view_func = getattr(importlib.import_module(module), function)
+    if iscoroutinefunction(view_func):
+        # Async views run on the render executor, as under ASGI
+        view_func = async_to_sync(view_func)
+    factory = RequestFactory()
+
+    def render():
+        if cache_kind:
+            pdf_cache.cache.invalidate(cache_kind, obj.pk)
+        response = view_func(factory.get('/'), obj.pk)
+        try:
+            return b''.join(response)
+        finally:
+            response.close()
+
+    render()  # imports, asset registry, fonts
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        pdf = render()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    render()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'view': view,
+        'items': item_count,
+        'description_length': description_length,
+        'wall_time_s': statistics.median(times),
+        'wall_times_s': times,
+        'peak_rss_bytes': _peak_rss(),
+        'alloc_peak_bytes': alloc_peak,
+        'output_bytes': len(pdf),
+    }
+
+
+def run_isolated(view, item_count, description_length, repeat):
+    # spawn, not fork: a fresh interpreter per case so RSS isn't inherited
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, view, item_count, description_length, repeat).result()
+
+
+############ REGRESSION CHECK ############
+
+def _case_key(result):
+    return (result['view'], result['items'], result['description_length'])
+
+
+def parse_thresholds(values):
+    """``['0.25', 'wall_time_s=0.5']`` -> ``{None: 0.25, 'wall_time_s': 0.5}``"""
+    thresholds = {None: 0.25}
+    for value in values or []:
+        metric, _, limit = value.rpartition('=')
+        if metric and metric not in METRICS:
+            raise ValueError(f"unknown metric in --threshold: {metric}")
+        thresholds[metric or None] = float(limit)
+    return thresholds
+
+
+def compare(results, baseline, thresholds, metrics=METRICS):
+    """Return one message per metric that regressed past its threshold."""
+    previous = {_case_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(_case_key(result))
+        if before is None:
+            continue
+        for metric in metrics:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            limit = thresholds.get(metric, thresholds[None])
+            change = (new - old) / old
+            if change > limit:
+                view, items, length = _case_key(result)
+                regressions.append(
+                    f"{view} items={items} desc={length}: {metric} "
+                    f"{old:.6g} -> {new:.6g} (+{change:.0%}, limit {limit:.0%})"
+                )
+    return regressions
+
+
+############ MAIN ############
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--views', nargs='+', choices=list(VIEWS), default=list(VIEWS))
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--desc-lengths', type=int, nargs='+', default=[20, 200])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="JSON file to write (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--baseline', help="earlier JSON results to compare against")
+    parser.add_argument(
+        '--threshold', action='append',
+        help="allowed relative growth, e.g. 0.25 for all metrics or wall_time_s=0.5 (repeatable)",
+    )
+    parser.add_argument('--metrics', nargs='+', choices=METRICS, default=METRICS,
+                        help="metrics checked against the baseline")
+    args = parser.parse_args()
+    try:
+        thresholds = parse_thresholds(args.threshold)
+    except ValueError as e:
+        parser.error(str(e))
+
+    commit = _git_commit()
+    results = []
+    print(f"{'view':<22} {'items':>6} {'desc':>5} {'ms':>9} {'rss MiB':>8} "
+          f"{'alloc KiB':>10} {'bytes':>9}")
+    for view in args.views:
+        for item_count in args.items:
+            for length in args.desc_lengths:
+                result = run_isolated(view, item_count, length, args.repeat)
+                results.append(result)
+                rss = result['peak_rss_bytes']
+                print(f"{view:<22} {item_count:>6} {length:>5} "
+                      f"{result['wall_time_s'] * 1000:>9.1f} "
+                      f"{(rss or 0) / 2**20:>8.1f} {result['alloc_peak_bytes'] / 1024:>10.0f} "
+                      f"{result['output_bytes']:>9}")
+
+    report = {
+        'meta': {
+            'commit': commit,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), 'results', f"{commit or 'results'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, thresholds, args.metrics)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
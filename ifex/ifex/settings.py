@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'stats.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -127,4 +128,68 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Rows per page of the quotation, invoice and customer lists; ?page_size=
+# overrides it up to LIST_MAX_PAGE_SIZE
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 500
 
+
+# PDF generation
+# Seconds between checks for replaced logo/banner files in static/images
+PDF_ASSET_CHECK_INTERVAL = 2.0
+
+# Rendered invoice/quotation PDFs, keyed by a hash of their content
+PDF_CACHE_DIR = BASE_DIR / 'pdf_cache'
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# PDFs not served from the cache render into a temp file kept in memory up to
+# this size, then spilled to disk
+PDF_SPOOL_MAX_BYTES = 1024 * 1024
+
+# Let the front-end server send cached PDFs itself: 'X-Accel-Redirect' (nginx,
+# with an internal location for PDF_SENDFILE_URL aliased to PDF_CACHE_DIR) or
+# 'X-Sendfile' (Apache/lighttpd). None streams the file from Django.
+PDF_SENDFILE_HEADER = None
+PDF_SENDFILE_URL = '/protected/pdf/'
+
+# Worker processes for the bulk invoice ZIP export (None: one per CPU core)
+PDF_EXPORT_WORKERS = None
+
+# Quotations with at least this many items render their pages on the export
+# workers and are concatenated (needs pypdf or pypdfium2; None: never)
+PDF_PARALLEL_MIN_ITEMS = 1000
+
+# PDF views render on this many threads at once (ASGI); at most
+# PDF_RENDER_QUEUE_DEPTH more wait for one, beyond that they get a 503 telling
+# the client to retry after PDF_RENDER_RETRY_AFTER seconds
+PDF_RENDER_CONCURRENCY = 4
+PDF_RENDER_QUEUE_DEPTH = 16
+PDF_RENDER_RETRY_AFTER = 5
+# Render on the request's thread instead (True/False); None: only under WSGI
+PDF_RENDER_INLINE = None
+
+# Width in pixels of the first-page previews on the list pages, rendered by
+# the PDF queue worker (needs pypdfium2; None: no previews)
+PDF_THUMBNAIL_WIDTH = 240
+
+# Queue PDFs for background rendering after quotations/invoices are saved.
+# Run `python manage.py render_pdf_queue` to drain it.
+PDF_PRERENDER = True
+PDF_QUEUE_PATH = BASE_DIR / 'pdf_queue.sqlite3'
+
+# Images embedded in PDFs are resampled to their printed size at this
+# resolution and encoded once per process (None embeds the source files as-is)
+PDF_IMAGE_DPI = 150
+
+# JPEG quality for opaque photographic images; None keeps every image lossless
+PDF_IMAGE_JPEG_QUALITY = 85
+
+# Flate-compress page content streams
+PDF_PAGE_COMPRESSION = True
+
+# Wrap binary streams in ASCII85 (7-bit clean, but ~25% larger and slower)
+PDF_ASCII85 = False
+
+# Time requests by stage (db, num2words, images, layout, table, save) into a
+# Server-Timing header and one `stats.timing` log line per request
+SERVER_TIMING = config('SERVER_TIMING', default=False, cast=bool)
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StatsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stats'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # The search index is a raw table (FTS5 / FULLTEXT) outside the models
+        from .search import create_index_after_migrate
+        post_migrate.connect(create_index_after_migrate, sender=self)
+
+        from .pdf_canvas import configure
+        configure()
+
+        # Resolve, resample and encode the PDF images once per worker
+        from .assets import registry
+        registry.warm()
@@ -0,0 +1,293 @@
+"""Process-wide registry of the images embedded in generated PDFs.
+
+Every PDF generator used to walk a list of candidate paths with
+``os.path.exists`` and hand ReportLab a filename, so each download opened and
+decoded the PNGs again. The registry resolves each asset once per worker,
+decodes it once and hands out the same ``ImageReader`` to every render. A file
+that is replaced on disk is picked up on the next lookup after
+``PDF_ASSET_CHECK_INTERVAL`` seconds.
+
+Assets are also prepared for print: resampled to the largest size any
+renderer draws them at (PDF_IMAGE_DPI), stripped of alpha channels that are
+fully opaque, and encoded once as JPEG or Flate, whichever suits the image.
+``PDFCanvas`` (stats.pdf_canvas) embeds that stream as-is, so a render no
+longer compresses the images again.
+"""
+import copy
+import os
+import threading
+import time
+import zlib
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image
+from reportlab.lib.utils import ImageReader, _digester
+from reportlab.pdfbase import pdfdoc
+from reportlab.lib.rl_accel import asciiBase85Encode
+
+
+# Asset name -> candidate file names, in order of preference
+ASSET_FILENAMES = {
+    'banner': ('header_banner.png', 'banner.png', 'ifex_header.png'),
+    'logo': ('logo.png',),
+    'footer_logo': ('footerlogo.png',),
+}
+
+# Largest box (in points) each asset is drawn into by any renderer, and
+# whether it is drawn with preserveAspectRatio (fit in the box) or stretched
+ASSET_PRINT_SIZES = {
+    'banner': (555, 80, False),
+    'logo': (220, 130, True),
+    'footer_logo': (130, 70, True),
+}
+
+# More distinct colours than this and an opaque image counts as photographic,
+# where JPEG beats Flate; logos and flat artwork stay lossless
+PHOTOGRAPHIC_COLORS = 1024
+
+
+def asset_dirs():
+    dirs = [os.path.join(settings.BASE_DIR, 'static', 'images')]
+    if settings.STATIC_ROOT:
+        dirs.append(os.path.join(settings.STATIC_ROOT, 'images'))
+    dirs += [
+        os.path.join(settings.BASE_DIR, 'staticfiles', 'images'),
+        os.path.join(settings.BASE_DIR, 'media', 'images'),
+        os.path.join(settings.BASE_DIR, 'assets', 'images'),
+    ]
+    # STATIC_ROOT is usually BASE_DIR/staticfiles, don't probe it twice
+    return list(dict.fromkeys(os.path.normpath(d) for d in dirs))
+
+
+class _Entry:
+    __slots__ = ('path', 'signature', 'reader', 'checked_at')
+
+    def __init__(self, path, signature, reader, checked_at):
+        self.path = path
+        self.signature = signature
+        self.reader = reader
+        self.checked_at = checked_at
+
+
+class AssetRegistry:
+    def __init__(self, filenames=ASSET_FILENAMES):
+        self.filenames = filenames
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Return the shared ImageReader for ``name``, or None if no file exists."""
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() - entry.checked_at < self.check_interval:
+            return entry.reader
+        with self._lock:
+            return self._refresh(name).reader
+
+    def signature(self):
+        """Identify the current asset files, for cache keys of rendered PDFs."""
+        self.warm()
+        return sorted(
+            (name, os.path.basename(entry.path), entry.signature)
+            for name, entry in self._entries.items() if entry.path
+        ) + [image_options()]
+
+    def warm(self):
+        for name in self.filenames:
+            self.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'PDF_ASSET_CHECK_INTERVAL', 2.0)
+
+    def _refresh(self, name):
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            # Another thread refreshed it while we waited for the lock
+            return entry
+
+        path, signature = self._resolve(name)
+        if entry is not None and entry.path == path and entry.signature == signature:
+            entry.checked_at = now
+            return entry
+
+        reader = self._load(name, path) if path else None
+        entry = _Entry(path, signature, reader, now)
+        self._entries[name] = entry
+        return entry
+
+    def _resolve(self, name):
+        for directory in asset_dirs():
+            for filename in self.filenames[name]:
+                path = os.path.join(directory, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                return path, (st.st_mtime_ns, st.st_size)
+        return None, None
+
+    def _load(self, name, path):
+        dpi, jpeg_quality, ascii85 = image_options()
+        if not dpi or name not in ASSET_PRINT_SIZES:
+            reader = ImageReader(path)
+            # Decode now so concurrent renders share the pixel data
+            reader.getRGBData()
+            return reader
+        return prepare_image(path, ASSET_PRINT_SIZES[name], dpi, jpeg_quality, ascii85)
+
+
+############ PRINT PREPARATION ############
+
+def image_options():
+    return (
+        getattr(settings, 'PDF_IMAGE_DPI', 150),
+        getattr(settings, 'PDF_IMAGE_JPEG_QUALITY', 85),
+        bool(getattr(settings, 'PDF_ASCII85', False)),
+    )
+
+
+def print_pixels(size, print_size, dpi):
+    """Pixel size of an image drawn into ``print_size`` at ``dpi``; never upsampled."""
+    width, height = size
+    box_width, box_height, preserve_aspect = print_size
+    if preserve_aspect:
+        scale = min(1.0, min(box_width / width, box_height / height) * dpi / 72)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    return (
+        min(width, max(1, round(box_width * dpi / 72))),
+        min(height, max(1, round(box_height * dpi / 72))),
+    )
+
+
+def prepare_image(path, print_size, dpi, jpeg_quality=85, ascii85=False):
+    image = Image.open(path)
+    image.load()
+    source_size = image.size
+
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGB')
+    if image.mode in ('RGBA', 'LA') and image.getchannel('A').getextrema() == (255, 255):
+        # Fully opaque: don't embed a soft mask that masks nothing
+        image = image.convert(image.mode[:-1])
+
+    size = print_pixels(image.size, print_size, dpi)
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+    return PreparedImage(image, path, source_size, jpeg_quality, ascii85)
+
+
+def _encode(data, filters, ascii85):
+    if ascii85:
+        return asciiBase85Encode(data), ['ASCII85Decode'] + filters
+    return data, filters
+
+
+class PreparedImage(ImageReader):
+    """An asset resampled to its printed size, with its PDF stream encoded once.
+
+    It is still an ImageReader, so it works with any canvas; ``PDFCanvas``
+    additionally registers the pre-encoded XObject before drawing it.
+    """
+
+    def __init__(self, image, path, source_size, jpeg_quality=85, ascii85=False):
+        super().__init__(image)
+        self.path = path
+        self.source_size = source_size
+        self._xobjects = {}
+        self._lock = threading.Lock()
+
+        rgb = self.getRGBData()
+        stream, filters = zlib.compress(rgb, 9), ['FlateDecode']
+        self.encoding = 'flate'
+        if (jpeg_quality and self._dataA is None
+                and image.getcolors(PHOTOGRAPHIC_COLORS) is None):
+            buf = BytesIO()
+            image.save(buf, 'JPEG', quality=jpeg_quality, optimize=True)
+            if buf.tell() < len(stream):
+                stream, filters = buf.getvalue(), ['DCTDecode']
+                self.encoding = 'jpeg'
+        self._stream, self._filters = _encode(stream, filters, ascii85)
+
+        self._smask = None
+        if self._dataA is not None:
+            alpha = self._dataA.getRGBData()
+            smask = pdfdoc.PDFImageXObject(_digester(alpha))
+            smask.width, smask.height = self.getSize()
+            smask.colorSpace = 'DeviceGray'
+            smask.bitsPerComponent = 8
+            smask.streamContent, smask._filters = _encode(zlib.compress(alpha, 9), ['FlateDecode'], ascii85)
+            smask.mask = None
+            smask._decode = [0, 1]
+            self._smask = smask
+
+    @property
+    def stream_bytes(self):
+        """Bytes this image adds to a PDF (colour stream plus any soft mask)."""
+        smask = len(self._smask.streamContent) if self._smask is not None else 0
+        return len(self._stream) + smask
+
+    def xobject(self, mask=None):
+        """The shared, pre-encoded XObject canvas.drawImage would build for ``mask``.
+
+        Returns None for masks it doesn't handle (explicit colour masks), which
+        are left to ReportLab.
+        """
+        key = mask if isinstance(mask, str) or mask is None else tuple(mask)
+        cached = self._xobjects.get(key)
+        if cached is not None:
+            return cached
+        if mask not in (None, 'auto') and not isinstance(mask, (list, tuple)):
+            return None
+
+        with self._lock:
+            # Same name drawImage derives, so it finds ours and skips encoding
+            use_smask = mask == 'auto' and self._smask is not None
+            mdata = self._dataA.getRGBData() if use_smask else str(mask).encode('utf8')
+            obj = pdfdoc.PDFImageXObject(_digester(self.getRGBData() + mdata))
+            obj.width, obj.height = self.getSize()
+            obj.colorSpace = pdfdoc._mode2CS[self.mode]
+            obj.bitsPerComponent = 8
+            obj.streamContent, obj._filters = self._stream, self._filters
+            obj.mask = list(mask) if isinstance(mask, (list, tuple)) else None
+            obj._prepared_smask = self._smask if use_smask else None
+            self._xobjects[key] = obj
+        return obj
+
+    def register(self, c, mask=None):
+        """Add the pre-encoded XObject to ``c``'s document if it isn't there yet."""
+        template = self.xobject(mask)
+        if template is None:
+            return
+        doc = c._doc
+        reg_name = doc.getXObjectName(template.name)
+        if reg_name in doc.idToObject:
+            return
+
+        # ReportLab records per-document state on registered objects, so each
+        # document gets its own shallow copy sharing the encoded bytes
+        obj = copy.copy(template)
+        c._setXObjects(obj)
+        doc.Reference(obj, reg_name)
+        doc.addForm(obj.name, obj)
+        smask = template._prepared_smask
+        if smask is not None:
+            mask_name = doc.getXObjectName(smask.name)
+            if mask_name not in doc.idToObject:
+                obj.smask = doc.Reference(copy.copy(smask), mask_name)
+            else:
+                obj.smask = pdfdoc.PDFObjectReference(mask_name)
+
+
+registry = AssetRegistry()
+
+
+def get_image(name):
+    return registry.get(name)
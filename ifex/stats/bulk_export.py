@@ -0,0 +1,125 @@
+"""Month-end "download every invoice" as one ZIP, rendered on a process pool.
+
+The view collects the invoices in a date range with two queries, serves the
+ones already in the PDF cache from disk and sends the rest to a long-lived
+pool of worker processes, each of which compiles the invoice template once.
+Finished PDFs are written into a ZIP that is streamed to the client as they
+complete, so the first bytes go out while later invoices are still
+rendering. Each invoice's data is built just before it is submitted, and
+at most ``2 * workers`` renders are in flight: the workers start on the
+first invoice straight away, and the parent's memory stays bounded no
+matter how many invoices are in the range.
+"""
+import zipfile
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from django.core.exceptions import BadRequest
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+
+from .models import Invoice
+from . import pdf_cache
+from .periods import requested_period
+from .invoice_pdf import build_invoice_data, invoice_customer
+from .pdf_workers import get_executor, render_invoice, render_workers
+from .responses import asgi_streaming
+
+
+############ STREAMING ZIP ############
+
+class _ZipSink:
+    """Write-only, non-seekable file for ZipFile; drained after each member."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(members):
+    """Yield a ZIP archive chunk by chunk from ``(name, bytes)`` pairs."""
+    sink = _ZipSink()
+    # PDFs are already Flate-compressed, storing them keeps the parent cheap
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
+
+
+def completed(pending):
+    """Wait for at least one render in ``pending``; yield and cache what finished."""
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pk, key, filename = pending.pop(future)
+        pdf = future.result()
+        pdf_cache.cache.put('invoice', pk, key, lambda f: f.write(pdf))
+        yield filename, pdf
+
+
+def render_invoices(invoices, executor=None, window=None):
+    """Yield ``(filename, pdf_bytes)`` for each invoice, as it is read from the cache or rendered."""
+    window = window or 2 * render_workers()
+    pending = {}
+    try:
+        for invoice in invoices:
+            items = list(invoice.items.all())
+            customer = invoice_customer(invoice)
+            key = pdf_cache.invoice_key(invoice, items, customer)
+            filename = f"Invoice_{invoice.invoice_number}.pdf"
+            path = pdf_cache.cache.get('invoice', invoice.pk, key)
+            if path is not None:
+                with open(path, 'rb') as f:
+                    yield filename, f.read()
+                continue
+
+            executor = executor or get_executor()
+            data = build_invoice_data(invoice, items, customer)
+            pending[executor.submit(render_invoice, data)] = (invoice.pk, key, filename)
+            if len(pending) >= window:
+                yield from completed(pending)
+        while pending:
+            yield from completed(pending)
+    finally:
+        # Client went away or a render failed: don't leave work queued
+        for future in pending:
+            future.cancel()
+
+
+############ VIEW ############
+
+def export_invoices_zip(request):
+    """ZIP of every invoice dated between ?from= and ?to= (default: this month)."""
+    try:
+        date_from, date_to = requested_period(request)
+    except BadRequest as e:
+        return HttpResponseBadRequest(str(e))
+
+    invoices = (
+        Invoice.objects
+        .filter(invoice_date__gte=date_from, invoice_date__lte=date_to)
+        .select_related('customer', 'quotation__customer')
+        .prefetch_related('items')
+        .order_by('invoice_date', 'id')
+    )
+
+    response = StreamingHttpResponse(
+        stream_zip(render_invoices(invoices)),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="Invoices_{date_from:%Y%m%d}_{date_to:%Y%m%d}.zip"'
+    )
+    # The invoices are read from the database as the archive streams
+    return asgi_streaming(request, response, thread_sensitive=True)
@@ -0,0 +1,126 @@
+"""Conditional GET for the detail pages and PDFs.
+
+Quotations, invoices and customers carry an ``updated_at`` that their own
+saves set and item changes bump (see signals); creating, deleting or moving
+an invoice bumps its quotation's too, as the quotation page shows it. A document's modification
+time is the newest ``updated_at`` of the records it prints. It is read in
+one query that never touches the item rows. Django's ``condition`` sends it
+as Last-Modified plus an ETag, and answers a matching If-None-Match or
+If-Modified-Since with 304 before the view runs.
+
+Responses are ``private, no-cache`` so browsers revalidate every time
+instead of guessing a freshness lifetime from Last-Modified.
+
+Async views (the PDF views behind ``bounded_render``) are revalidated on
+the request's own thread before they are awaited, so a 304 never takes a
+render slot.
+"""
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.db.models.functions import Coalesce, Greatest
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import pdf_cache
+from .models import Quotation, Invoice
+
+
+# Annotations: when anything a quotation or invoice prints last changed. The
+# invoice prints its quotation's date and falls back to the quotation's
+# customer; missing relations count as the record itself.
+QUOTATION_MODIFIED = Greatest('updated_at', 'customer__updated_at')
+INVOICE_MODIFIED = Greatest(
+    'updated_at',
+    Coalesce('customer__updated_at', 'updated_at'),
+    Coalesce('quotation__updated_at', 'updated_at'),
+    Coalesce('quotation__customer__updated_at', 'updated_at'),
+)
+
+
+def quotation_modified(request, quotation_id):
+    return (
+        Quotation.objects.filter(pk=quotation_id)
+        .annotate(modified=QUOTATION_MODIFIED)
+        .values_list('modified', flat=True)
+        .first()
+    )
+
+
+def invoice_modified(request, invoice_id):
+    return (
+        Invoice.objects.filter(pk=invoice_id)
+        .annotate(modified=INVOICE_MODIFIED)
+        .values_list('modified', flat=True)
+        .first()
+    )
+
+
+def pdf_tag(kind):
+    # PDFs also change when the layout code or the logo/banner files do
+    return lambda: f'{kind}-{pdf_cache.document_version()}'
+
+
+def conditional(modified, tag):
+    """Decorate a view with ETag/Last-Modified from ``modified(request, *args, **kwargs)``.
+
+    ``tag`` (a string, or a callable returning one) names the representation,
+    so the HTML page and each PDF of a record get different ETags.
+    """
+    def last_modified(request, *args, **kwargs):
+        # condition() asks for the ETag and Last-Modified separately; query once
+        if not hasattr(request, '_last_modified'):
+            request._last_modified = modified(request, *args, **kwargs)
+        return request._last_modified
+
+    def etag(request, *args, **kwargs):
+        stamp = last_modified(request, *args, **kwargs)
+        if stamp is None:
+            return None
+        ids = '-'.join(str(value) for value in (*args, *kwargs.values()))
+        name = tag() if callable(tag) else tag
+        return f'"{name}-{ids}-{stamp.timestamp():.6f}"'
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return async_conditional(view, etag, last_modified)
+
+        view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+class RenderNeeded(HttpResponse):
+    """What the precondition check of an async view returns when it has to run."""
+
+
+def async_conditional(view, etag, last_modified):
+    # condition() around a stand-in view: it answers 304/412 itself, or
+    # returns the stand-in carrying the ETag and Last-Modified headers
+    check = condition(etag_func=etag, last_modified_func=last_modified)(
+        lambda request, *args, **kwargs: RenderNeeded()
+    )
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # The validators are database queries: run them on the request's
+        # thread, not on the event loop
+        checked = await sync_to_async(check)(request, *args, **kwargs)
+        if isinstance(checked, RenderNeeded):
+            response = await view(request, *args, **kwargs)
+            for header in ('ETag', 'Last-Modified'):
+                if header in checked and not response.has_header(header):
+                    response[header] = checked[header]
+        else:
+            response = checked
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
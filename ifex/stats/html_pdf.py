@@ -0,0 +1,157 @@
+"""Quotation PDFs from HTML and CSS through WeasyPrint.
+
+An alternative to the ReportLab quotation (utils.QUOTATION_TEMPLATE), served
+by views.quotation_pdf_html. What doesn't change between renders is built
+once and reused:
+
+* the compiled Django template ``stats/quotation_pdf.html``, per process;
+* the parsed stylesheet ``css/quotation_pdf.css``, its FontConfiguration
+  and WeasyPrint's decoded-image cache, per render thread (WeasyPrint and
+  Pango font maps aren't meant to be shared between threads, and the
+  render threads of pdf_executor live as long as the process).
+
+Images and other resources are read straight from the static files
+(``{% static %}`` URLs resolved with the staticfiles finders). WeasyPrint
+never fetches anything over HTTP, so a render doesn't call back into the
+server or hang on the network.
+
+WeasyPrint (and the Pango library it needs) is optional; ``available()``
+says whether it can be used.
+"""
+import mimetypes
+import os
+import threading
+from functools import lru_cache
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.template.loader import get_template
+from django.utils._os import safe_join
+from num2words import num2words
+
+from .timing import stage
+
+
+TEMPLATE = 'stats/quotation_pdf.html'
+STYLESHEET = 'css/quotation_pdf.css'
+
+# Relative URLs in the template resolve against this; only static files are
+# ever served from it (see fetch_static)
+BASE_URL = 'file:///'
+
+# Blank rows printed under short item lists, as on the paper form
+FORM_ROWS = 12
+
+
+@lru_cache(maxsize=None)
+def available():
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):  # OSError: Pango/GObject libraries missing
+        return False
+    return True
+
+
+def static_path(path):
+    """Filesystem path of a static file given its URL path, or None."""
+    prefix = settings.STATIC_URL
+    if not path.startswith(prefix):
+        return None
+    relative = unquote(path[len(prefix):])
+    try:
+        found = finders.find(relative)
+        if found:
+            return found
+        # Collected static files only (no finder directories) in production
+        if settings.STATIC_ROOT:
+            candidate = safe_join(settings.STATIC_ROOT, relative)
+            if os.path.isfile(candidate):
+                return candidate
+    except SuspiciousFileOperation:  # ../ out of the static directories
+        pass
+    return None
+
+
+def fetch_static(url, timeout=10, ssl_context=None, **kwargs):
+    """WeasyPrint url_fetcher that reads static files and refuses everything else."""
+    if url.startswith('data:'):
+        from weasyprint.urls import default_url_fetcher
+        return default_url_fetcher(url)
+    parts = urlsplit(url)
+    path = static_path(parts.path) if parts.scheme == 'file' else None
+    if path is None:
+        raise ValueError(f"Not a static file, not fetched: {url}")
+    mime_type, _ = mimetypes.guess_type(path)
+    return {
+        'file_obj': open(path, 'rb'),
+        'mime_type': mime_type,
+        'redirected_url': url,
+    }
+
+
+@lru_cache(maxsize=None)
+def compiled_template():
+    return get_template(TEMPLATE)
+
+
+class HTMLEngine:
+    """The parsed stylesheet, fonts and image cache one thread renders with."""
+
+    def __init__(self):
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.font_config = FontConfiguration()
+        path = finders.find(STYLESHEET)
+        self.stylesheet = CSS(filename=path, font_config=self.font_config, url_fetcher=fetch_static)
+        self.image_cache = {}
+
+    def write_pdf(self, target, html):
+        from weasyprint import HTML
+
+        options = {}
+        dpi = getattr(settings, 'PDF_IMAGE_DPI', None)
+        if dpi:
+            options['dpi'] = dpi
+        document = HTML(string=html, base_url=BASE_URL, url_fetcher=fetch_static)
+        document.write_pdf(
+            target,
+            stylesheets=[self.stylesheet],
+            font_config=self.font_config,
+            cache=self.image_cache,
+            **options,
+        )
+
+
+_engines = threading.local()
+
+
+def get_engine():
+    engine = getattr(_engines, 'engine', None)
+    if engine is None:
+        engine = _engines.engine = HTMLEngine()
+    return engine
+
+
+def quotation_context(quotation, items):
+    with stage('num2words'):
+        amount_in_words = num2words(float(quotation.grand_total), lang='en').title() + " Dirhams Only"
+    return {
+        'quotation': quotation,
+        'customer': quotation.customer,
+        'items': items,
+        'filler_rows': range(max(0, FORM_ROWS - len(items))),
+        'tax_amount': quotation.grand_total - quotation.total_price,
+        'amount_in_words': amount_in_words,
+    }
+
+
+def render_quotation_html(target, quotation, items):
+    """Render the quotation through WeasyPrint into ``target`` (a path or file-like)."""
+    engine = get_engine()
+    with stage('template'):
+        html = compiled_template().render(quotation_context(quotation, items))
+    with stage('layout'):
+        engine.write_pdf(target, html)
@@ -1,383 +1,416 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.units import cm, mm
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Table, TableStyle, Paragraph
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Table
 from num2words import num2words
-import os
-from django.conf import settings
-from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-# AttributeError at /invoice/12/pdf/
-# 'Canvas' object has no attribute 'moveTo' what to do?
-# This error occurs when using an older version of reportlab. Ensure you have the latest version
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.pdfgen import canvas
-from django.conf import settings
-from django.http import HttpResponse
-import os
-from django.shortcuts import get_object_or_404
-from num2words import num2words
-from .models import Quotation, Customer
-from .models import QuotationItem
-from .models import Invoice, InvoiceItem, Customer
-
-
-
-class IFEXInvoice:
-    def __init__(self, filename):
-        self.filename = filename
-        self.width, self.height = A4
-        
-        # Colors
-        self.blue_color = colors.HexColor('#2f3e5b')
-        self.light_blue = colors.HexColor('#75cef5')
-        self.dark_blue = colors.HexColor('#2f3e5b')
-        self.light_gray = colors.HexColor('#F0F0F0')
-        self.white = colors.Color(1, 1, 1)
-        self.black = colors.Color(0, 0, 0)
-        
-    def create_invoice(self, invoice_data):
-        c = canvas.Canvas(self.filename, pagesize=A4)
-        
-        # Draw all components
-        self._draw_header(c, invoice_data)
-        self._draw_invoice_info(c, invoice_data)
-        self._draw_customer_section(c, invoice_data)
-        self._draw_items_table(c, invoice_data)
-        self._draw_totals(c, invoice_data)
-        self._draw_signatures(c)
-        self._draw_footer(c, invoice_data)
-        
-        c.save()
-    
-    def _draw_header(self, c, data):
+from .models import Invoice
+from .assets import get_image
+from . import pdf_cache
+from .responses import pdf_file_response
+from .conditional import conditional, pdf_tag, invoice_modified
+from .pdf_executor import bounded_render
+from .timing import stage
+from .pdf_layout import (
+    DocumentTemplate, Region, ItemTable, Column, ITEMS, FIRST, LATER, LAST, render_documents,
+)
+from .pdf_styles import (
+    BLACK, LOGO_DARK_BLUE, LOGO_MEDIUM_BLUE, INVOICE_BLUE, INVOICE_FALLBACK_BLUE,
+    INVOICE_FOOTER_BLUE, INVOICE_ITEM_STYLE, INVOICE_SALES_STYLE, INVOICE_ITEMS_STYLE,
+    INVOICE_ITEMS_TOTAL_STYLE,
+)
+
+
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+
+def draw_invoice_header(c, data, page=None):
     # Header banner image that contains both logo and company details
-        banner_path = None
-        banner_paths = [
-            os.path.join(settings.BASE_DIR, 'static', 'images', 'header_banner.png'),
-            os.path.join(settings.BASE_DIR, 'static', 'images', 'banner.png'),
-            os.path.join(settings.BASE_DIR, 'static', 'images', 'ifex_header.png'),
-            os.path.join(settings.STATIC_ROOT, 'images', 'header_banner.png') if settings.STATIC_ROOT else None,
-            os.path.join(settings.STATIC_ROOT, 'images', 'banner.png') if settings.STATIC_ROOT else None,
-            os.path.join(settings.STATIC_ROOT, 'images', 'ifex_header.png') if settings.STATIC_ROOT else None,
-        ]
-        
-        for path in [p for p in banner_paths if p is not None]:
-            if os.path.exists(path):
-                banner_path = path
-                break
-
-        if banner_path:
-            # Draw the complete header banner
-            # Adjust width and height based on your banner image dimensions
-            c.drawImage(banner_path, 10, self.height - 100, width=555, height=80)
-        else:
-            # Fallback - recreate the header design if banner image is not found
-            self._draw_fallback_header(c, data)
-
-    def _draw_fallback_header(self, c, data):
-        """Fallback header design if banner image is not available"""
-        # Logo on the left
-        circle_y = self.height - 80
-        c.setFillColor(colors.Color(0, 0.5, 0.78))
-        c.circle(70, circle_y, 12, fill=1, stroke=0)
-        c.setFillColor(colors.HexColor('#4B7BA7'))
-        c.circle(88, circle_y-3, 10, fill=1, stroke=0)
-        c.setFillColor(colors.Color(0.25, 0.41, 0.88))
-        c.circle(103, circle_y+2, 8, fill=1, stroke=0)
-        c.setFillColor(colors.HexColor('#4B7BA7'))
-        c.setFont("Helvetica-Bold", 36)
-        c.drawString(120, circle_y-6, "ifex")
-        
-        # Dark blue header box with arrow shape
-        c.setFillColor(self.dark_blue)
-        # Main rectangle
-        c.rect(280, self.height - 100, 280, 65, fill=1, stroke=0)
-        
-        # Arrow shape on left side of blue box
-        c.setFillColor(self.blue_color)
-        points = [
-            (260, self.height - 100),
-            (280, self.height - 100),
-            (280, self.height - 35),
-            (260, self.height - 35),
-            (240, self.height - 67.5)
-        ]
-        p = c.beginPath()
-        p.moveTo(points[0][0], points[0][1])
-        for point in points[1:]:
-            p.lineTo(point[0], point[1])
-        p.close()
-        c.drawPath(p, fill=1, stroke=0)
-        
-        # White text in header
-        c.setFillColor(colors.white)
-        c.setFont("Helvetica", 9)
-        
-        # Header text - right aligned
-        header_lines = [
-            ("IFEX PR AND ADVERTISING EST", self.height - 57),
-            ("C.R.No. 4030434660", self.height - 69),
-            ("Ind. Area 3, Al Qusais, Dubai", self.height - 81),
-            ("E mail: info@ifexprint.com", self.height - 93),
-            ("www.ifexprint.com", self.height - 105)
-        ]
-        
-        for text, y_pos in header_lines:
-            text_width = c.stringWidth(text, "Helvetica", 9)
-            c.drawString(550 - text_width, y_pos, text)
-        
-    def _draw_invoice_info(self, c, data):
-        # TAX INVOICE title
-        c.setFont("Helvetica-Bold", 18)
-        c.setFillColor(self.blue_color)
-        c.drawString(50, self.height - 140, "TAX INVOICE")
-        
-        # Invoice details on the right
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        
-        # Labels
-        labels_x = 380
-        c.drawString(labels_x, self.height - 130, "INVOICE NO")
-        c.drawString(labels_x, self.height - 145, "DATE")
-        c.drawString(labels_x, self.height - 160, "PO NO.")
-        
-        # Values
-        values_x = 480
-        c.drawString(values_x, self.height - 130, str(data.get('invoice_number', '')))
-        c.drawString(values_x, self.height - 145, data.get('invoice_date', ''))
-        c.drawString(values_x, self.height - 160, data.get('po_number', ''))
-        
-        # TRN line
-        c.drawString(50, self.height - 180, f"TRN. {data.get('trn', '104106033400003')}")
-        
-        # Horizontal line
-        c.setStrokeColor(colors.black)
-        c.line(50, self.height - 190, 560, self.height - 190)
-    
-    def _draw_customer_section(self, c, data):
-        # TO label
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        c.drawString(50, self.height - 210, "TO")
-        
-        # Customer details
-        customer = data.get('customer', {})
-        c.drawString(80, self.height - 210, customer.get('name', ''))
-        c.drawString(80, self.height - 225, customer.get('address', ''))
-        c.drawString(80, self.height - 240, customer.get('address_line1', ''))
-        c.drawString(80, self.height - 255, customer.get('address_line2', ''))
-                
-        # # Amount box on the right
-        # c.setStrokeColor(colors.black)
-        # c.rect(420, self.height - 265, 120, 25, fill=0, stroke=1)
-        # c.drawString(430, self.height - 255, f"{data.get('grand_total', 0):.2f}")
-    
-    def _draw_items_table(self, c, data):
-        # Table data
-        table_data = []
-        
-        # Header row with blue background
-        headers = [
-            ['SALES PERSON', 'LPO DATE', 'DELIVERY DATE', 'PAYMENT TERMS'],
-            [data.get('sales_person', ''), 
-             data.get('lpo_date', ''), 
-             data.get('delivery_date', ''), 
-             data.get('payment_terms', '')]
-        ]
-        
-        # Items header
-        items_header = ['NO', 'DESCRIPTION', 'QTY', 'RATE', 'TAX\nAMOUNT', '%', 'LINE TOTAL']
-        
-        # Get items from data
-        items = data.get('invoice_items', [])
-        
-        # Create table starting position
-        table_y = self.height - 320
-        
-        # Draw sales info table
-        sales_table = Table(headers, colWidths=[127.5, 127.5, 127.5, 127.5])
-        sales_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), self.blue_color),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ROWBACKGROUNDS', (0, 1), (-1, 1), [colors.white]),
-        ]))
-        
-        sales_table.wrapOn(c, self.width, self.height)
-        sales_table.drawOn(c, 50, table_y)
-        
-        # Draw items table
-        items_data = [items_header]
-        
-        # Add item rows
-        for item in items:
-            row = [
-                str(item.get('no', '')),
-                item.get('item_name', ''),
-                str(item.get('quantity', '')),
-                f"{item.get('price', 0):.2f}" if item.get('price') else '',
-                f"{item.get('tax_amount', 0):.2f}" if item.get('tax_amount') else '',
-                f"{item.get('tax_percent', 0):.2f}" if item.get('tax_percent') else '',
-                f"{item.get('line_total', 0):.2f}" if item.get('line_total') else ''
-            ]
-            items_data.append(row)
-        
-        # Add empty rows to match the invoice layout
-        for i in range(15 - len(items)):
-            items_data.append(['', '', '', '', '', '', ''])
-        
-        # Add total row
-        items_data.append(['', 'TOTAL', '', '', 
-                          f"{data.get('total_tax_amount', 0):.2f}", 
-                          f"{data.get('tax', 0):.2f}", 
-                          f"{data.get('grand_total', 0):.2f}"])
-        
-        # Create items table
-        col_widths = [30, 200, 50, 50, 60, 40, 80]
-        items_table = Table(items_data, colWidths=col_widths)
-        
-        # Table styling
-        items_table.setStyle(TableStyle([
-            # Header row
-            ('BACKGROUND', (0, 0), (-1, 0), self.blue_color),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 8),
-            
-            # All cells
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -2), 9),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),  # NO column
-            ('ALIGN', (2, 0), (-1, -1), 'CENTER'),  # All numeric columns
-            
-            # Total row
-            ('BACKGROUND', (0, -1), (-1, -1), self.light_gray),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            
-            # Row heights
-            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.white]),
-            ('LEFTPADDING', (1, 0), (1, -1), 5),
-
-            
-
-
-        ]))
-        
-        # Draw the items table
-        items_table.wrapOn(c, self.width, self.height)
-        items_table.drawOn(c, 50, 200)
-    
-    def _draw_totals(self, c, data):
-        # Amount in words
-        c.setFont("Helvetica-Bold", 9)
-        c.drawString(50, 180, data.get('amount_in_words', ''))
-    
-    def _draw_signatures(self, c):
-        # Signature section
-        c.setFont("Helvetica", 10)
-        c.drawString(50, 160, "Prepared by:")
-        c.drawString(400, 160, "Received by:")
-        
-        # # Signature lines
-        # c.line(50, 145, 150, 145)
-        # c.line(300, 145, 400, 145)
-            
-        # Footer logo
-        footer_logo_path = None
-        footer_logo_paths = [
-            os.path.join(settings.BASE_DIR, 'static', 'images', 'footerlogo.png'),
-            os.path.join(settings.STATIC_ROOT, 'images', 'footerlogo.png') if settings.STATIC_ROOT else None,
-        ]
-        
-        for path in [p for p in footer_logo_paths if p is not None]:
-            if os.path.exists(path):
-                footer_logo_path = path
-                break
-
-        if footer_logo_path:
-            c.drawImage(footer_logo_path, 45, 80, width=130, height=70, preserveAspectRatio=True)
-        
-        # # Arabic text below logo
-        # c.setFont("Helvetica", 9)
-        # c.drawString(60, 65, "Ù…Ø¤Ø³Ø³Ø© Ø¥ÙÙŠÙƒØ³ Ù„Ù„Ø¹Ù„Ø§Ù‚Ø§Øª Ø§Ù„Ø¹Ø§Ù…Ø© ÙˆØ§Ù„Ø¥Ø¹Ù„Ø§Ù†")
-        
-        # # Company name
-        # c.setFont("Helvetica-Bold", 12)
-        # c.drawString(200, 90, "IFEX")
-        # c.setFont("Helvetica", 9)
-        # c.drawString(230, 90, "PR &")
-        
-        # # ADVERTISING EST.
-        # c.setFont("Helvetica", 8)
-        # c.drawString(190, 75, "ADVERTISING EST.")
-        
-        # # Location
-        # c.drawString(210, 60, "Dubai - UAE")
-    
-    def _draw_footer(self, c, data):
-        # Blue footer bar
-        c.setFillColor("#3b5e91")
-        c.rect(40, 10, self.width - 80, 50, fill=1, stroke=0)
-        
-        # Footer text in white
-        c.setFillColor(colors.white)
-        c.setFont("Helvetica", 8)
-        
-        # Bank details line 1
-        footer_text1 = "BANK DETAILS : IFEX PR AND ADVERTISING EST"
-        c.drawString(200, 38, footer_text1)
-        
-        # Bank details line 2
-        footer_text2 = "ADCB : SHARJAH MAIN BRANCH, SWIFT CODE : ADCBAEAA050"
-        c.drawString(170, 28, footer_text2)
-        
-        # Bank details line 3
-        footer_text3 = "IBAN : AE02 0030 0130 3885 8920 001"
-        c.drawString(230, 18, footer_text3)
+    banner = get_image('banner')
 
+    if banner:
+        # Draw the complete header banner
+        # Adjust width and height based on your banner image dimensions
+        c.drawImage(banner, 10, PAGE_HEIGHT - 100, width=555, height=80)
+    else:
+        # Fallback - recreate the header design if banner image is not found
+        draw_fallback_header(c, data)
 
-# Main view function for generating invoice PDF
-def generate_invoice_pdf(request, invoice_id):
-    """
-    Generate invoice PDF with data from Django models
-    
-    Args:
-        request: Django request object
-        invoice_id: ID of the invoice to generate
+
+def draw_fallback_header(c, data):
+    """Fallback header design if banner image is not available"""
+    height = PAGE_HEIGHT
+    # Logo on the left
+    circle_y = height - 80
+    c.setFillColor(LOGO_DARK_BLUE)
+    c.circle(70, circle_y, 12, fill=1, stroke=0)
+    c.setFillColor(INVOICE_FALLBACK_BLUE)
+    c.circle(88, circle_y-3, 10, fill=1, stroke=0)
+    c.setFillColor(LOGO_MEDIUM_BLUE)
+    c.circle(103, circle_y+2, 8, fill=1, stroke=0)
+    c.setFillColor(INVOICE_FALLBACK_BLUE)
+    c.setFont("Helvetica-Bold", 36)
+    c.drawString(120, circle_y-6, "ifex")
+
+    # Dark blue header box with arrow shape
+    c.setFillColor(INVOICE_BLUE)
+    # Main rectangle
+    c.rect(280, height - 100, 280, 65, fill=1, stroke=0)
+
+    # Arrow shape on left side of blue box
+    c.setFillColor(INVOICE_BLUE)
+    points = [
+        (260, height - 100),
+        (280, height - 100),
+        (280, height - 35),
+        (260, height - 35),
+        (240, height - 67.5)
+    ]
+    p = c.beginPath()
+    p.moveTo(points[0][0], points[0][1])
+    for point in points[1:]:
+        p.lineTo(point[0], point[1])
+    p.close()
+    c.drawPath(p, fill=1, stroke=0)
+
+    # White text in header
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica", 9)
+
+    # Header text - right aligned
+    header_lines = [
+        ("IFEX PR AND ADVERTISING EST", height - 57),
+        ("C.R.No. 4030434660", height - 69),
+        ("Ind. Area 3, Al Qusais, Dubai", height - 81),
+        ("E mail: info@ifexprint.com", height - 93),
+        ("www.ifexprint.com", height - 105)
+    ]
+
+    for text, y_pos in header_lines:
+        text_width = c.stringWidth(text, "Helvetica", 9)
+        c.drawString(550 - text_width, y_pos, text)
+
+
+def draw_invoice_info(c, data, page=None):
+    height = PAGE_HEIGHT
+    # TAX INVOICE title
+    c.setFont("Helvetica-Bold", 18)
+    c.setFillColor(INVOICE_BLUE)
+    c.drawString(50, height - 140, "TAX INVOICE")
+
+    # Invoice details on the right
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+
+    # Labels
+    labels_x = 380
+    c.drawString(labels_x, height - 130, "INVOICE NO")
+    c.drawString(labels_x, height - 145, "DATE")
+    c.drawString(labels_x, height - 160, "PO NO.")
+
+    # Values
+    values_x = 480
+    c.drawString(values_x, height - 130, str(data.get('invoice_number', '')))
+    c.drawString(values_x, height - 145, data.get('invoice_date', ''))
+    c.drawString(values_x, height - 160, data.get('po_number', ''))
+
+    # TRN line
+    c.drawString(50, height - 180, f"TRN. {data.get('trn', '104106033400003')}")
+
+    # Horizontal line
+    c.setStrokeColor(colors.black)
+    c.line(50, height - 190, 560, height - 190)
+
+
+def draw_invoice_customer(c, data, page=None):
+    height = PAGE_HEIGHT
+    # TO label
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    c.drawString(50, height - 210, "TO")
+
+    # Customer details
+    customer = data.get('customer', {})
+    c.drawString(80, height - 210, customer.get('name', ''))
+    c.drawString(80, height - 225, customer.get('address', ''))
+    c.drawString(80, height - 240, customer.get('address_line1', ''))
+    c.drawString(80, height - 255, customer.get('address_line2', ''))
+
+
+def draw_invoice_sales_table(c, data, page=None):
+    # Header row with blue background
+    headers = [
+        ['SALES PERSON', 'LPO DATE', 'DELIVERY DATE', 'PAYMENT TERMS'],
+        [data.get('sales_person', ''),
+         data.get('lpo_date', ''),
+         data.get('delivery_date', ''),
+         data.get('payment_terms', '')]
+    ]
+
+    # Create table starting position
+    table_y = PAGE_HEIGHT - 320
+
+    # Draw sales info table
+    sales_table = Table(headers, colWidths=[127.5, 127.5, 127.5, 127.5])
+    sales_table.setStyle(INVOICE_SALES_STYLE)
+
+    sales_table.wrapOn(c, PAGE_WIDTH, PAGE_HEIGHT)
+    sales_table.drawOn(c, 50, table_y)
+
+
+def draw_invoice_continuation_header(c, data, page=None):
+    c.setFillColor(BLACK)
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, PAGE_HEIGHT - 130, "TAX INVOICE (continued)")
+    c.setFont("Helvetica-Bold", 10)
+    c.drawRightString(PAGE_WIDTH - 35, PAGE_HEIGHT - 130, f"INVOICE NO  {data.get('invoice_number', '')}")
+    c.setFont("Helvetica", 10)
+    c.drawRightString(PAGE_WIDTH - 35, PAGE_HEIGHT - 145, f"DATE  {data.get('invoice_date', '')}")
+
+
+def draw_invoice_page_number(c, data, page):
+    if page.count == 1:
+        return
+    c.setFillColor(BLACK)
+    c.setFont("Helvetica", 8)
+    c.drawRightString(PAGE_WIDTH - 40, 64, f"Page {page.number} of {page.count}")
+
+
+def draw_invoice_totals(c, data, page=None):
+    # Amount in words
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(50, 180, data.get('amount_in_words', ''))
+
+
+def draw_invoice_signatures(c, data, page=None):
+    # Signature section
+    c.setFont("Helvetica", 10)
+    c.drawString(50, 160, "Prepared by:")
+    c.drawString(400, 160, "Received by:")
+
+    # Footer logo
+    footer_logo = get_image('footer_logo')
+
+    if footer_logo:
+        c.drawImage(footer_logo, 45, 80, width=130, height=70, preserveAspectRatio=True)
+
+
+def draw_invoice_footer(c, data, page=None):
+    # Blue footer bar
+    c.setFillColor(INVOICE_FOOTER_BLUE)
+    c.rect(40, 10, PAGE_WIDTH - 80, 50, fill=1, stroke=0)
+
+    # Footer text in white
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica", 8)
+
+    # Bank details line 1
+    footer_text1 = "BANK DETAILS : IFEX PR AND ADVERTISING EST"
+    c.drawString(200, 38, footer_text1)
+
+    # Bank details line 2
+    footer_text2 = "ADCB : SHARJAH MAIN BRANCH, SWIFT CODE : ADCBAEAA050"
+    c.drawString(170, 28, footer_text2)
+
+    # Bank details line 3
+    footer_text3 = "IBAN : AE02 0030 0130 3885 8920 001"
+    c.drawString(230, 18, footer_text3)
+
+
+def _amount(key):
+    return lambda n, item: f"{item.get(key, 0):.2f}" if item.get(key) else ''
+
+
+def invoice_total_row(data):
+    return ['', 'TOTAL', '', '',
+            f"{data.get('total_tax_amount', 0):.2f}",
+            f"{data.get('tax', 0):.2f}",
+            f"{data.get('grand_total', 0):.2f}"]
+
+
+# Item table geometry. The first page starts the table under the sales info
+# table, continuation pages right under the banner. Rows may run down to the
+# page number above the footer bar, except on the last page, which ends at
+# the TOTAL row with amount in words and signatures below. The delivery
+# order uses the same geometry and description column, so the invoice's
+# Layout (row heights and page breaks) serves both documents.
+INVOICE_TABLE_GEOMETRY = dict(
+    x=50,
+    top=PAGE_HEIGHT - 324,
+    later_top=PAGE_HEIGHT - 150,
+    bottom=76,
+    last_bottom=200,
+    header_height=30,
+    row_height=18,
+    padding=(11, 6),
+)
+
+ITEM_NO_COLUMN = Column('NO', 30, lambda n, item: str(item.get('no', '')))
+ITEM_DESCRIPTION_COLUMN = Column(
+    'DESCRIPTION', 200, lambda n, item: item.get('item_name', ''), wrap=INVOICE_ITEM_STYLE,
+)
+
+INVOICE_TEMPLATE = DocumentTemplate(
+    'invoice',
+    regions=[
+        Region(draw_invoice_header, static=True),
+        Region(draw_invoice_info, pages=FIRST),
+        Region(draw_invoice_customer, pages=FIRST),
+        Region(draw_invoice_sales_table, pages=FIRST),
+        Region(draw_invoice_continuation_header, pages=LATER),
+        ITEMS,
+        Region(draw_invoice_totals, pages=LAST),
+        Region(draw_invoice_signatures, pages=LAST),
+        Region(draw_invoice_footer, static=True),
+        Region(draw_invoice_page_number),
+    ],
+    items=ItemTable(
+        columns=[
+            ITEM_NO_COLUMN,
+            ITEM_DESCRIPTION_COLUMN,
+            Column('QTY', 50, lambda n, item: str(item.get('quantity', ''))),
+            Column('RATE', 50, _amount('price')),
+            Column('TAX\nAMOUNT', 60, _amount('tax_amount')),
+            Column('%', 40, _amount('tax_percent')),
+            Column('LINE TOTAL', 80, _amount('line_total')),
+        ],
+        style=INVOICE_ITEMS_STYLE,
+        total_row=invoice_total_row,
+        last_style=INVOICE_ITEMS_TOTAL_STYLE,
+        **INVOICE_TABLE_GEOMETRY
+    ),
+)
+
+
+############ DELIVERY ORDER ############
+
+def draw_delivery_order_info(c, data, page=None):
+    height = PAGE_HEIGHT
+    c.setFont("Helvetica-Bold", 18)
+    c.setFillColor(INVOICE_BLUE)
+    c.drawString(50, height - 140, "DELIVERY ORDER")
+
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    labels_x = 380
+    c.drawString(labels_x, height - 130, "DO NO")
+    c.drawString(labels_x, height - 145, "DATE")
+    c.drawString(labels_x, height - 160, "INVOICE NO")
+
+    # Delivery orders are numbered after the invoice they ship
+    values_x = 480
+    c.drawString(values_x, height - 130, f"DO-{data.get('invoice_number', '')}")
+    c.drawString(values_x, height - 145, data.get('invoice_date', ''))
+    c.drawString(values_x, height - 160, str(data.get('invoice_number', '')))
+
+    c.drawString(50, height - 180, f"TRN. {data.get('trn', '104106033400003')}")
+    c.setStrokeColor(colors.black)
+    c.line(50, height - 190, 560, height - 190)
+
+
+def draw_delivery_order_continuation_header(c, data, page=None):
+    c.setFillColor(BLACK)
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, PAGE_HEIGHT - 130, "DELIVERY ORDER (continued)")
+    c.setFont("Helvetica-Bold", 10)
+    c.drawRightString(PAGE_WIDTH - 35, PAGE_HEIGHT - 130, f"DO NO  DO-{data.get('invoice_number', '')}")
+    c.setFont("Helvetica", 10)
+    c.drawRightString(PAGE_WIDTH - 35, PAGE_HEIGHT - 145, f"DATE  {data.get('invoice_date', '')}")
+
+
+def draw_delivery_order_acknowledgement(c, data, page=None):
+    c.setFillColor(BLACK)
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(50, 180, "Received the above goods in good order and condition.")
+
+    c.setFont("Helvetica", 10)
+    c.drawString(50, 160, "Delivered by:")
+    c.drawString(330, 160, "Received by (name, signature & stamp):")
+    c.setStrokeColor(colors.black)
+    c.line(50, 115, 230, 115)
+    c.line(330, 115, 545, 115)
+    c.setFont("Helvetica", 9)
+    c.drawString(50, 100, "Date:")
+    c.drawString(330, 100, "Date:")
+
+
+def delivery_order_total_row(data):
+    quantity = sum(item.get('quantity') or 0 for item in data.get('invoice_items', []))
+    return ['', 'TOTAL QUANTITY', str(quantity), '', '']
+
+
+# The invoice's items without any pricing, plus columns for the customer to
+# confirm what arrived
+DELIVERY_ORDER_TEMPLATE = DocumentTemplate(
+    'delivery_order',
+    regions=[
+        Region(draw_invoice_header, static=True),
+        Region(draw_delivery_order_info, pages=FIRST),
+        Region(draw_invoice_customer, pages=FIRST),
+        Region(draw_invoice_sales_table, pages=FIRST),
+        Region(draw_delivery_order_continuation_header, pages=LATER),
+        ITEMS,
+        Region(draw_delivery_order_acknowledgement, pages=LAST),
+        Region(draw_invoice_footer, static=True),
+        Region(draw_invoice_page_number),
+    ],
+    items=ItemTable(
+        columns=[
+            ITEM_NO_COLUMN,
+            ITEM_DESCRIPTION_COLUMN,
+            Column('QTY', 80, lambda n, item: str(item.get('quantity', ''))),
+            Column('RECEIVED\nQTY', 80, lambda n, item: ''),
+            Column('REMARKS', 120, lambda n, item: ''),
+        ],
+        style=INVOICE_ITEMS_STYLE,
+        total_row=delivery_order_total_row,
+        last_style=INVOICE_ITEMS_TOTAL_STYLE,
+        **INVOICE_TABLE_GEOMETRY
+    ),
+)
+
+# What each invoice document kind is made of: 'dispatch' is the invoice
+# followed by its delivery order in one PDF, as dispatch prints both
+INVOICE_DOCUMENTS = {
+    'invoice': (INVOICE_TEMPLATE,),
+    'delivery_order': (DELIVERY_ORDER_TEMPLATE,),
+    'dispatch': (INVOICE_TEMPLATE, DELIVERY_ORDER_TEMPLATE),
+}
+
+
+def render_invoice_pdf(target, invoice_data, kind='invoice', layout=None):
+    """Render an invoice dict (see build_invoice_data) as ``kind`` into ``target``.
+
+    ``layout`` is the invoice's measured Layout when the caller already has
+    it; every invoice document kind can reuse it.
     """
-    from .models import Invoice, InvoiceItem, Customer  # Import your models
-    
-    # Get invoice or return 404
-    invoice = get_object_or_404(Invoice, id=invoice_id)
-    invoice_items = invoice.items.all()
-    
-    # Get customer - either from invoice directly or from quotation
-    customer = None
+    items = invoice_data.get('invoice_items', [])
+    if layout is None:
+        layout = INVOICE_TEMPLATE.layout(items)
+    render_documents(
+        target, [(template, invoice_data, items, layout) for template in INVOICE_DOCUMENTS[kind]]
+    )
+
+
+def invoice_customer(invoice):
+    """The invoice's own customer, falling back to the quotation's."""
     if invoice.customer:
-        customer = invoice.customer
-    elif invoice.quotation and invoice.quotation.customer:
-        customer = invoice.quotation.customer
+        return invoice.customer
+    if invoice.quotation and invoice.quotation.customer:
+        return invoice.quotation.customer
+    return None
 
-    # Setup HTTP response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Invoice_{invoice.invoice_number}.pdf"'
 
+def build_invoice_data(invoice, invoice_items, customer):
+    """Turn an Invoice and its items into the dict the invoice templates render."""
     # Calculate totals
     total_amount = sum(item.total() for item in invoice_items)
     tax_amount = (total_amount * invoice.tax) / 100
     grand_total = total_amount + tax_amount
+    amount_in_words = ""
+    if grand_total:
+        with stage('num2words'):
+            amount_in_words = num2words(float(grand_total), lang='en').title() + " Dirhams Only"
 
     # Prepare invoice data
     invoice_data = {
@@ -393,6 +426,7 @@ def generate_invoice_pdf(request, invoice_id):
         },
         'sales_person': 'Zubair',  # Add sales_person field to model if needed
         'lpo_date': '',  # Add lpo_date field to model if needed
+        'quotation_date': invoice.quotation.created_at.strftime('%d/%m/%Y') if invoice.quotation else '',
         'delivery_date': invoice.quotation.expected_delivery_date if invoice.quotation else '',  # Add delivery_date field to model if needed
         'payment_terms': 'COD',  # Add payment_terms field to model if needed
         'invoice_items': [],
@@ -400,7 +434,7 @@ def generate_invoice_pdf(request, invoice_id):
         'tax': invoice.tax,
         'total_tax_amount': tax_amount,
         'grand_total': grand_total,
-        'amount_in_words': num2words(float(grand_total), lang='en').title() + " Dirhams Only" if grand_total else ""
+        'amount_in_words': amount_in_words
     }
     
     # Add items
@@ -415,14 +449,88 @@ def generate_invoice_pdf(request, invoice_id):
             'tax_percent': invoice.tax,
             'line_total': item.total() + item_tax_amount
         })
-    
-    # Generate the invoice
-    invoice_pdf = IFEXInvoice(response)
-    invoice_pdf.create_invoice(invoice_data)
-    
+
+    return invoice_data
+
+
+def cached_invoice_pdfs(invoice, kinds=('invoice',)):
+    """Return ``{kind: (path, hit)}`` for the invoice's documents.
+
+    Whatever isn't cached yet is rendered in one pass: the items are
+    fetched, turned into invoice data and measured once for all of them.
+    """
+    invoice_items = list(invoice.items.all())
+
+    # Get customer - either from invoice directly or from quotation
+    customer = invoice_customer(invoice)
+
+    # The invoice data covers everything any of the documents prints
+    key = pdf_cache.invoice_key(invoice, invoice_items, customer)
+    documents = {}
+    for kind in kinds:
+        path = pdf_cache.cache.get(kind, invoice.pk, key)
+        if path is not None:
+            documents[kind] = (path, True)
+
+    missing = [kind for kind in kinds if kind not in documents]
+    if missing:
+        invoice_data = build_invoice_data(invoice, invoice_items, customer)
+        layout = INVOICE_TEMPLATE.layout(invoice_data['invoice_items'])
+        for kind in missing:
+            path = pdf_cache.cache.put(
+                kind, invoice.pk, key,
+                lambda f, kind=kind: render_invoice_pdf(f, invoice_data, kind, layout),
+            )
+            documents[kind] = (path, False)
+    return documents
+
+
+def cached_invoice_pdf(invoice, kind='invoice'):
+    """Return ``(path, hit)`` for one of the invoice's PDFs, rendering it into the cache on a miss."""
+    return cached_invoice_pdfs(invoice, (kind,))[kind]
+
+
+def invoice_document_response(invoice_id, kind, filename):
+    invoice = get_object_or_404(
+        Invoice.objects.select_related('customer', 'quotation__customer'), id=invoice_id
+    )
+    path, hit = cached_invoice_pdf(invoice, kind)
+
+    response = pdf_file_response(path, filename.format(number=invoice.invoice_number))
+    response['X-PDF-Cache'] = 'hit' if hit else 'miss'
     return response
 
 
+# Main view function for generating invoice PDF
+@conditional(invoice_modified, pdf_tag('invoice'))
+@bounded_render
+def generate_invoice_pdf(request, invoice_id):
+    """
+    Generate invoice PDF with data from Django models, served from the
+    PDF cache when it was pre-rendered or hasn't changed since the last
+    download.
+    
+    Args:
+        request: Django request object
+        invoice_id: ID of the invoice to generate
+    """
+    return invoice_document_response(invoice_id, 'invoice', "Invoice_{number}.pdf")
+
+
+@conditional(invoice_modified, pdf_tag('delivery_order'))
+@bounded_render
+def delivery_order_pdf(request, invoice_id):
+    """The invoice's delivery order: same items and pages, no pricing."""
+    return invoice_document_response(invoice_id, 'delivery_order', "DO_{number}.pdf")
+
+
+@conditional(invoice_modified, pdf_tag('dispatch'))
+@bounded_render
+def dispatch_pdf(request, invoice_id):
+    """Invoice and delivery order in one PDF, for printing both at dispatch."""
+    return invoice_document_response(invoice_id, 'dispatch', "Dispatch_{number}.pdf")
+
+
 # Example usage for standalone testing
 if __name__ == "__main__":
     # Sample data for testing - replace with your actual data
@@ -460,6 +568,5 @@ if __name__ == "__main__":
     }
     
     # Generate the invoice
-    invoice_pdf = IFEXInvoice('test_invoice.pdf')
-    invoice_pdf.create_invoice(sample_data)
+    render_invoice_pdf('test_invoice.pdf', sample_data)
     print("Invoice generated successfully!")
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""Saving the item lines of a quotation or invoice form.
+
+The forms post the lines in order, each with the id of the item it was
+loaded from (``item_id``, empty for a line added in the browser). Items are
+listed by id, so a line keeps its item while the ids come in order; from
+the first line that doesn't (a new line inserted above others, or no ids
+posted at all) the remaining lines reuse the remaining items by position.
+Deleting line 1 of a 200-line quotation deletes one row and rewrites none.
+
+The difference is written set-wise: one ``bulk_update`` of the lines that
+changed, one ``bulk_create`` of the lines added and one DELETE of the items
+dropped, each statement carrying up to BATCH_SIZE rows. Editing a line
+writes one row instead of deleting and re-inserting them all.
+
+bulk_create and bulk_update send no model signals, and the item receivers
+in signals.py are held off for the deleted rows, so nothing runs once per
+row; ``save_items`` calls their once-per-parent equivalents instead. Call
+it in the transaction that saves the parent, so the parent and its lines
+are committed (or rolled back) together.
+"""
+from django.db import transaction
+
+from .models import Quotation
+from .signals import bulk_item_writes, quotation_items_written, invoice_items_written
+
+
+FIELDS = ('item_name', 'quantity', 'price')
+
+# Rows per INSERT / UPDATE statement (Django lowers it further where the
+# database limits the parameters of a query, as SQLite does)
+BATCH_SIZE = 100
+
+
+def posted_ids(data, count):
+    """The ``item_id`` of each of ``count`` posted lines (None for a new one), or None if they don't line up."""
+    ids = data.getlist('item_id')
+    if len(ids) != count:
+        return None
+    return [int(value) if value.isdigit() else None for value in ids]
+
+
+def diff(existing, lines):
+    """``(changed, added, removed)``: stored items updated in place, new line dicts, stale items.
+
+    ``existing`` are in id order; a line's optional ``'id'`` names its item.
+    """
+    by_id = {item.pk: item for item in existing}
+    pairs, last = [], None
+    for line in lines:
+        item = by_id.get(line.get('id'))
+        if item is None or (last is not None and item.pk <= last):
+            break
+        pairs.append((item, line))
+        last = item.pk
+    matched = len(pairs)
+    rest = [item for item in existing if last is None or item.pk > last]
+    pairs += zip(rest, lines[matched:])
+
+    changed = []
+    for item, line in pairs:
+        if any(getattr(item, name) != line[name] for name in FIELDS):
+            for name in FIELDS:
+                setattr(item, name, line[name])
+            changed.append(item)
+    kept = {item.pk for item, _ in pairs}
+    added = lines[len(pairs):]
+    return changed, added, [item for item in existing if item.pk not in kept]
+
+
+def save_items(parent, lines, existing=None):
+    """Make the items of ``parent`` (a quotation or invoice) the ``lines``, dicts of FIELDS, in order.
+
+    Each line may carry the ``'id'`` of the item it was loaded from (see
+    ``posted_ids``); without ids, lines are matched with items by position,
+    so removing an early line rewrites every later row. ``existing`` are
+    the stored items in id order, read if not given (pass ``[]`` for a
+    parent just created). Returns the number of rows written.
+    """
+    related = parent.items
+    model, using = related.model, parent._state.db
+    if existing is None:
+        existing = list(related.using(using).order_by('pk'))
+    changed, added, removed = diff(existing, lines)
+    if not (changed or added or removed):
+        return 0
+
+    # No savepoint of its own: a failure rolls back the caller's transaction
+    with transaction.atomic(using=using, savepoint=False):
+        if removed:
+            with bulk_item_writes(model, parent.pk):
+                for start in range(0, len(removed), BATCH_SIZE):
+                    batch = [item.pk for item in removed[start:start + BATCH_SIZE]]
+                    model.objects.using(using).filter(pk__in=batch).delete()
+        if changed:
+            model.objects.using(using).bulk_update(changed, FIELDS, batch_size=BATCH_SIZE)
+        if added:
+            model.objects.using(using).bulk_create(
+                [model(**{related.field.name: parent}, **{name: line[name] for name in FIELDS}) for line in added],
+                batch_size=BATCH_SIZE,
+            )
+
+        if isinstance(parent, Quotation):
+            quotation_items_written(parent.pk, using)
+        else:
+            invoice_items_written(parent.pk, using)
+    return len(changed) + len(added) + len(removed)
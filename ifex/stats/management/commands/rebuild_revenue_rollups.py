@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from stats import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily, monthly and customer-monthly revenue rollups from the invoices."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help="Database to rebuild (default: %(default)s).",
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only compare the rollups with the invoices; exit with an error if they differ.",
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not options['verify']:
+            counts = rollups.rebuild(using)
+            for model, count in counts.items():
+                self.stdout.write(f"{model._meta.verbose_name_plural}: {count} row(s)")
+
+        mismatches = rollups.verify(using)
+        for model, key, have, want in mismatches:
+            self.stderr.write(f"{model.__name__} {key}: {have}, invoices give {want}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} rollup row(s) disagree with the invoices")
+        self.stdout.write("Rollups match the invoices")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from stats import search
+
+
+class Command(BaseCommand):
+    help = "Create the quotation/invoice search index if needed and re-index every document."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help="Database to index (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        search.create_index(using)
+        engine = search.engine(using)
+        if engine is None:
+            self.stdout.write("No full-text index on this database; search scans the tables instead")
+            return
+        count = search.rebuild(using)
+        self.stdout.write(f"Indexed {count} quotation(s) and invoice(s) ({engine})")
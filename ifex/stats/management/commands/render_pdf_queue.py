@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from stats import render_queue
+
+
+class Command(BaseCommand):
+    help = "Render queued invoice/quotation PDFs into the PDF cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Drain the queue and exit instead of polling for new jobs.",
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        conn = render_queue.connect()
+        try:
+            if options['once']:
+                rendered = render_queue.drain(conn)
+                self.stdout.write(f"Rendered {rendered} PDF(s), {render_queue.pending_count(conn)} left in queue")
+            else:
+                self.stdout.write("Waiting for PDF render jobs (Ctrl+C to stop)")
+                render_queue.drain(conn, stop_when_empty=False, poll_interval=options['poll'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            conn.close()
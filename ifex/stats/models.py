@@ -1,6 +1,6 @@
 # quotation/models.py
 
-from django.db import models
+from django.db import models, router, transaction
 
 class Customer(models.Model):
     name = models.CharField(max_length=255)
@@ -8,6 +8,8 @@ class Customer(models.Model):
     city = models.CharField(max_length=100, null=True, blank=True)
     
     phone = models.CharField(max_length=20, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.name
 
@@ -17,11 +19,18 @@ class Quotation(models.Model):
     expected_delivery_date = models.DateField()
     payment_term = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # items bump it too (signals)
 
     tax = models.FloatField(default=0.0)  # % for whole quotation
     total_price = models.FloatField(editable=False)  # sum of all item totals
     grand_total = models.FloatField(editable=False)  # total + tax
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the lists, newest first
+            models.Index(fields=['created_at', 'id'], name='quotation_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         # Generate order number if not exists
         if not self.quotation_number:
@@ -65,6 +74,13 @@ class Invoice(models.Model):
     total_amount = models.FloatField()
     tax = models.FloatField(default=5.0)  # % for whole invoice
     grand_total = models.FloatField(editable=False)  # total + tax
+    updated_at = models.DateTimeField(auto_now=True)  # items bump it too (signals)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the invoice list, newest first
+            models.Index(fields=['invoice_date', 'id'], name='invoice_date_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.invoice_number:
@@ -75,7 +91,14 @@ class Invoice(models.Model):
             else:
                 new_number = 2001
             self.invoice_number = f"INV{new_number}"
-        super().save(*args, **kwargs)
+        # The revenue rollups lock the stored row in pre_save and apply the
+        # difference in post_save: both must be in one transaction
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Invoice, instance=self)):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Invoice, instance=self)):
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         if self.quotation:
@@ -93,3 +116,44 @@ class InvoiceItem(models.Model):
 
     def __str__(self):
         return f"{self.item_name} - {self.quantity} @ {self.price}"
+
+
+# Revenue rollups, kept up to date by signals (see rollups.py)
+
+class RevenueFigures(models.Model):
+    invoice_count = models.IntegerField(default=0)
+    net = models.FloatField(default=0.0)  # sum of total_amount
+    vat = models.FloatField(default=0.0)  # grand_total - total_amount
+    grand_total = models.FloatField(default=0.0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyRevenue(RevenueFigures):
+    day = models.DateField(unique=True)
+
+    def __str__(self):
+        return f"{self.day}: {self.grand_total}"
+
+
+class MonthlyRevenue(RevenueFigures):
+    month = models.DateField(unique=True)  # first day of the month
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.grand_total}"
+
+
+class CustomerMonthlyRevenue(RevenueFigures):
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, null=True, related_name='monthly_revenue')
+    month = models.DateField()  # first day of the month
+
+    class Meta:
+        unique_together = ('customer', 'month')
+        indexes = [
+            # The month's best customers, for the dashboard
+            models.Index(fields=['month', 'grand_total'], name='customer_revenue_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} {self.month:%Y-%m}: {self.grand_total}"
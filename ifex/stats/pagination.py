@@ -0,0 +1,148 @@
+"""Keyset (cursor) pagination for the list pages.
+
+A page is the next ``page_size`` rows after (or before) the sort key of a
+row the client has already seen, e.g. ``created_at < t OR (created_at = t
+AND id < n)`` in ``-created_at, -id`` order. With an index on the sort key
+the database reads only the page it returns, so deep pages cost the same as
+the first one. OFFSET pagination reads and discards every earlier row, and
+its pages shift when rows are added.
+
+The cursors in the ``?after=`` / ``?before=`` links are the key of the last
+or first row of the page, base64-encoded JSON. The ordering must end in a
+unique field (the id) so that ties are broken, and none of its fields may
+be NULL.
+
+Search results are ranked by relevance, not by a sort key, so they are paged
+by number instead (``?page=``, see ``NumberedPage``); the index ranks and
+pages them in one query.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+
+
+def page_size(request):
+    """``?page_size=``, within LIST_MAX_PAGE_SIZE; LIST_PAGE_SIZE by default."""
+    default = getattr(settings, 'LIST_PAGE_SIZE', 50)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, getattr(settings, 'LIST_MAX_PAGE_SIZE', 500)))
+
+
+def encode_cursor(values):
+    text = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        raise BadRequest("Invalid page cursor")
+
+
+def beyond(keys, values, backwards):
+    """Rows after ``values`` in the ``keys`` ordering (before them if ``backwards``)."""
+    condition = None
+    for (name, descending), value in reversed(list(zip(keys, values))):
+        op = 'lt' if descending != backwards else 'gt'
+        strict = Q(**{f'{name}__{op}': value})
+        condition = strict if condition is None else strict | (Q(**{name: value}) & condition)
+    # The redundant bound on the first key lets the database range-scan its index
+    (name, descending), value = keys[0], values[0]
+    op = 'lte' if descending != backwards else 'gte'
+    return Q(**{f'{name}__{op}': value}) & condition
+
+
+class Page:
+    """One page of rows plus the query strings of its neighbours."""
+
+    def __init__(self, rows, params, next_key=None, previous_key=None):
+        self.rows = rows
+        self.next_url = self.link(params, 'after', next_key)
+        self.previous_url = self.link(params, 'before', previous_key)
+
+    @staticmethod
+    def link(params, direction, key):
+        if key is None:
+            return None
+        params = params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[direction] = encode_cursor(key)
+        return '?' + params.urlencode()
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_url or self.previous_url)
+
+
+def page_number(request):
+    """``?page=``, from 1; 1 if missing or invalid."""
+    try:
+        return max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        return 1
+
+
+class NumberedPage(Page):
+    """One page of ranked rows, linked to its neighbours by ``?page=`` number."""
+
+    def __init__(self, rows, params, number, has_next):
+        self.rows = rows
+        self.number = number
+        self.next_url = self.numbered_link(params, number + 1) if has_next else None
+        self.previous_url = self.numbered_link(params, number - 1) if number > 1 else None
+
+    @staticmethod
+    def numbered_link(params, number):
+        params = params.copy()
+        params['page'] = str(number)
+        return '?' + params.urlencode()
+
+
+def keyset_page(request, queryset, ordering):
+    """The page of ``queryset`` in ``ordering`` (e.g. ``('-created_at', '-id')``) the request asks for."""
+    keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    fields = [queryset.model._meta.get_field(name) for name, _ in keys]
+    size = page_size(request)
+
+    after, before = request.GET.get('after'), request.GET.get('before')
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+
+    if backwards:
+        # Walk the reversed ordering from the cursor, then flip the page back
+        reverse = [name[1:] if name.startswith('-') else '-' + name for name in ordering]
+        queryset = queryset.order_by(*reverse)
+    else:
+        queryset = queryset.order_by(*ordering)
+    if cursor is not None:
+        queryset = queryset.filter(beyond(keys, decode_cursor(cursor, fields), backwards))
+
+    rows = list(queryset[:size + 1])
+    more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+
+    def key(row):
+        return [getattr(row, field.attname) for field in fields]
+
+    if not rows:
+        return Page(rows, request.GET)
+    has_next = True if backwards else more
+    has_previous = more if backwards else cursor is not None
+    return Page(
+        rows, request.GET,
+        next_key=key(rows[-1]) if has_next else None,
+        previous_key=key(rows[0]) if has_previous else None,
+    )
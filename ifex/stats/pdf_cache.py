@@ -0,0 +1,224 @@
+"""Content-addressed on-disk cache for rendered invoice and quotation PDFs.
+
+A cached file lives at ``PDF_CACHE_DIR/<kind>/<pk>/<key>.pdf`` where ``key``
+hashes everything that ends up on the page: the record, its items, the
+customer and TEMPLATE_VERSION. Editing a record changes its key, so stale
+files are never served; the save/delete signals in ``stats.signals`` drop a
+record's directory straight away to give the space back. Total size is
+bounded by ``PDF_CACHE_MAX_BYTES`` with least-recently-used eviction (hits
+touch the file's mtime).
+
+The cache keeps a running total of the bytes it holds, counted from disk
+once and then updated as files are written and invalidated, so a write
+only walks the cache directory when the total goes over the limit. Eviction
+then frees space down to EVICT_TO of the limit, so a full cache is walked
+once per tenth of its size written rather than on every write. Other
+processes' writes aren't in the total until its next walk; the cache can
+briefly exceed the limit by what they wrote.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from django.conf import settings
+
+from .assets import registry
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to the PDF layout code should invalidate old files
+TEMPLATE_VERSION = '5'
+
+# Eviction frees space down to this fraction of PDF_CACHE_MAX_BYTES
+EVICT_TO = 0.9
+
+
+def _customer_fields(customer):
+    if customer is None:
+        return None
+    return [customer.pk, customer.name, customer.address, customer.city, customer.phone]
+
+
+def _digest(payload):
+    payload['template'] = TEMPLATE_VERSION
+    payload['assets'] = registry.signature()
+    blob = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def document_version():
+    """Short hash of what shapes every PDF besides its record (layout code, assets)."""
+    return _digest({})[:16]
+
+
+def invoice_key(invoice, items, customer):
+    quotation = invoice.quotation
+    return _digest({
+        'invoice': [
+            invoice.pk, invoice.invoice_number, invoice.invoice_date,
+            invoice.total_amount, invoice.tax, invoice.grand_total,
+        ],
+        'quotation': [quotation.pk, quotation.expected_delivery_date] if quotation else None,
+        'customer': _customer_fields(customer),
+        'items': [[item.item_name, item.quantity, item.price] for item in items],
+    })
+
+
+def quotation_key(quotation, items):
+    return _digest({
+        'quotation': [
+            quotation.pk, quotation.quotation_number, quotation.created_at,
+            quotation.expected_delivery_date, quotation.payment_term,
+            quotation.tax, quotation.total_price, quotation.grand_total,
+        ],
+        'customer': _customer_fields(quotation.customer),
+        'items': [[item.item_name, item.quantity, item.price] for item in items],
+    })
+
+
+class PDFCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Running total of the bytes under ``_total_root``; None until counted
+        self._total = None
+        self._total_root = None
+
+    @property
+    def root(self):
+        return str(settings.PDF_CACHE_DIR)
+
+    @property
+    def max_bytes(self):
+        return settings.PDF_CACHE_MAX_BYTES
+
+    def path_for(self, kind, pk, key):
+        return os.path.join(self.root, kind, str(pk), f'{key}.pdf')
+
+    def get(self, kind, pk, key):
+        """Return the path of the cached PDF, or None on a miss."""
+        path = self.path_for(kind, pk, key)
+        try:
+            os.utime(path)
+        except OSError:
+            self._count('misses')
+            logger.info('pdf cache miss %s %s', kind, pk)
+            return None
+        self._count('hits')
+        logger.info('pdf cache hit %s %s', kind, pk)
+        return path
+
+    def put(self, kind, pk, key, render):
+        """Render into the cache with ``render(fileobj)`` and return the new path.
+
+        The file is written under a temporary name and renamed into place, so
+        a concurrent reader never sees a partial PDF.
+        """
+        path = self.path_for(kind, pk, key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                render(f)
+            replaced = _size(path)  # a concurrent render of the same key
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.add(path, replaced)
+        return path
+
+    def get_or_render(self, kind, pk, key, render):
+        """Return ``(path, hit)``, rendering into the cache on a miss."""
+        path = self.get(kind, pk, key)
+        if path is not None:
+            return path, True
+        return self.put(kind, pk, key, render), False
+
+    def add(self, path, replaced=0):
+        """Count a file just written into the cache, evicting if that takes it over the limit.
+
+        ``replaced`` is the size of a file it overwrote. PDFs and their PNG
+        previews (see thumbnails) count alike.
+        """
+        with self._lock:
+            counted = self._total_root == self.root
+            if counted:
+                self._total += _size(path) - replaced
+                over = self._total > self.max_bytes
+        if not counted or over:
+            self.evict(keep=path)
+
+    def invalidate(self, kind, pk):
+        directory = os.path.join(self.root, kind, str(pk))
+        freed = sum(size for _, size, _ in self.scan(directory))
+        shutil.rmtree(directory, ignore_errors=True)
+        with self._lock:
+            if self._total_root == self.root:
+                self._total = max(0, self._total - freed)
+
+    def scan(self, directory=None):
+        """``(mtime, size, path)`` of every PDF and preview under ``directory`` (default: all)."""
+        entries = []
+        for dirpath, _, filenames in os.walk(directory or self.root):
+            for name in filenames:
+                if not name.endswith(('.pdf', '.png')):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self, keep=None):
+        """Recount the cache from disk and, if it is over the limit, evict least recently used files.
+
+        Frees space down to EVICT_TO of PDF_CACHE_MAX_BYTES.
+        """
+        root = self.root
+        entries = self.scan(root)
+        total = sum(size for _, size, _ in entries)
+
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TO
+            entries.sort()
+            for _, size, path in entries:
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                self._count('evictions')
+                if total <= target:
+                    break
+        with self._lock:
+            self._total, self._total_root = total, root
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+cache = PDFCache()
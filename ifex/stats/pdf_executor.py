@@ -0,0 +1,123 @@
+"""Bounded executor for the PDF views.
+
+The PDF views are async views (see ``bounded_render``). Under ASGI the event
+loop hands each render to a small pool of PDF_RENDER_CONCURRENCY threads, so
+a burst of downloads can't take every worker thread from the list and form
+pages. At most PDF_RENDER_QUEUE_DEPTH further renders wait for a free
+thread. Anything beyond that is answered at once with 503 and a Retry-After
+of PDF_RENDER_RETRY_AFTER seconds instead of queueing until it times out.
+
+Renders run on threads rather than on the export process pool because they
+read the database and write the PDF cache. ReportLab holds the GIL while it
+draws, so a few threads are enough to keep a core busy without starving the
+event loop.
+
+Under ASGI the PDF is streamed from an async iterator (see
+``responses.asgi_streaming``) rather than read into memory by the handler.
+
+Under WSGI the server's own threads already bound the renders, and a pool
+thread would only add a second thread and database connection per request.
+There (and wherever PDF_RENDER_INLINE is True, as in the tests, whose
+transaction a pool thread's connection can't see) a render runs inline on
+the request's thread; the queue limit still applies.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponse
+
+from .responses import asgi_streaming
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+class RenderExecutor:
+    def __init__(self, workers, queue_depth):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-render')
+        self.limit = workers + queue_depth
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    async def run(self, fn, *args, inline=False, **kwargs):
+        """Await ``fn(*args, **kwargs)`` on a render thread, or raise RenderQueueFull.
+
+        ``inline`` runs it on the calling request's thread instead.
+        """
+        with self.lock:
+            if self.pending >= self.limit:
+                raise RenderQueueFull
+            self.pending += 1
+        try:
+            if inline:
+                return await sync_to_async(fn)(*args, **kwargs)
+            return await sync_to_async(
+                _in_render_thread, thread_sensitive=False, executor=self.executor,
+            )(fn, *args, **kwargs)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+
+def _in_render_thread(fn, *args, **kwargs):
+    # Render threads outlive requests: drop broken or expired connections
+    # the way Django does around each request
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor():
+    """The per-process render executor, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RenderExecutor(
+                getattr(settings, 'PDF_RENDER_CONCURRENCY', 4),
+                getattr(settings, 'PDF_RENDER_QUEUE_DEPTH', 16),
+            )
+        return _executor
+
+
+def busy_response():
+    response = HttpResponse(
+        "Too many PDFs are being generated right now. Please try again shortly.",
+        status=503, content_type='text/plain',
+    )
+    response['Retry-After'] = str(getattr(settings, 'PDF_RENDER_RETRY_AFTER', 5))
+    return response
+
+
+def render_inline(request):
+    inline = getattr(settings, 'PDF_RENDER_INLINE', None)
+    if inline is None:
+        return not isinstance(request, ASGIRequest)
+    return inline
+
+
+def bounded_render(view):
+    """Turn a synchronous PDF view into an async view run on the render executor.
+
+    Apply ``conditional`` outside it, so revalidations are answered without
+    taking a render slot.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            response = await get_render_executor().run(view, request, *args, inline=render_inline(request), **kwargs)
+        except RenderQueueFull:
+            return busy_response()
+        return asgi_streaming(request, response)
+    return wrapper
@@ -0,0 +1,368 @@
+"""Declarative document layout shared by the PDF generators.
+
+A ``DocumentTemplate`` describes a document as a list of page regions
+(letterhead, customer block, totals, footer ...) and one ``ItemTable``. It
+is compiled once per process into a ``RenderPlan`` that knows which regions
+go on which page, which of them are identical on every page and can be
+recorded once per document as a form XObject, the table geometry and how to
+measure a row. Quotations, invoices and delivery orders all render through
+it, so a change to measuring, pagination or drawing applies to every
+document type.
+
+Rows are measured once, split into pages by their real heights and each page
+is drawn as one Table (header row repeated) with the measured heights passed
+in, so ReportLab never has to re-measure or re-split a long table.
+"""
+from functools import cached_property
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Paragraph, Table
+
+from .pdf_canvas import PDFCanvas
+from .timing import stage
+
+
+def paginate(heights, first_capacity, capacity=None, last_reserve=0):
+    """Split rows into pages by height.
+
+    ``first_capacity``/``capacity`` are the heights available for rows on
+    the first and following pages; the last page must also leave
+    ``last_reserve`` points free for the totals block. Returns a list of
+    ``(start, stop)`` row ranges, always at least one (possibly empty) page.
+    """
+    if capacity is None:
+        capacity = first_capacity
+
+    pages = []
+    start = 0
+    used = 0
+    page_capacity = first_capacity
+    for i, h in enumerate(heights):
+        if used + h > page_capacity and i > start:
+            pages.append((start, i))
+            start, used, page_capacity = i, 0, capacity
+        used += h
+    pages.append((start, len(heights)))
+
+    # Totals go on the last page: if they don't fit below its rows, move
+    # trailing rows onto a new page that has room for them. (Without a
+    # totals block a page can only overflow through one row taller than a
+    # page, which no new page would help.)
+    last_capacity = (first_capacity if len(pages) == 1 else capacity) - last_reserve
+    start, stop = pages[-1]
+    if last_reserve and used > last_capacity:
+        moved = 0
+        split = stop
+        while split - 1 > start and moved + heights[split - 1] <= capacity - last_reserve:
+            split -= 1
+            moved += heights[split]
+        pages[-1] = (start, split)
+        pages.append((split, stop))
+    return pages
+
+
+def page_table(header, rows, col_widths, header_height, row_heights, style):
+    """One page of an item table: the header row plus ``rows`` at known heights."""
+    table = Table(
+        [header] + rows,
+        colWidths=col_widths,
+        rowHeights=[header_height] + list(row_heights),
+    )
+    table.setStyle(style)
+    return table
+
+
+def table_height(header_height, row_heights):
+    return header_height + sum(row_heights)
+
+
+############ TEMPLATES ############
+
+# Which pages a region is drawn on
+EVERY = 'every'
+FIRST = 'first'
+LATER = 'later'
+LAST = 'last'
+
+
+class Page:
+    """Position of the page being drawn, passed to every region."""
+    __slots__ = ('number', 'count')
+
+    def __init__(self, number, count):
+        self.number = number
+        self.count = count
+
+    @property
+    def first(self):
+        return self.number == 1
+
+    @property
+    def last(self):
+        return self.number == self.count
+
+
+class Region:
+    """Something drawn at fixed coordinates with ``draw(canvas, doc, page)``.
+
+    A ``static`` region must not depend on the page: it is drawn once per
+    document into a form XObject (with ``page=None``) and stamped on every
+    page it belongs to.
+    """
+
+    def __init__(self, draw, pages=EVERY, static=False):
+        self.draw = draw
+        self.pages = pages
+        self.static = static
+
+    def on(self, first, last):
+        return (
+            self.pages == EVERY
+            or (self.pages == FIRST and first)
+            or (self.pages == LATER and not first)
+            or (self.pages == LAST and last)
+        )
+
+
+# Marks where in the region order the item table is drawn
+ITEMS = Region(None)
+
+
+class Column:
+    """An item table column. ``value(number, item)`` returns the cell text;
+    a column with a ``wrap`` ParagraphStyle wraps long text and sets the
+    row height."""
+
+    def __init__(self, header, width, value, wrap=None):
+        self.header = header
+        self.width = width
+        self.value = value
+        self.wrap = wrap
+
+
+class ItemTable:
+    """Geometry of the item table, in points from the bottom of the page.
+
+    ``top`` is the top edge of the header row (``later_top`` on the pages
+    after the first), rows may run down to ``bottom``, and on the last page
+    only down to ``last_bottom`` (the totals regions live below it). When
+    ``total_row(doc)`` is given its row closes the table on the last page,
+    styled with ``last_style``. ``padding`` is the horizontal and vertical
+    cell padding around wrapped text.
+    """
+
+    def __init__(self, columns, style, x, top, bottom, header_height, row_height,
+                 later_top=None, last_bottom=None, total_row=None, last_style=None,
+                 padding=(10, 6)):
+        self.columns = columns
+        self.style = style
+        self.x = x
+        self.top = top
+        self.later_top = top if later_top is None else later_top
+        self.bottom = bottom
+        self.last_bottom = bottom if last_bottom is None else last_bottom
+        self.header_height = header_height
+        self.row_height = row_height
+        self.total_row = total_row
+        self.last_style = last_style or style
+        self.padding = padding
+
+
+class DocumentTemplate:
+    def __init__(self, name, regions, items, pagesize=A4):
+        self.name = name
+        self.regions = regions
+        self.items = items
+        self.pagesize = pagesize
+
+    @cached_property
+    def plan(self):
+        """The compiled plan, built on first use and kept for the process."""
+        return RenderPlan(self)
+
+    def layout(self, items):
+        return self.plan.layout(items)
+
+    def render(self, target, doc, items, layout=None):
+        """Render one document into ``target`` (a path or file-like)."""
+        render_documents(target, [(self, doc, items, layout)], self.pagesize)
+
+
+def render_documents(target, documents, pagesize=A4):
+    """Render ``(template, doc, items, layout)`` documents one after another into one PDF."""
+    # invariant: identical inputs give byte-identical output for the PDF cache
+    c = PDFCanvas(target, pagesize=pagesize, invariant=1)
+    for template, doc, items, layout in documents:
+        template.plan.draw(c, doc, items, layout)
+    with stage('save'):
+        c.save()
+
+
+class Layout:
+    """Measured row heights and ``(start, stop)`` page ranges for one set of items.
+
+    A part of a layout (see ``part``) covers some of a document's pages but
+    keeps the document's row and page numbering, so the parts can be
+    rendered separately and concatenated.
+    """
+    __slots__ = ('key', 'row_heights', 'pages', 'row_offset', 'page_offset', 'page_count')
+
+    def __init__(self, key, row_heights, pages, row_offset=0, page_offset=0, page_count=None):
+        self.key = key
+        self.row_heights = row_heights
+        self.pages = pages
+        self.row_offset = row_offset
+        self.page_offset = page_offset
+        self.page_count = len(pages) if page_count is None else page_count
+
+    def rows(self, first, stop):
+        """The ``(start, stop)`` item range on pages ``first`` to ``stop - 1``."""
+        return self.pages[first][0], self.pages[stop - 1][1]
+
+    def part(self, first, stop):
+        """Pages ``first`` to ``stop - 1`` as a layout of their own, for the
+        items in ``rows(first, stop)``."""
+        start_row, stop_row = self.rows(first, stop)
+        return Layout(
+            self.key,
+            self.row_heights[start_row:stop_row],
+            [(start - start_row, end - start_row) for start, end in self.pages[first:stop]],
+            row_offset=self.row_offset + start_row,
+            page_offset=self.page_offset + first,
+            page_count=self.page_count,
+        )
+
+
+class RenderPlan:
+    def __init__(self, template):
+        self.name = template.name
+        table = self.table = template.items
+        self.header = [column.header for column in table.columns]
+        self.col_widths = [column.width for column in table.columns]
+        self.width = sum(self.col_widths)
+        self.page_height = template.pagesize[1]
+
+        pad_x, self.pad_y = table.padding
+        self.wrapped = [
+            (i, column.wrap, column.width - pad_x)
+            for i, column in enumerate(table.columns) if column.wrap is not None
+        ]
+
+        self.first_capacity = table.top - table.header_height - table.bottom
+        self.capacity = table.later_top - table.header_height - table.bottom
+        self.last_reserve = table.last_bottom - table.bottom
+        if table.total_row is not None:
+            self.last_reserve += table.row_height
+
+        # Two templates with the same key measure and paginate alike, so one
+        # Layout serves both
+        self.layout_key = (
+            tuple((width, style.name) for _, style, width in self.wrapped),
+            self.pad_y, table.row_height,
+            self.first_capacity, self.capacity, self.last_reserve,
+        )
+
+        self.forms = [
+            (region, f'{template.name}_{i}')
+            for i, region in enumerate(template.regions) if region.static
+        ]
+        form_names = dict(self.forms)
+        # Regions to draw for each (first page?, last page?), in order
+        self.page_regions = {
+            (first, last): [
+                (region, form_names.get(region))
+                for region in template.regions if region is ITEMS or region.on(first, last)
+            ]
+            for first in (True, False) for last in (True, False)
+        }
+
+    ############ MEASURING ############
+
+    def cell(self, text, style, width):
+        # Text that fits on one line stays a plain string (fixed row height);
+        # only longer or multi-line text becomes a Paragraph
+        text = str(text)
+        if '\n' not in text and stringWidth(text, style.fontName, style.fontSize) <= width:
+            return text
+        return Paragraph(escape(text).replace('\n', '<br/>'), style)
+
+    def row_height(self, number, item):
+        height = self.table.row_height
+        columns = self.table.columns
+        for i, style, width in self.wrapped:
+            cell = self.cell(columns[i].value(number, item), style, width)
+            if not isinstance(cell, str):
+                height = max(height, cell.wrap(width, self.page_height)[1] + self.pad_y)
+        return height
+
+    def row(self, number, item):
+        cells = [column.value(number, item) for column in self.table.columns]
+        for i, style, width in self.wrapped:
+            cells[i] = self.cell(cells[i], style, width)
+        return cells
+
+    def layout(self, items):
+        """Measure every row once and split the rows into pages."""
+        with stage('layout'):
+            row_heights = [self.row_height(n, item) for n, item in enumerate(items, 1)]
+            pages = paginate(
+                row_heights, self.first_capacity, self.capacity, last_reserve=self.last_reserve,
+            )
+        return Layout(self.layout_key, row_heights, pages)
+
+    ############ DRAWING ############
+
+    def draw(self, c, doc, items, layout=None):
+        """Draw the document's pages onto ``c``, after any pages already on it."""
+        if layout is None or layout.key != self.layout_key:
+            layout = self.layout(items)
+
+        # Static regions are recorded once; the page number keeps form names
+        # unique when several documents share a canvas
+        start_page = c.getPageNumber()
+        forms = {}
+        for region, name in self.forms:
+            name = f'{name}_{start_page}'
+            c.beginForm(name)
+            region.draw(c, doc, None)
+            c.endForm()
+            forms[region] = name
+
+        for i, (start, stop) in enumerate(layout.pages):
+            if i > 0:
+                c.showPage()
+            page = Page(layout.page_offset + i + 1, layout.page_count)
+            for region, form in self.page_regions[page.first, page.last]:
+                if region is ITEMS:
+                    self.draw_items(c, doc, items, layout, start, stop, page)
+                elif form is not None:
+                    c.doForm(forms[region])
+                else:
+                    region.draw(c, doc, page)
+        c.showPage()
+
+    def draw_items(self, c, doc, items, layout, start, stop, page):
+        with stage('table'):
+            self._draw_items(c, doc, items, layout, start, stop, page)
+
+    def _draw_items(self, c, doc, items, layout, start, stop, page):
+        table = self.table
+        # Cells are built page by page so long documents don't hold every
+        # Paragraph in memory at once
+        first_number = layout.row_offset + start + 1
+        rows = [self.row(n, item) for n, item in enumerate(items[start:stop], first_number)]
+        heights = layout.row_heights[start:stop]
+        style = table.style
+        if page.last and table.total_row is not None:
+            rows.append(table.total_row(doc))
+            heights = heights + [table.row_height]
+            style = table.last_style
+
+        flowable = page_table(
+            self.header, rows, self.col_widths, table.header_height, heights, style,
+        )
+        flowable.wrapOn(c, self.width, self.page_height)
+        top = table.top if page.first else table.later_top
+        flowable.drawOn(c, table.x, top - table_height(table.header_height, heights))
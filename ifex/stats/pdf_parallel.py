@@ -0,0 +1,118 @@
+"""Render the pages of very large documents on several processes.
+
+A tender quotation with thousands of lines is hundreds of pages, all drawn
+on one core. From PDF_PARALLEL_MIN_ITEMS items on, the calling process
+measures the rows and paginates once, splits the pages into one contiguous
+batch per render worker (stats.pdf_workers) and every worker renders its
+batch as a PDF of its own. Batches keep the document's page numbers ("Page
+X of Y") and item numbers, and only the last one draws the totals. The
+batches are then concatenated in order.
+
+Concatenating needs pypdfium2 (in requirements.txt) or pypdf. Without
+either, with a single worker, or below the threshold, documents render
+serially as before.
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .pdf_workers import get_executor, render_pages, render_workers
+from .timing import stage
+
+
+logger = logging.getLogger(__name__)
+
+
+############ MERGING ############
+
+def _merge_pypdf(parts, target):
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+    # Every batch embeds its own copy of the letterhead and images
+    if hasattr(writer, 'compress_identical_objects'):
+        writer.compress_identical_objects()
+    writer.write(target)
+
+
+def _merge_pdfium(parts, target):
+    import pypdfium2 as pdfium
+
+    merged = pdfium.PdfDocument.new()
+    for part in parts:
+        merged.import_pages(pdfium.PdfDocument(part))
+    merged.save(target)
+
+
+def merge_backend():
+    """The installed function that concatenates PDFs, or None."""
+    try:
+        import pypdf  # noqa: F401
+        return _merge_pypdf
+    except ImportError:
+        pass
+    try:
+        import pypdfium2  # noqa: F401
+        return _merge_pdfium
+    except ImportError:
+        return None
+
+
+############ RENDERING ############
+
+def min_items():
+    return getattr(settings, 'PDF_PARALLEL_MIN_ITEMS', 1000)
+
+
+def should_parallelize(item_count):
+    threshold = min_items()
+    return (
+        bool(threshold) and item_count >= threshold
+        and render_workers() > 1 and merge_backend() is not None
+    )
+
+
+def split_pages(page_count, batches):
+    """``page_count`` pages as ``batches`` contiguous ``(first, stop)`` ranges of near-equal size."""
+    batches = max(1, min(batches, page_count))
+    size, extra = divmod(page_count, batches)
+    ranges = []
+    first = 0
+    for i in range(batches):
+        stop = first + size + (1 if i < extra else 0)
+        ranges.append((first, stop))
+        first = stop
+    return ranges
+
+
+def render_parallel(template_path, target, doc, items, layout=None, executor=None, workers=None):
+    """Render the template at ``template_path`` into ``target`` on the render pool."""
+    template = import_string(template_path)
+    merge = merge_backend()
+    if merge is None:
+        raise RuntimeError("Parallel PDF rendering needs pypdf or pypdfium2")
+    if layout is None:
+        layout = template.layout(items)
+    executor = executor or get_executor()
+    workers = workers or render_workers()
+
+    futures = []
+    for first, stop in split_pages(len(layout.pages), workers):
+        start, end = layout.rows(first, stop)
+        futures.append(executor.submit(
+            render_pages, template_path, doc, items[start:end], layout.part(first, stop),
+        ))
+    try:
+        with stage('workers'):
+            parts = [future.result() for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    logger.info('rendered %s pages of %s in %s batches', len(layout.pages), template.name, len(parts))
+    with stage('merge'):
+        merge(parts, target)
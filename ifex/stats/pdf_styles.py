@@ -0,0 +1,141 @@
+"""Colours, paragraph styles and table styles shared by the PDF renderers.
+
+Everything here is built once at import and reused by every request, so a
+render no longer calls getSampleStyleSheet() or assembles TableStyle command
+lists per page or per row. Treat these objects as read-only: a renderer that
+needs a variation builds its own style from the command tuples below.
+"""
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+
+
+# ===== Colours =====
+# Quotation palette
+LIGHT_BLUE = colors.Color(0.53, 0.81, 0.92)   # #87CEEB
+NAVY_BLUE = colors.Color(0.039, 0.164, 0.321)
+SILVER_GRAY = colors.Color(0.96, 0.96, 0.97)  # #F5F5F7
+GOLD_ACCENT = colors.Color(0.83, 0.69, 0.22)  # #D4AF37
+DARK_GRAY = colors.Color(0.3, 0.3, 0.3)
+LIGHT_GRAY = colors.Color(0.95, 0.95, 0.95)   # #F2F2F2
+WHITE = colors.Color(1, 1, 1)
+BLACK = colors.Color(0, 0, 0)
+
+# Fallback logo circles
+LOGO_DARK_BLUE = colors.Color(0, 0.5, 0.78)
+LOGO_MEDIUM_BLUE = colors.Color(0.25, 0.41, 0.88)
+
+# Plain grayscale invoice (utils.PLAIN_INVOICE_TEMPLATE)
+INVOICE_GRAY = colors.Color(0.6, 0.6, 0.6)
+
+# Tax invoice (IFEXInvoice)
+INVOICE_BLUE = colors.HexColor('#2f3e5b')
+INVOICE_LIGHT_BLUE = colors.HexColor('#75cef5')
+INVOICE_LIGHT_GRAY = colors.HexColor('#F0F0F0')
+INVOICE_FALLBACK_BLUE = colors.HexColor('#4B7BA7')
+INVOICE_FOOTER_BLUE = colors.HexColor('#3b5e91')
+
+
+# ===== Paragraph styles =====
+_sample_styles = getSampleStyleSheet()
+
+ITEM_STYLE = ParagraphStyle(
+    'ItemStyle',
+    parent=_sample_styles['Normal'],
+    fontSize=9,
+    fontName='Helvetica',
+    leading=10,
+    leftIndent=0,
+    rightIndent=0,
+    wordWrap='LTR',
+    splitLongWords=True,
+    spaceBefore=0,
+    spaceAfter=0
+)
+
+INVOICE_ITEM_STYLE = ParagraphStyle(
+    'InvoiceItem', fontName='Helvetica', fontSize=9, leading=11,
+)
+
+
+# ===== Quotation tables =====
+# One table per page of the quotation: header row + item rows
+QUOTATION_ITEMS_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+    ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BACKGROUND', (0, 1), (-1, -1), WHITE),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.gray),
+    ('TOPPADDING', (0, 1), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 3),
+    ('LEFTPADDING', (1, 1), (1, -1), 5),
+    ('RIGHTPADDING', (1, 1), (1, -1), 5),
+    # Header row
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('BACKGROUND', (0, 0), (-1, 0), NAVY_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('GRID', (0, 0), (-1, 0), 1, colors.gray),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+])
+
+
+# ===== Plain invoice table (utils.invoice_pdf) =====
+PLAIN_INVOICE_ITEMS_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+    ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 1), (-1, -1), 0.25, INVOICE_GRAY),
+    # Header row
+    ('BACKGROUND', (0, 0), (-1, 0), INVOICE_GRAY),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, 0), 0.5, INVOICE_GRAY),
+])
+
+
+# ===== Tax invoice tables (IFEXInvoice) =====
+INVOICE_SALES_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), INVOICE_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, 1), [colors.white]),
+])
+
+_INVOICE_ITEMS = [
+    # Header row
+    ('BACKGROUND', (0, 0), (-1, 0), INVOICE_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 8),
+
+    # All cells
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),  # NO column
+    ('ALIGN', (2, 0), (-1, -1), 'CENTER'),  # All numeric columns
+    ('LEFTPADDING', (1, 0), (1, -1), 5),
+]
+
+INVOICE_ITEMS_STYLE = TableStyle(_INVOICE_ITEMS)
+
+# Last page: the final row is the TOTAL row
+INVOICE_ITEMS_TOTAL_STYLE = TableStyle(_INVOICE_ITEMS + [
+    ('BACKGROUND', (0, -1), (-1, -1), INVOICE_LIGHT_GRAY),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, -1), (-1, -1), 10),
+])
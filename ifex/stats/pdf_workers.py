@@ -0,0 +1,68 @@
+"""Entry points for PDF render worker processes.
+
+Workers are started with the ``spawn`` method (forking a threaded web worker
+can copy locks held by other threads), so this module must be importable
+before Django is set up: it only imports the renderers inside the functions,
+after ``init_worker`` has run ``django.setup()``.
+"""
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+def init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ifex.settings')
+    import django
+    django.setup()
+
+
+def render_invoice(invoice_data):
+    """Render one invoice dict and return the PDF bytes.
+
+    The invoice template's render plan is compiled on a worker's first job
+    and reused for every job after it.
+    """
+    from .invoice_pdf import render_invoice_pdf
+    buf = io.BytesIO()
+    render_invoice_pdf(buf, invoice_data)
+    return buf.getvalue()
+
+
+def render_pages(template_path, doc, items, layout):
+    """Render part of a document (see pdf_parallel) and return the PDF bytes.
+
+    The template is passed by dotted path: templates hold drawing functions
+    and lambdas, which don't pickle.
+    """
+    from django.utils.module_loading import import_string
+    buf = io.BytesIO()
+    import_string(template_path).render(buf, doc, items, layout)
+    return buf.getvalue()
+
+
+def make_executor(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def render_workers():
+    from django.conf import settings
+    return getattr(settings, 'PDF_EXPORT_WORKERS', None) or os.cpu_count() or 1
+
+
+def get_executor():
+    """The per-process render pool, started on first use and kept for reuse."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor(render_workers())
+        return _executor
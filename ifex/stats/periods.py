@@ -0,0 +1,42 @@
+"""Date periods picked with ``?from=`` and ``?to=`` (YYYY-MM-DD, inclusive).
+
+Views filter on them with plain range predicates (``invoice_date__gte`` /
+``__lte``), which the invoice_date index serves; ``__year``/``__month``
+lookups extract the parts from every row instead.
+"""
+import datetime
+
+from django.core.exceptions import BadRequest
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+def month_bounds(day):
+    """First and last day of the month ``day`` is in."""
+    first = day.replace(day=1)
+    next_month = (first + datetime.timedelta(days=32)).replace(day=1)
+    return first, next_month - datetime.timedelta(days=1)
+
+
+def requested_date(request, name):
+    """The ``?name=`` date, None if absent or empty; BadRequest if it isn't a date."""
+    value = request.GET.get(name, '')
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:  # well formed but impossible, e.g. 2024-13-01
+        day = None
+    if day is None:
+        raise BadRequest("Dates must be in YYYY-MM-DD format")
+    return day
+
+
+def requested_period(request):
+    """``(from, to)`` dates of the request, this month by default; BadRequest if invalid."""
+    default_from, default_to = month_bounds(timezone.localdate())
+    date_from = requested_date(request, 'from') or default_from
+    date_to = requested_date(request, 'to') or default_to
+    if date_from > date_to:
+        raise BadRequest("'from' must not be after 'to'")
+    return date_from, date_to
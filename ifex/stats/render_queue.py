@@ -0,0 +1,170 @@
+"""Durable local queue of PDFs to pre-render after a quotation or invoice is saved.
+
+Jobs live in a small SQLite database at PDF_QUEUE_PATH, separate from the
+application database so enqueueing never contends with MySQL/SQLite
+transactions of the request. ``manage.py render_pdf_queue`` drains it and
+stores each PDF in the PDF cache, where the download views find it, plus a
+PNG of its first page for the list pages (see thumbnails); if the worker
+hasn't got to a document yet the views still render it inline.
+
+There is at most one pending job per document. Re-enqueueing a document
+bumps its ``version`` so a worker that is still rendering the old data
+doesn't delete the newer request when it finishes.
+"""
+import logging
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS render_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (kind, object_id)
+)
+"""
+
+# A claimed job whose worker died is picked up again after this many seconds
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 5
+
+
+def connect():
+    conn = sqlite3.connect(str(settings.PDF_QUEUE_PATH), timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(SCHEMA)
+    return conn
+
+
+def enqueue(kind, object_id):
+    """Queue a render of ``kind`` ('invoice'/'quotation') once the current transaction commits."""
+    if not getattr(settings, 'PDF_PRERENDER', True):
+        return
+    transaction.on_commit(lambda: _insert(kind, object_id))
+
+
+def _insert(kind, object_id):
+    conn = connect()
+    try:
+        conn.execute(
+            """
+            INSERT INTO render_jobs (kind, object_id, enqueued_at) VALUES (?, ?, ?)
+            ON CONFLICT (kind, object_id) DO UPDATE SET
+                version = version + 1,
+                enqueued_at = excluded.enqueued_at,
+                claimed_at = NULL,
+                attempts = 0
+            """,
+            (kind, object_id, time.time()),
+        )
+    finally:
+        conn.close()
+
+
+def claim(conn):
+    """Claim the oldest runnable job; returns ``(id, kind, object_id, version)`` or None."""
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute(
+            """
+            SELECT id, kind, object_id, version FROM render_jobs
+            WHERE claimed_at IS NULL OR claimed_at < ?
+            ORDER BY enqueued_at LIMIT 1
+            """,
+            (now - LEASE_SECONDS,),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                'UPDATE render_jobs SET claimed_at = ?, attempts = attempts + 1 WHERE id = ?',
+                (now, row[0]),
+            )
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return row
+
+
+def complete(conn, job_id, version):
+    conn.execute('DELETE FROM render_jobs WHERE id = ? AND version = ?', (job_id, version))
+
+
+def fail(conn, job_id, version):
+    # Leave it claimed so it is retried once the lease runs out, up to MAX_ATTEMPTS
+    conn.execute(
+        'DELETE FROM render_jobs WHERE id = ? AND version = ? AND attempts >= ?',
+        (job_id, version, MAX_ATTEMPTS),
+    )
+
+
+def pending_count(conn):
+    return conn.execute('SELECT COUNT(*) FROM render_jobs').fetchone()[0]
+
+
+def render_job(kind, object_id):
+    """Render one document into the PDF cache, with its first-page preview.
+
+    Returns False if it no longer exists.
+    """
+    from .conditional import INVOICE_MODIFIED, QUOTATION_MODIFIED
+    from .models import Invoice, Quotation
+    from .invoice_pdf import cached_invoice_pdfs
+    from .thumbnails import ensure_thumbnail
+    from .utils import cached_quotation_pdf
+
+    if kind == 'invoice':
+        invoice = (
+            Invoice.objects.select_related('customer', 'quotation__customer')
+            .annotate(modified=INVOICE_MODIFIED).filter(pk=object_id).first()
+        )
+        if invoice is None:
+            return False
+        # Dispatch prints both, so render the delivery order in the same pass
+        documents = cached_invoice_pdfs(invoice, ('invoice', 'delivery_order'))
+        ensure_thumbnail(documents['invoice'][0], kind, object_id, invoice.modified)
+    elif kind == 'quotation':
+        quotation = (
+            Quotation.objects.select_related('customer')
+            .annotate(modified=QUOTATION_MODIFIED).filter(pk=object_id).first()
+        )
+        if quotation is None:
+            return False
+        path, _ = cached_quotation_pdf(quotation)
+        ensure_thumbnail(path, kind, object_id, quotation.modified)
+    else:
+        raise ValueError(f"Unknown render job kind: {kind}")
+    return True
+
+
+def drain(conn, stop_when_empty=True, poll_interval=1.0):
+    """Process jobs until the queue is empty (or forever). Returns the number rendered."""
+    rendered = 0
+    while True:
+        job = claim(conn)
+        if job is None:
+            if stop_when_empty:
+                return rendered
+            time.sleep(poll_interval)
+            continue
+
+        job_id, kind, object_id, version = job
+        close_old_connections()
+        try:
+            if render_job(kind, object_id):
+                rendered += 1
+        except Exception:
+            logger.exception('pdf render job failed: %s %s', kind, object_id)
+            fail(conn, job_id, version)
+        else:
+            complete(conn, job_id, version)
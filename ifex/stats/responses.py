@@ -0,0 +1,96 @@
+"""File-backed PDF responses.
+
+PDFs are never rendered into an HttpResponse any more. Cached documents are
+already files and are streamed from disk; everything else renders into a
+SpooledTemporaryFile that stays in memory up to PDF_SPOOL_MAX_BYTES and
+rolls over to disk beyond that. Both go out as a FileResponse with an exact
+Content-Length, which WSGI servers with ``wsgi.file_wrapper`` (gunicorn,
+uWSGI) send with sendfile(2).
+
+Under ASGI, Django's handler consumes a synchronous streaming iterator with
+``sync_to_async(list)``: the whole file (or ZIP) in memory before the first
+byte goes out. ``asgi_streaming`` gives such responses an async iterator
+that reads one chunk per hop to a thread instead.
+
+When PDF_SENDFILE_HEADER is set, cached files are handed to the front-end
+server instead: ``X-Accel-Redirect`` (nginx) gets a URL under
+PDF_SENDFILE_URL, any other header (``X-Sendfile`` for Apache/lighttpd) gets
+the absolute file path.
+"""
+import os
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+
+
+async def chunks_in_thread(iterator, thread_sensitive):
+    next_chunk = sync_to_async(next, thread_sensitive=thread_sensitive)
+    while True:
+        chunk = await next_chunk(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def asgi_streaming(request, response, thread_sensitive=False):
+    """Under ASGI, stream ``response`` from an async iterator; otherwise return it as it is.
+
+    Pass ``thread_sensitive=True`` when producing the body uses the
+    database, so it runs on the request's connection.
+    """
+    if isinstance(request, ASGIRequest) and response.streaming and not response.is_async:
+        # The original iterator's close() stays registered with the response
+        response.streaming_content = chunks_in_thread(iter(response.streaming_content), thread_sensitive)
+    return response
+
+
+def pdf_file_response(path, filename, as_attachment=True):
+    """Serve a PDF that already exists on disk (e.g. from the PDF cache)."""
+    header = getattr(settings, 'PDF_SENDFILE_HEADER', None)
+    if header:
+        response = HttpResponse(content_type='application/pdf')
+        if header.lower() == 'x-accel-redirect':
+            relative = os.path.relpath(path, settings.PDF_CACHE_DIR).replace(os.sep, '/')
+            response[header] = settings.PDF_SENDFILE_URL.rstrip('/') + '/' + relative
+        else:
+            response[header] = os.path.abspath(path)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+    return FileResponse(
+        open(path, 'rb'),
+        content_type='application/pdf',
+        as_attachment=as_attachment,
+        filename=filename,
+    )
+
+
+def pdf_spool():
+    """A temp file to render into: in memory up to PDF_SPOOL_MAX_BYTES, then on disk."""
+    return tempfile.SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_BYTES)
+
+
+def pdf_spool_response(spool, filename, as_attachment=True):
+    """Stream a finished spool; FileResponse closes it when the response is done."""
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        content_type='application/pdf',
+        as_attachment=as_attachment,
+        filename=filename,
+    )
+
+
+def spooled_pdf_response(render, filename, as_attachment=True):
+    """Render with ``render(fileobj)`` into a spool and stream it."""
+    spool = pdf_spool()
+    try:
+        render(spool)
+    except BaseException:
+        spool.close()
+        raise
+    return pdf_spool_response(spool, filename, as_attachment)
@@ -0,0 +1,229 @@
+"""Revenue rollups: invoice count, net, VAT and grand total per day, per
+month and per customer and month.
+
+Every invoice adds its figures to the DailyRevenue row of its invoice_date,
+the MonthlyRevenue row of that month and the CustomerMonthlyRevenue row of
+its customer and month. The signals in signals.py apply the difference each
+time an invoice is saved or deleted, as ``SET x = x + delta`` updates in the
+transaction of the save, so the totals of a period are read from a handful
+of rollup rows (its whole months, plus the days at either end) instead of
+summing every invoice in it.
+
+The stored figures are read with the invoice row locked (``stored()``), in
+the transaction of the save, so concurrent edits of one invoice apply their
+differences one after the other.
+
+Invoices without an invoice_date aren't counted; those without a customer
+go to the customer NULL rows. Money comes from the totals stored on the
+invoice (the views compute them from the items), VAT being ``grand_total -
+total_amount``.
+
+``rebuild()`` recomputes every row from the invoices and ``verify()`` lists
+the rows that disagree with them (manage.py rebuild_revenue_rollups).
+"""
+import datetime
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Func, IntegerField, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import Invoice, DailyRevenue, MonthlyRevenue, CustomerMonthlyRevenue
+from .periods import month_bounds
+
+
+FIGURES = ('invoice_count', 'net', 'vat', 'grand_total')
+
+# Float sums drift by rounding as deltas are added and taken away; verify()
+# reports differences above this
+TOLERANCE = 0.005
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+############ INVOICE CONTRIBUTIONS ############
+
+def contribution(invoice_date, customer_id, total_amount, grand_total):
+    """``(day, customer_id, figures)`` one invoice adds to the rollups, or None."""
+    if invoice_date is None:
+        return None
+    return invoice_date, customer_id, (1, total_amount, grand_total - total_amount, grand_total)
+
+
+def contribution_of(invoice):
+    # Views assign the POSTed invoice_date as a string; save() doesn't convert it
+    invoice_date = Invoice._meta.get_field('invoice_date').to_python(invoice.invoice_date)
+    return contribution(invoice_date, invoice.customer_id, float(invoice.total_amount), float(invoice.grand_total))
+
+
+def stored(pk, using=DEFAULT_DB_ALIAS):
+    """The contribution of invoice ``pk`` as it is in the database.
+
+    Locks the row until the transaction ends, so a concurrent save of the
+    same invoice waits and then reads what this one wrote: otherwise both
+    would take the same old figures away. Call it in the transaction of the
+    write (Invoice.save and delete open one).
+    """
+    row = (Invoice.objects.using(using).select_for_update().filter(pk=pk)
+           .values_list('invoice_date', 'customer_id', 'total_amount', 'grand_total').first())
+    return contribution(*row) if row else None
+
+
+def buckets(contribution):
+    day, customer_id, _ = contribution
+    month = day.replace(day=1)
+    return [
+        (DailyRevenue, (('day', day),)),
+        (MonthlyRevenue, (('month', month),)),
+        (CustomerMonthlyRevenue, (('customer_id', customer_id), ('month', month))),
+    ]
+
+
+def bump(model, lookup, delta, using):
+    rows = model.objects.using(using).filter(**lookup)
+    changes = {name: F(name) + value for name, value in zip(FIGURES, delta)}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic(using=using):
+            model.objects.using(using).create(**lookup, **dict(zip(FIGURES, delta)))
+    except IntegrityError:  # created by a concurrent save in between
+        rows.update(**changes)
+
+
+def apply(before, after, using=DEFAULT_DB_ALIAS):
+    """Move an invoice's contribution from ``before`` to ``after`` (either may be None)."""
+    deltas = {}
+    for sign, part in ((-1, before), (1, after)):
+        if part is None:
+            continue
+        for bucket in buckets(part):
+            current = deltas.get(bucket, (0,) * len(FIGURES))
+            deltas[bucket] = tuple(a + sign * b for a, b in zip(current, part[2]))
+    with transaction.atomic(using=using):
+        for (model, lookup), delta in deltas.items():
+            if any(delta):
+                bump(model, dict(lookup), delta, using)
+
+
+############ PERIOD TOTALS ############
+
+def period_parts(date_from, date_to):
+    """The whole months of a period, as ``(first, last)`` month or None, and the ranges of days outside them."""
+    first = date_from if date_from.day == 1 else month_bounds(date_from)[1] + ONE_DAY
+    last = date_to if date_to == month_bounds(date_to)[1] else date_to.replace(day=1) - ONE_DAY
+    if first > last:
+        return None, [(date_from, date_to)]
+    days = []
+    if date_from < first:
+        days.append((date_from, first - ONE_DAY))
+    if last < date_to:
+        days.append((last + ONE_DAY, date_to))
+    return (first, last.replace(day=1)), days
+
+
+def period_rows(date_from, date_to, using=DEFAULT_DB_ALIAS):
+    """Querysets of the rollup rows that add up to the period."""
+    months, days = period_parts(date_from, date_to)
+    rows = []
+    if days:
+        in_days = Q()
+        for start, end in days:
+            in_days |= Q(day__range=(start, end))
+        rows.append(DailyRevenue.objects.using(using).filter(in_days))
+    if months:
+        rows.append(MonthlyRevenue.objects.using(using).filter(month__range=months))
+    return rows
+
+
+def output_field(name):
+    return IntegerField() if name == 'invoice_count' else FloatField()
+
+
+def period_annotations(date_from, date_to, names=FIGURES, prefix='period_'):
+    """Scalar subqueries of the period's figures, to annotate another query with."""
+    annotations = {}
+    for name in names:
+        field = output_field(name)
+        parts = [
+            Coalesce(
+                Subquery(rows.order_by().values(total=Func(name, function='SUM')), output_field=field),
+                Value(0), output_field=field,
+            )
+            for rows in period_rows(date_from, date_to)
+        ]
+        total = parts[0]
+        for part in parts[1:]:
+            total = total + part
+        annotations[prefix + name] = total
+    return annotations
+
+
+def period_totals(date_from, date_to, using=DEFAULT_DB_ALIAS):
+    """The period's figures as a dict, in one or two small queries."""
+    totals = dict.fromkeys(FIGURES, 0)
+    for rows in period_rows(date_from, date_to, using):
+        for name, value in rows.aggregate(**{name: Sum(name) for name in FIGURES}).items():
+            totals[name] += value or 0
+    return totals
+
+
+############ REBUILD AND VERIFY ############
+
+def expected(using=DEFAULT_DB_ALIAS):
+    """``{model: {key: figures}}`` of every rollup, summed from the invoices."""
+    invoices = Invoice.objects.using(using).exclude(invoice_date=None).order_by()
+    sums = {
+        'sum_count': Count('id'),
+        'sum_net': Sum('total_amount'),
+        'sum_vat': Sum(F('grand_total') - F('total_amount')),
+        'sum_gross': Sum('grand_total'),
+    }
+    groups = {
+        DailyRevenue: invoices.values('invoice_date'),
+        MonthlyRevenue: invoices.values(month_of=TruncMonth('invoice_date')),
+        CustomerMonthlyRevenue: invoices.values('customer_id', month_of=TruncMonth('invoice_date')),
+    }
+    result = {}
+    for model, group in groups.items():
+        result[model] = {
+            tuple(row[name] for name in row if name not in sums): tuple(row[name] for name in sums)
+            for row in group.annotate(**sums)
+        }
+    return result
+
+
+KEYS = {
+    DailyRevenue: ('day',),
+    MonthlyRevenue: ('month',),
+    CustomerMonthlyRevenue: ('customer_id', 'month'),
+}
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """Replace every rollup row with sums of the invoices; returns the number of rows per model."""
+    counts = {}
+    with transaction.atomic(using=using):
+        for model, rows in expected(using).items():
+            model.objects.using(using).all().delete()
+            model.objects.using(using).bulk_create(
+                [model(**dict(zip(KEYS[model], key)), **dict(zip(FIGURES, figures))) for key, figures in rows.items()],
+                batch_size=500,
+            )
+            counts[model] = len(rows)
+    return counts
+
+
+def verify(using=DEFAULT_DB_ALIAS):
+    """``(model, key, stored, expected)`` of every rollup row that disagrees with the invoices."""
+    mismatches = []
+    for model, rows in expected(using).items():
+        stored_rows = {
+            row[:len(KEYS[model])]: row[len(KEYS[model]):]
+            for row in model.objects.using(using).values_list(*KEYS[model], *FIGURES)
+        }
+        for key in rows.keys() | stored_rows.keys():
+            have = stored_rows.get(key, (0,) * len(FIGURES))
+            want = rows.get(key, (0,) * len(FIGURES))
+            if have[0] != want[0] or any(abs(a - b) > TOLERANCE for a, b in zip(have[1:], want[1:])):
+                mismatches.append((model, key, have, want))
+    return mismatches
@@ -0,0 +1,449 @@
+"""Full-text search over quotations and invoices.
+
+The index has one row per quotation and per invoice, with four columns:
+
+* numbers: the document's own number, plus its invoices' numbers (for a
+  quotation) or its quotation's number (for an invoice);
+* customer: the customer's name;
+* phone: the customer's phone;
+* items: the item names.
+
+On SQLite it is an FTS5 table, ranked with bm25 and weighted by WEIGHTS. On
+MySQL it is an InnoDB table with a FULLTEXT index, searched in boolean mode.
+Other databases, and SQLite builds without FTS5, fall back to icontains
+lookups, which scan the tables.
+
+The table is created after ``migrate`` (see apps) and filled by
+``manage.py rebuild_search_index``. Signals keep it current: every save
+schedules the documents it changes, and each of those is re-indexed once
+when the transaction commits, however many of its items were written.
+"""
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.http import JsonResponse
+from django.urls import reverse
+
+from .models import Quotation, QuotationItem, Invoice, InvoiceItem
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'stats_search'
+KINDS = ('quotation', 'invoice')
+
+# bm25 weight of a match in numbers, customer, phone and items (SQLite)
+WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Documents built and written per round of queries
+BATCH_SIZE = 500
+
+SCHEMAS = {
+    'sqlite': f"""
+        CREATE VIRTUAL TABLE {TABLE} USING fts5(
+            numbers, customer, phone, items,
+            tokenize = 'unicode61', prefix = '2 3'
+        )
+    """,
+    'mysql': f"""
+        CREATE TABLE {TABLE} (
+            id BIGINT NOT NULL PRIMARY KEY,
+            numbers TEXT NOT NULL,
+            customer VARCHAR(255) NOT NULL,
+            phone VARCHAR(64) NOT NULL,
+            items LONGTEXT NOT NULL,
+            FULLTEXT KEY {TABLE}_text (numbers, customer, phone, items)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+}
+
+# Name of the row id column of each index engine
+ROW_ID = {'fts5': 'rowid', 'mysql': 'id'}
+
+TERM = re.compile(r'\w+')
+
+
+def document_id(kind, pk):
+    # Both kinds share one table: the row id encodes the kind in its low bit
+    return pk * len(KINDS) + KINDS.index(kind)
+
+
+def document_key(doc_id):
+    pk, kind = divmod(doc_id, len(KINDS))
+    return KINDS[kind], pk
+
+
+############ INDEX TABLE ############
+
+_engines = {}
+
+
+def engine(using='default'):
+    """'fts5' or 'mysql' when the index table exists, else None (scan instead)."""
+    if using not in _engines:
+        connection = connections[using]
+        exists = TABLE in connection.introspection.table_names()
+        _engines[using] = {'sqlite': 'fts5', 'mysql': 'mysql'}.get(connection.vendor) if exists else None
+    return _engines[using]
+
+
+def create_index(using='default'):
+    """Create the index table if it is missing; returns True if it was created."""
+    connection = connections[using]
+    schema = SCHEMAS.get(connection.vendor)
+    if schema is None or TABLE in connection.introspection.table_names():
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(schema)
+    except DatabaseError as e:  # e.g. SQLite compiled without FTS5
+        logger.warning("Search index not created, falling back to scanning: %s", e)
+        return False
+    finally:
+        _engines.pop(using, None)
+    return True
+
+
+def create_index_after_migrate(sender, using='default', **kwargs):
+    if create_index(using):
+        rebuild(using)
+
+
+############ DOCUMENTS ############
+
+def digits(text):
+    return ''.join(ch for ch in text or '' if ch.isdigit())
+
+
+def document(numbers, customer, items):
+    # Numbers and phones are also indexed as bare digits, so "2001" finds
+    # IF2001 and "0551234567" finds "055 123 4567"
+    numbers = ' '.join(f'{n} {digits(n)}' for n in numbers if n)
+    phone = (customer.phone or '') if customer else ''
+    return (
+        numbers,
+        customer.name if customer else '',
+        f'{phone} {digits(phone)}'.strip(),
+        '\n'.join(items),
+    )
+
+
+def quotation_documents(pks, using='default'):
+    """Index rows of the quotations ``pks`` that still exist, by pk."""
+    quotations = Quotation.objects.using(using).select_related('customer').in_bulk(pks)
+    invoices, items = defaultdict(list), defaultdict(list)
+    rows = Invoice.objects.using(using).filter(quotation__in=pks).order_by('pk')
+    for pk, number in rows.values_list('quotation_id', 'invoice_number'):
+        invoices[pk].append(number)
+    rows = QuotationItem.objects.using(using).filter(quotation__in=pks).order_by('pk')
+    for pk, name in rows.values_list('quotation_id', 'item_name'):
+        items[pk].append(name)
+    return {
+        pk: document([quotation.quotation_number, *invoices[pk]], quotation.customer, items[pk])
+        for pk, quotation in quotations.items()
+    }
+
+
+def invoice_documents(pks, using='default'):
+    """Index rows of the invoices ``pks`` that still exist, by pk."""
+    invoices = (
+        Invoice.objects.using(using)
+        .select_related('customer', 'quotation__customer')
+        .in_bulk(pks)
+    )
+    items = defaultdict(list)
+    rows = InvoiceItem.objects.using(using).filter(invoice__in=pks).order_by('pk')
+    for pk, name in rows.values_list('invoice_id', 'item_name'):
+        items[pk].append(name)
+    documents = {}
+    for pk, invoice in invoices.items():
+        quotation = invoice.quotation
+        documents[pk] = document(
+            [invoice.invoice_number, quotation.quotation_number if quotation else None],
+            invoice.customer or (quotation.customer if quotation else None),
+            items[pk],
+        )
+    return documents
+
+
+DOCUMENTS = {'quotation': quotation_documents, 'invoice': invoice_documents}
+
+
+def index_documents(keys, using='default'):
+    """Re-index ``keys``, (kind, pk) pairs; rows of deleted records are removed."""
+    index = engine(using)
+    if index is None:
+        return
+    row_id = ROW_ID[index]
+    delete = f'DELETE FROM {TABLE} WHERE {row_id} = %s'
+    insert = f'INSERT INTO {TABLE} ({row_id}, numbers, customer, phone, items) VALUES (%s, %s, %s, %s, %s)'
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for kind in KINDS:
+            pks = [pk for k, pk in keys if k == kind]
+            for start in range(0, len(pks), BATCH_SIZE):
+                batch = pks[start:start + BATCH_SIZE]
+                documents = DOCUMENTS[kind](batch, using)
+                cursor.executemany(delete, [[document_id(kind, pk)] for pk in batch])
+                cursor.executemany(insert, [[document_id(kind, pk), *values] for pk, values in documents.items()])
+
+
+def rebuild(using='default'):
+    """Index every quotation and invoice from scratch; returns the number indexed."""
+    index = engine(using)
+    if index is None:
+        return 0
+    count = 0
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        for kind, model in (('quotation', Quotation), ('invoice', Invoice)):
+            pks = list(model.objects.using(using).order_by('pk').values_list('pk', flat=True))
+            index_documents([(kind, pk) for pk in pks], using)
+            count += len(pks)
+    return count
+
+
+############ INCREMENTAL UPDATES ############
+
+# (kind, pk) pairs waiting for the transaction that changed them to commit,
+# per thread and database
+_pending = threading.local()
+
+
+def schedule(kind, pk, using='default'):
+    """Re-index a document when the current transaction commits (at once outside one)."""
+    if pk is None:
+        return
+    _pending.__dict__.setdefault(using, set()).add((kind, pk))
+    transaction.on_commit(lambda: flush(using), using=using)
+
+
+def flush(using='default'):
+    # The first callback of a transaction indexes everything it scheduled;
+    # the rest find nothing left to do. Keys left behind by a rolled back
+    # transaction are re-indexed harmlessly with the next commit.
+    pending = _pending.__dict__.get(using)
+    if not pending:
+        return
+    keys = sorted(pending)
+    pending.clear()
+    try:
+        index_documents(keys, using)
+    except DatabaseError:
+        # The data is committed; a stale index row is fixed by the next save
+        # or a rebuild
+        logger.exception("Search index update failed for %s", keys)
+
+
+############ QUERIES ############
+
+def match_expression(index, terms):
+    # Every term must match, as a prefix, in any column
+    if index == 'fts5':
+        return ' '.join(f'"{term}"*' for term in terms)
+    return ' '.join(f'+{term}*' for term in terms)
+
+
+MYSQL_MATCH = 'MATCH (numbers, customer, phone, items) AGAINST (%s IN BOOLEAN MODE)'
+
+
+def index_filter(index, terms, kind, within, using):
+    """WHERE clause and params of the index rows matching ``terms``.
+
+    ``within``, a queryset of ``kind``, limits them to its rows: the
+    condition goes into the same statement as the ranking, so LIMIT and
+    OFFSET count only the rows that qualify.
+    """
+    row_id = ROW_ID[index]
+    expression = match_expression(index, terms)
+    if index == 'fts5':
+        sql, params = f'{TABLE} MATCH %s', [expression]
+    else:
+        sql, params = MYSQL_MATCH, [expression]
+    if kind is not None:
+        sql += f' AND {row_id} %% {len(KINDS)} = %s'
+        params.append(KINDS.index(kind))
+    if within is not None:
+        doc_ids = within.order_by().values(doc_id=F('pk') * len(KINDS) + KINDS.index(kind))
+        subquery, subparams = doc_ids.query.get_compiler(using).as_sql()
+        sql += f' AND {row_id} IN ({subquery})'
+        params += subparams
+    return sql, params
+
+
+def indexed_search(index, terms, kind, limit, offset, using, within=None):
+    where, params = index_filter(index, terms, kind, within, using)
+    if index == 'fts5':
+        weights = ', '.join(str(w) for w in WEIGHTS)
+        sql = (
+            f'SELECT rowid FROM {TABLE} WHERE {where} '
+            f'ORDER BY bm25({TABLE}, {weights}) LIMIT %s OFFSET %s'
+        )
+    else:
+        sql = f'SELECT id FROM {TABLE} WHERE {where} ORDER BY {MYSQL_MATCH} DESC LIMIT %s OFFSET %s'
+        params.append(match_expression(index, terms))
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [*params, limit, offset])
+        return [document_key(doc_id) for doc_id, in cursor.fetchall()]
+
+
+def indexed_count(index, terms, kind, using, within=None):
+    where, params = index_filter(index, terms, kind, within, using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE} WHERE {where}', params)
+        return cursor.fetchone()[0]
+
+
+# Fields a scanning search looks in, per kind
+SCAN_FIELDS = {
+    'quotation': (
+        'quotation_number', 'invoices__invoice_number',
+        'customer__name', 'customer__phone', 'items__item_name',
+    ),
+    'invoice': (
+        'invoice_number', 'quotation__quotation_number',
+        'customer__name', 'customer__phone',
+        'quotation__customer__name', 'quotation__customer__phone', 'items__item_name',
+    ),
+}
+
+
+def scan_matches(terms, kind, using, within=None):
+    """Querysets of the matching rows, per kind."""
+    matches = {}
+    for kind_ in ([kind] if kind else KINDS):
+        model = Quotation if kind_ == 'quotation' else Invoice
+        queryset = (model.objects.all() if within is None else within).using(using)
+        for term in terms:
+            condition = Q()
+            for field in SCAN_FIELDS[kind_]:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        matches[kind_] = queryset.distinct()
+    return matches
+
+
+def scan_search(terms, kind, limit, offset, using, within=None):
+    # Newest first: there is no relevance to rank by
+    keys = []
+    for kind_, queryset in scan_matches(terms, kind, using, within).items():
+        pks = queryset.order_by('-pk').values_list('pk', flat=True)[:offset + limit]
+        keys += [(kind_, pk) for pk in pks]
+    return keys[offset:offset + limit]
+
+
+def find(query, kind=None, page=1, page_size=PAGE_SIZE, using='default', within=None):
+    """The best (kind, pk) matches for ``query`` on ``page``, and whether there are more.
+
+    ``within``, a queryset of ``kind`` (e.g. the quotations with a given
+    status), limits the matches to its rows before they are ranked and paged.
+    """
+    terms = TERM.findall(query.lower())
+    if not terms:
+        return [], False
+    if within is not None and kind is None:
+        raise ValueError("find(within=...) needs the kind of the queryset")
+    offset = (page - 1) * page_size
+    index = engine(using)
+    if index is None:
+        keys = scan_search(terms, kind, page_size + 1, offset, using, within)
+    else:
+        keys = indexed_search(index, terms, kind, page_size + 1, offset, using, within)
+    return keys[:page_size], len(keys) > page_size
+
+
+def count(query, kind=None, using='default', within=None):
+    """The number of matches for ``query``, as ``find`` would page through them."""
+    terms = TERM.findall(query.lower())
+    if not terms:
+        return 0
+    if within is not None and kind is None:
+        raise ValueError("count(within=...) needs the kind of the queryset")
+    index = engine(using)
+    if index is None:
+        return sum(queryset.count() for queryset in scan_matches(terms, kind, using, within).values())
+    return indexed_count(index, terms, kind, using, within)
+
+
+def matching(query, kind, within, using='default'):
+    """``within``, a queryset of ``kind``, narrowed to its rows that match ``query`` (to aggregate over)."""
+    terms = TERM.findall(query.lower())
+    if not terms:
+        return within.none()
+    index = engine(using)
+    if index is None:
+        return within.filter(pk__in=scan_matches(terms, kind, using)[kind].values('pk'))
+    where, params = index_filter(index, terms, kind, None, using)
+    divide = 'DIV' if index == 'mysql' else '/'  # integer division of the row id
+    sql = f'SELECT {ROW_ID[index]} {divide} {len(KINDS)} FROM {TABLE} WHERE {where}'
+    return within.filter(pk__in=RawSQL(sql, params))
+
+
+############ VIEW ############
+
+def result(kind, obj):
+    if kind == 'quotation':
+        return {
+            'kind': kind,
+            'id': obj.pk,
+            'number': obj.quotation_number,
+            'customer': obj.customer.name,
+            'date': obj.created_at.date().isoformat(),
+            'grand_total': obj.grand_total,
+            'url': reverse('quotation_detail', args=[obj.pk]),
+        }
+    customer = obj.customer or (obj.quotation.customer if obj.quotation else None)
+    return {
+        'kind': kind,
+        'id': obj.pk,
+        'number': obj.invoice_number,
+        'customer': customer.name if customer else '',
+        'date': obj.invoice_date.isoformat() if obj.invoice_date else None,
+        'grand_total': obj.grand_total,
+        'url': reverse('invoice_detail', args=[obj.pk]),
+    }
+
+
+def positive_int(value, default):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def search(request):
+    """Ranked quotations and invoices matching ``q``, as JSON.
+
+    ``kind`` limits the results to quotations or invoices; ``page`` and
+    ``page_size`` (at most MAX_PAGE_SIZE) page through them.
+    """
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind')
+    if kind not in KINDS:
+        kind = None
+    page = positive_int(request.GET.get('page'), 1)
+    page_size = min(positive_int(request.GET.get('page_size'), PAGE_SIZE), MAX_PAGE_SIZE)
+
+    keys, has_next = find(query, kind, page, page_size)
+
+    objects = {
+        'quotation': Quotation.objects.select_related('customer').in_bulk(
+            [pk for k, pk in keys if k == 'quotation']),
+        'invoice': Invoice.objects.select_related('customer', 'quotation__customer').in_bulk(
+            [pk for k, pk in keys if k == 'invoice']),
+    }
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'has_next': has_next,
+        # A row deleted since the index was read is skipped
+        'results': [result(k, objects[k][pk]) for k, pk in keys if pk in objects[k]],
+    })
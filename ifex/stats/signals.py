@@ -0,0 +1,209 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import rollups, search
+from .models import Customer, Quotation, QuotationItem, Invoice, InvoiceItem
+from .pdf_cache import cache as pdf_cache
+from .invoice_pdf import INVOICE_DOCUMENTS
+
+
+# (item model, parent pk) pairs whose items line_items.save_items() is
+# writing, per thread: their per-item receivers stand down, and it calls
+# quotation_items_written / invoice_items_written once instead
+_bulk = threading.local()
+
+PARENT_ID = {QuotationItem: 'quotation_id', InvoiceItem: 'invoice_id'}
+
+
+@contextmanager
+def bulk_item_writes(model, parent_id):
+    writing = _bulk.__dict__.setdefault('parents', set())
+    writing.add((model, parent_id))
+    try:
+        yield
+    finally:
+        writing.discard((model, parent_id))
+
+
+def per_item(receiver):
+    @wraps(receiver)
+    def wrapper(sender, instance, **kwargs):
+        if (sender, getattr(instance, PARENT_ID[sender])) in getattr(_bulk, 'parents', ()):
+            return
+        return receiver(sender, instance, **kwargs)
+    return wrapper
+
+
+############ PDF CACHE INVALIDATION ############
+
+@receiver([post_save, post_delete], sender=Quotation)
+def quotation_changed(sender, instance, **kwargs):
+    pdf_cache.invalidate('quotation', instance.pk)
+
+
+@receiver([post_save, post_delete], sender=QuotationItem)
+@per_item
+def quotation_item_changed(sender, instance, **kwargs):
+    pdf_cache.invalidate('quotation', instance.quotation_id)
+
+
+def invalidate_invoice(pk):
+    # The invoice, its delivery order and the combined dispatch PDF
+    for kind in INVOICE_DOCUMENTS:
+        pdf_cache.invalidate(kind, pk)
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+def invoice_changed(sender, instance, **kwargs):
+    invalidate_invoice(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=InvoiceItem)
+@per_item
+def invoice_item_changed(sender, instance, **kwargs):
+    invalidate_invoice(instance.invoice_id)
+
+
+@receiver(post_save, sender=Customer)
+def customer_changed(sender, instance, created, **kwargs):
+    # Customer details are printed on every quotation and invoice they own
+    if created:
+        return
+    for pk in Quotation.objects.filter(customer=instance).values_list('pk', flat=True):
+        pdf_cache.invalidate('quotation', pk)
+    invoices = Invoice.objects.filter(Q(customer=instance) | Q(quotation__customer=instance))
+    for pk in invoices.values_list('pk', flat=True):
+        invalidate_invoice(pk)
+
+
+############ MODIFICATION TIMES ############
+
+# Items are part of their quotation or invoice: changing one changes the
+# parent's updated_at, which the conditional GET views compare against
+
+@receiver([post_save, post_delete], sender=QuotationItem)
+@per_item
+def quotation_item_touched(sender, instance, **kwargs):
+    Quotation.objects.filter(pk=instance.quotation_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=InvoiceItem)
+@per_item
+def invoice_item_touched(sender, instance, **kwargs):
+    Invoice.objects.filter(pk=instance.invoice_id).update(updated_at=timezone.now())
+
+
+# A quotation's page shows whether it has an invoice and links the first
+# one, so adding, removing or moving an invoice changes its quotation(s)
+
+@receiver(pre_save, sender=Invoice)
+def invoice_quotation_before(sender, instance, using, **kwargs):
+    instance._quotation_before = (
+        Invoice.objects.using(using).filter(pk=instance.pk).values_list('quotation_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+def quotations_of(instance):
+    """The invoice's quotation, and the one it was moved from by this save."""
+    return {instance.quotation_id, getattr(instance, '_quotation_before', None)} - {None}
+
+
+@receiver(post_save, sender=Invoice)
+def invoice_saved_touches_quotation(sender, instance, created, using, **kwargs):
+    if created or getattr(instance, '_quotation_before', None) != instance.quotation_id:
+        Quotation.objects.using(using).filter(pk__in=quotations_of(instance)).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Invoice)
+def invoice_deleted_touches_quotation(sender, instance, using, **kwargs):
+    Quotation.objects.using(using).filter(pk=instance.quotation_id).update(updated_at=timezone.now())
+
+
+############ SEARCH INDEX ############
+
+# A quotation's index row lists its invoices' numbers and an invoice's row
+# its quotation's number, so changing either re-indexes the other too
+
+@receiver([post_save, post_delete], sender=Quotation)
+def quotation_indexed(sender, instance, using, **kwargs):
+    search.schedule('quotation', instance.pk, using)
+    for pk in Invoice.objects.using(using).filter(quotation=instance).values_list('pk', flat=True):
+        search.schedule('invoice', pk, using)
+
+
+@receiver([post_save, post_delete], sender=QuotationItem)
+@per_item
+def quotation_item_indexed(sender, instance, using, **kwargs):
+    search.schedule('quotation', instance.quotation_id, using)
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+def invoice_indexed(sender, instance, using, **kwargs):
+    search.schedule('invoice', instance.pk, using)
+    # Including the quotation it was moved away from, which listed its number
+    for pk in quotations_of(instance):
+        search.schedule('quotation', pk, using)
+
+
+@receiver([post_save, post_delete], sender=InvoiceItem)
+@per_item
+def invoice_item_indexed(sender, instance, using, **kwargs):
+    search.schedule('invoice', instance.invoice_id, using)
+
+
+@receiver(post_save, sender=Customer)
+def customer_indexed(sender, instance, created, using, **kwargs):
+    if created:
+        return
+    for pk in Quotation.objects.using(using).filter(customer=instance).values_list('pk', flat=True):
+        search.schedule('quotation', pk, using)
+    invoices = Invoice.objects.using(using).filter(Q(customer=instance) | Q(quotation__customer=instance))
+    for pk in invoices.values_list('pk', flat=True):
+        search.schedule('invoice', pk, using)
+
+
+############ REVENUE ROLLUPS ############
+
+# The invoice's stored contribution is read before the write, and the
+# difference applied after it, in the same transaction when the save is in one
+
+@receiver([pre_save, pre_delete], sender=Invoice)
+def invoice_rollup_before(sender, instance, using, **kwargs):
+    instance._rollup_before = rollups.stored(instance.pk, using) if instance.pk else None
+
+
+@receiver(post_save, sender=Invoice)
+def invoice_rollup_saved(sender, instance, using, **kwargs):
+    rollups.apply(getattr(instance, '_rollup_before', None), rollups.contribution_of(instance), using)
+
+
+@receiver(post_delete, sender=Invoice)
+def invoice_rollup_deleted(sender, instance, using, **kwargs):
+    rollups.apply(getattr(instance, '_rollup_before', None), None, using)
+
+
+############ BULK ITEM WRITES ############
+
+# bulk_create and bulk_update send none of the signals above, and the item
+# receivers skip the deletes inside bulk_item_writes();
+# line_items.save_items() calls these once for all the lines it wrote
+
+def quotation_items_written(quotation_id, using=DEFAULT_DB_ALIAS):
+    pdf_cache.invalidate('quotation', quotation_id)
+    Quotation.objects.using(using).filter(pk=quotation_id).update(updated_at=timezone.now())
+    search.schedule('quotation', quotation_id, using)
+
+
+def invoice_items_written(invoice_id, using=DEFAULT_DB_ALIAS):
+    # Nothing for the revenue rollups: they follow the totals saved on the invoice
+    invalidate_invoice(invoice_id)
+    Invoice.objects.using(using).filter(pk=invoice_id).update(updated_at=timezone.now())
+    search.schedule('invoice', invoice_id, using)
@@ -1,3 +1,1231 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import os
+import tempfile
+import unittest
+import unittest.mock
+import warnings
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models.signals import pre_delete, pre_save
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import bulk_export, html_pdf, render_queue, rollups, search, thumbnails
+from .invoice_pdf import INVOICE_DOCUMENTS
+from .pdf_executor import get_render_executor
+from .pdf_cache import PDFCache, cache as pdf_cache, document_version, quotation_key
+from .pdf_layout import paginate
+from .pdf_parallel import merge_backend, render_parallel, split_pages
+from .models import (
+    Customer, Quotation, QuotationItem, Invoice, InvoiceItem,
+    DailyRevenue, MonthlyRevenue, CustomerMonthlyRevenue,
+)
+
+
+def make_quotation(customer, invoiced=False):
+    quotation = Quotation.objects.create(
+        customer=customer,
+        expected_delivery_date=datetime.date(2025, 6, 13),
+        total_price=100.0,
+        grand_total=105.0,
+    )
+    if invoiced:
+        Invoice.objects.create(quotation=quotation, customer=customer, total_amount=100.0, grand_total=105.0)
+    return quotation
+
+
+############ QUOTATION LIST ############
+
+class QuotationListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="Test Customer", city="Dubai")
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quotation_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_page_and_count_queries_only(self):
+        for i in range(3):
+            make_quotation(self.customer, invoiced=i % 2 == 0)
+        # The page of quotations and the total for the stat card
+        with self.assertNumQueries(2):
+            self.client.get(reverse('quotation_list'))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        make_quotation(self.customer)
+        make_quotation(self.customer, invoiced=True)
+        few, _ = self.count_queries()
+
+        for i in range(30):
+            make_quotation(self.customer, invoiced=i % 3 == 0)
+        many, _ = self.count_queries()
+
+        self.assertEqual(few, many)
+
+    def test_invoice_status_and_link(self):
+        pending = make_quotation(self.customer)
+        invoiced = make_quotation(self.customer, invoiced=True)
+        # A second invoice doesn't change which one the list links to
+        first = invoiced.invoices.get()
+        Invoice.objects.create(quotation=invoiced, customer=self.customer, total_amount=1.0, grand_total=1.05)
+
+        _, response = self.count_queries()
+        rows = {q.pk: q for q in response.context['quotations']}
+
+        self.assertFalse(rows[pending.pk].has_invoice)
+        self.assertIsNone(rows[pending.pk].first_invoice_id)
+        self.assertTrue(rows[invoiced.pk].has_invoice)
+        self.assertEqual(rows[invoiced.pk].first_invoice_id, first.pk)
+        self.assertContains(response, reverse('edit_invoice', args=[first.pk]))
+        self.assertContains(response, reverse('create_invoice', args=[pending.pk]))
+
+
+############ PAGINATION ############
+
+@override_settings(LIST_PAGE_SIZE=3)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(name="Test Customer")
+        cls.quotations = [make_quotation(customer) for _ in range(7)]
+        # Ties on created_at are ordered by id
+        Quotation.objects.filter(pk__in=[q.pk for q in cls.quotations[2:5]]).update(
+            created_at=cls.quotations[2].created_at,
+        )
+        # Newest first
+        cls.expected = [
+            q.pk for q in Quotation.objects.order_by('-created_at', '-id')
+        ]
+
+    def get(self, url='', **params):
+        response = self.client.get(reverse('quotation_list') + url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page'], [q.pk for q in response.context['quotations']]
+
+    def test_walks_forwards_and_back(self):
+        page, pks = self.get()
+        self.assertEqual(pks, self.expected[:3])
+        self.assertIsNone(page.previous_url)
+
+        page, pks = self.get(page.next_url)
+        self.assertEqual(pks, self.expected[3:6])
+        page, pks = self.get(page.next_url)
+        self.assertEqual(pks, self.expected[6:])
+        self.assertIsNone(page.next_url)
+
+        page, pks = self.get(page.previous_url)
+        self.assertEqual(pks, self.expected[3:6])
+        page, pks = self.get(page.previous_url)
+        self.assertEqual(pks, self.expected[:3])
+        self.assertIsNone(page.previous_url)
+
+    def test_pages_are_stable_when_rows_are_added(self):
+        page, _ = self.get()
+        make_quotation(self.quotations[0].customer)
+        _, pks = self.get(page.next_url)
+        self.assertEqual(pks, self.expected[3:6])
+
+    def test_page_size_parameter_is_kept(self):
+        page, pks = self.get(page_size=5)
+        self.assertEqual(pks, self.expected[:5])
+        self.assertIn('page_size=5', page.next_url)
+        _, pks = self.get(page.next_url)
+        self.assertEqual(pks, self.expected[5:])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('quotation_list'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_customer_list(self):
+        for i in range(4):
+            Customer.objects.create(name=f"Customer {i}")
+        response = self.client.get(reverse('customer_list'))
+        self.assertEqual(len(response.context['customers']), 3)
+        self.assertEqual(response.context['total'], 5)
+        response = self.client.get(reverse('customer_list') + response.context['page'].next_url)
+        self.assertEqual(len(response.context['customers']), 2)
+
+
+############ INVOICE LIST ############
+
+def explain(sql):
+    """The plan of ``sql``: detail lines on SQLite, row dicts on MySQL."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN ' + sql)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+class InvoiceListPeriodTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(name="Test Customer")
+        # One invoice every four days over three years, so a month is a
+        # small, selective part of the table
+        start = datetime.date(2023, 1, 1)
+        Invoice.objects.bulk_create(
+            Invoice(
+                invoice_number=f"INV{2001 + i}", customer=customer,
+                invoice_date=start + datetime.timedelta(days=4 * i),
+                total_amount=100.0, grand_total=105.0,
+            )
+            for i in range(275)
+        )
+        rollups.rebuild()  # bulk_create sends no signals
+        cls.period = {'from': '2024-03-01', 'to': '2024-03-31'}
+        cls.in_period = Invoice.objects.filter(invoice_date__range=(datetime.date(2024, 3, 1), datetime.date(2024, 3, 31)))
+
+    def get(self, params=None, url=''):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('invoice_list') + url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, queries
+
+    def test_period_rows_and_totals_in_one_query(self):
+        response, queries = self.get(self.period)
+        self.assertEqual(len(queries), 1)
+        count = self.in_period.count()
+        self.assertEqual(response.context['total'], count)
+        self.assertAlmostEqual(response.context['total_revenue'], 105.0 * count)
+        self.assertEqual(
+            [i.pk for i in response.context['invoices']],
+            list(self.in_period.order_by('-invoice_date', '-id').values_list('pk', flat=True)),
+        )
+
+    @override_settings(LIST_PAGE_SIZE=3)
+    def test_totals_cover_the_period_on_every_page(self):
+        first, _ = self.get(self.period)
+        second, _ = self.get(url=first.context['page'].next_url)
+        self.assertNotEqual(second.context['invoices'], first.context['invoices'])
+        self.assertEqual(second.context['total'], first.context['total'])
+        self.assertEqual(second.context['total_revenue'], first.context['total_revenue'])
+
+    def test_empty_period(self):
+        response, _ = self.get({'from': '2030-01-01', 'to': '2030-01-31'})
+        self.assertEqual(response.context['total'], 0)
+        self.assertEqual(response.context['total_revenue'], 0)
+
+    def test_invalid_period(self):
+        for params in ({'from': '2024-13-01'}, {'from': 'abc'}, {'to': '31/03/2024'},
+                       {'from': '2024-03-31', 'to': '2024-03-01'}):
+            self.assertEqual(self.client.get(reverse('invoice_list'), params).status_code, 400)
+
+    def test_period_query_uses_the_invoice_date_index(self):
+        if connection.vendor not in ('sqlite', 'mysql'):
+            raise unittest.SkipTest(f"No plan check for {connection.vendor}")
+        _, queries = self.get(self.period)
+        plan = explain(queries[0]['sql'])
+
+        if connection.vendor == 'sqlite':
+            # The page searches the index and the totals the monthly rollup;
+            # nothing scans a table
+            self.assertEqual(sum('INDEX invoice_date_idx' in line for line in plan), 1, plan)
+            self.assertEqual(sum('INDEX sqlite_autoindex_stats_monthlyrevenue' in line for line in plan), 2, plan)
+            self.assertFalse([line for line in plan if line.startswith('SCAN')], plan)
+        else:
+            invoice_rows = [row for row in plan if row['table'] == 'stats_invoice']
+            self.assertEqual(len(invoice_rows), 1, plan)
+            self.assertEqual(invoice_rows[0]['key'], 'invoice_date_idx', plan)
+            self.assertEqual(invoice_rows[0]['type'], 'range', plan)
+            rollup_rows = [row for row in plan if row['table'] == 'U0']
+            self.assertEqual(len(rollup_rows), 2, plan)
+            for row in rollup_rows:
+                self.assertEqual(row['key'], 'month', plan)
+
+
+############ SEARCH ############
+
+@override_settings(PDF_PRERENDER=False)  # on-commit callbacks run: don't queue test records
+class SearchTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer = Customer.objects.create(name="Gulf Steel Trading", phone="055 123 4567")
+            self.other = Customer.objects.create(name="Marina Interiors")
+            self.quotation = make_quotation(self.customer)
+            QuotationItem.objects.create(quotation=self.quotation, item_name="Galvanized steel sheet 2mm", quantity=10, price=5)
+            self.plain = make_quotation(self.other)
+            QuotationItem.objects.create(quotation=self.plain, item_name="Gypsum board", quantity=1, price=1)
+            self.invoice = Invoice.objects.create(quotation=self.plain, customer=self.other, total_amount=1.0, grand_total=1.05)
+            InvoiceItem.objects.create(invoice=self.invoice, item_name="Gypsum board", quantity=1, price=1)
+
+    def find(self, query, kind=None):
+        return search.find(query, kind)[0]
+
+    def test_uses_the_index(self):
+        self.assertEqual(search.engine(), 'fts5')
+
+    def test_finds_every_indexed_field(self):
+        q = ('quotation', self.quotation.pk)
+        self.assertIn(q, self.find(self.quotation.quotation_number))
+        self.assertIn(q, self.find(self.quotation.quotation_number[2:]))  # digits only
+        self.assertIn(q, self.find("gulf ste"))  # prefixes
+        self.assertIn(q, self.find("0551234567"))
+        self.assertIn(q, self.find("galvanized"))
+        self.assertEqual(self.find("galvanized marina"), [])
+
+    def test_invoice_number_finds_invoice_and_quotation(self):
+        keys = self.find(self.invoice.invoice_number)
+        self.assertEqual(set(keys), {('invoice', self.invoice.pk), ('quotation', self.plain.pk)})
+        self.assertEqual(self.find(self.invoice.invoice_number, 'invoice'), [('invoice', self.invoice.pk)])
+
+    def test_number_matches_rank_above_item_matches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            QuotationItem.objects.create(quotation=self.plain, item_name="Marina trim", quantity=1, price=1)
+            by_item = make_quotation(self.customer)
+            QuotationItem.objects.create(quotation=by_item, item_name="Marina Interiors panel", quantity=1, price=1)
+        self.assertEqual(self.find("marina", 'quotation')[0], ('quotation', self.plain.pk))
+
+    def test_changes_are_reindexed_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            QuotationItem.objects.filter(quotation=self.quotation).delete()
+            QuotationItem.objects.create(quotation=self.quotation, item_name="Aluminium profile", quantity=1, price=1)
+            self.customer.name = "Desert Metals"
+            self.customer.save()
+        q = ('quotation', self.quotation.pk)
+        self.assertIn(q, self.find("aluminium"))
+        self.assertIn(q, self.find("desert"))
+        self.assertNotIn(q, self.find("gulf"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plain.delete()
+        self.assertEqual(self.find("gypsum"), [])
+
+    def test_rebuild(self):
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual(len(self.find("gypsum")), 2)
+
+    def test_endpoint_pages_results(self):
+        response = self.client.get(reverse('search'), {'q': 'gypsum', 'page_size': 1})
+        data = response.json()
+        self.assertTrue(data['has_next'])
+        self.assertEqual(len(data['results']), 1)
+
+        data = self.client.get(reverse('search'), {'q': 'gypsum', 'page_size': 1, 'page': 2}).json()
+        self.assertFalse(data['has_next'])
+        kinds = {r['kind'] for r in data['results']}
+        self.assertEqual(len(data['results']), 1)
+        self.assertTrue(kinds <= {'quotation', 'invoice'})
+
+    def test_quotation_list_search(self):
+        response = self.client.get(reverse('quotation_list'), {'search': 'galvanized'})
+        self.assertEqual([q.pk for q in response.context['quotations']], [self.quotation.pk])
+
+        response = self.client.get(reverse('quotation_list'), {'status': 'invoiced'})
+        self.assertEqual([q.pk for q in response.context['quotations']], [self.plain.pk])
+
+    def test_search_within_a_queryset(self):
+        within = Quotation.objects.exclude(pk=self.plain.pk)
+        self.assertEqual(search.find("gypsum", 'quotation', within=within)[0], [])
+        self.assertEqual(search.count("gypsum", 'quotation', within=within), 0)
+        self.assertEqual(search.count("gypsum"), 2)
+        with self.assertRaises(ValueError):
+            search.find("gypsum", within=within)
+
+    def test_scan_fallback_within_a_queryset(self):
+        search._engines['default'] = None
+        try:
+            within = Quotation.objects.exclude(pk=self.plain.pk)
+            self.assertEqual(search.find("gypsum", 'quotation')[0], [('quotation', self.plain.pk)])
+            self.assertEqual(search.find("gypsum", 'quotation', within=within)[0], [])
+            self.assertEqual(search.count("gypsum"), 2)
+        finally:
+            search._engines.pop('default')
+
+    def test_quotation_list_search_pages_with_status(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pending = [make_quotation(self.customer) for _ in range(3)]
+            invoiced = make_quotation(self.customer, invoiced=True)
+        url = reverse('quotation_list')
+        seen = []
+        params = {'search': 'gulf', 'status': 'pending', 'page_size': 2}
+        response = self.client.get(url, params)
+        self.assertEqual(response.context['total'], 4)
+        seen += [q.pk for q in response.context['quotations']]
+        next_url = response.context['page'].next_url
+        self.assertIn('page=2', next_url)
+        self.assertContains(response, 'rel="next"')
+
+        response = self.client.get(url + next_url)
+        seen += [q.pk for q in response.context['quotations']]
+        self.assertIsNone(response.context['page'].next_url)
+        self.assertEqual(sorted(seen), sorted([self.quotation.pk] + [q.pk for q in pending]))
+
+        response = self.client.get(url, {'search': 'gulf', 'status': 'invoiced'})
+        self.assertEqual([q.pk for q in response.context['quotations']], [invoiced.pk])
+        self.assertEqual(response.context['total'], 1)
+
+    def test_invoice_list_search(self):
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            dated = Invoice.objects.create(
+                quotation=self.plain, customer=self.other, invoice_date=today,
+                total_amount=2.0, grand_total=2.1,
+            )
+            InvoiceItem.objects.create(invoice=dated, item_name="Gypsum board", quantity=2, price=1)
+            Invoice.objects.create(customer=self.customer, invoice_date=today, total_amount=1.0, grand_total=1.05)
+        period = {'from': today.replace(day=1).isoformat(), 'to': today.isoformat()}
+
+        response = self.client.get(reverse('invoice_list'), {**period, 'search': 'gypsum'})
+        # The undated invoice matches too, but is outside the period
+        self.assertEqual([i.pk for i in response.context['invoices']], [dated.pk])
+        self.assertEqual(response.context['total'], 1)
+        self.assertAlmostEqual(response.context['total_revenue'], 2.1)
+        self.assertContains(response, 'value="gypsum"')
+        self.assertContains(response, 'Revenue of matching invoices')
+
+        response = self.client.get(reverse('invoice_list'), period)
+        self.assertEqual(response.context['total'], 2)
+        self.assertAlmostEqual(response.context['total_revenue'], 3.15)
+
+    def test_matching_queryset(self):
+        matches = search.matching("gypsum", 'invoice', Invoice.objects.all())
+        self.assertEqual(list(matches), [self.invoice])
+        self.assertEqual(search.matching("nothing", 'invoice', Invoice.objects.all()).count(), 0)
+        search._engines['default'] = None
+        try:
+            self.assertEqual(list(search.matching("gypsum", 'invoice', Invoice.objects.all())), [self.invoice])
+        finally:
+            search._engines.pop('default')
+
+    def test_moved_invoice_reindexes_both_quotations(self):
+        number = self.invoice.invoice_number
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice.quotation = self.quotation
+            self.invoice.save()
+        keys = self.find(number, 'quotation')
+        self.assertEqual(keys, [('quotation', self.quotation.pk)])
+
+
+############ REVENUE ROLLUPS ############
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Gulf Steel Trading")
+        self.other = Customer.objects.create(name="Marina Interiors")
+
+    def invoice(self, day, net=100.0, customer=None):
+        return Invoice.objects.create(
+            customer=customer or self.customer, invoice_date=day,
+            total_amount=net, grand_total=net * 1.05,
+        )
+
+    def figures(self, model, **lookup):
+        row = model.objects.filter(**lookup).values_list('invoice_count', 'net', 'vat', 'grand_total').first()
+        return tuple(round(value, 2) for value in row) if row else None
+
+    def test_create_edit_and_delete(self):
+        invoice = self.invoice(datetime.date(2024, 3, 5))
+        self.invoice(datetime.date(2024, 3, 5), net=50.0)
+        self.assertEqual(self.figures(DailyRevenue, day=datetime.date(2024, 3, 5)), (2, 150.0, 7.5, 157.5))
+        self.assertEqual(self.figures(MonthlyRevenue, month=datetime.date(2024, 3, 1)), (2, 150.0, 7.5, 157.5))
+
+        # Another month and customer, with the date as the edit form posts it
+        invoice.invoice_date = '2024-04-02'
+        invoice.customer = self.other
+        invoice.total_amount, invoice.grand_total = 200.0, 210.0
+        invoice.save()
+        self.assertEqual(self.figures(MonthlyRevenue, month=datetime.date(2024, 3, 1)), (1, 50.0, 2.5, 52.5))
+        self.assertEqual(self.figures(MonthlyRevenue, month=datetime.date(2024, 4, 1)), (1, 200.0, 10.0, 210.0))
+        self.assertEqual(
+            self.figures(CustomerMonthlyRevenue, customer=self.other, month=datetime.date(2024, 4, 1)),
+            (1, 200.0, 10.0, 210.0),
+        )
+        self.assertEqual(
+            self.figures(CustomerMonthlyRevenue, customer=self.customer, month=datetime.date(2024, 3, 1)),
+            (1, 50.0, 2.5, 52.5),
+        )
+
+        invoice.delete()
+        self.assertEqual(self.figures(MonthlyRevenue, month=datetime.date(2024, 4, 1)), (0, 0, 0, 0))
+        self.assertEqual(rollups.verify(), [])
+
+    def test_undated_invoices_are_not_counted(self):
+        invoice = self.invoice(None)
+        self.assertFalse(DailyRevenue.objects.exists())
+        invoice.invoice_date = datetime.date(2024, 3, 5)
+        invoice.save()
+        self.assertEqual(self.figures(DailyRevenue, day=datetime.date(2024, 3, 5))[0], 1)
+        self.assertEqual(rollups.verify(), [])
+
+    def test_rolled_back_with_the_save(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.invoice(datetime.date(2024, 3, 5))
+            raise RuntimeError
+        self.assertFalse(DailyRevenue.objects.exists())
+        self.assertFalse(MonthlyRevenue.objects.exists())
+
+    def test_period_totals_from_months_and_edge_days(self):
+        for day in range(0, 120, 3):
+            self.invoice(datetime.date(2024, 1, 1) + datetime.timedelta(days=day))
+        date_from, date_to = datetime.date(2024, 1, 20), datetime.date(2024, 4, 10)
+        self.assertEqual(
+            rollups.period_parts(date_from, date_to),
+            ((datetime.date(2024, 2, 1), datetime.date(2024, 3, 1)),
+             [(date_from, datetime.date(2024, 1, 31)), (datetime.date(2024, 4, 1), date_to)]),
+        )
+        invoices = Invoice.objects.filter(invoice_date__range=(date_from, date_to))
+        totals = rollups.period_totals(date_from, date_to)
+        self.assertEqual(totals['invoice_count'], invoices.count())
+        self.assertAlmostEqual(totals['grand_total'], 105.0 * invoices.count())
+
+        annotated = Customer.objects.annotate(**rollups.period_annotations(date_from, date_to)).first()
+        self.assertEqual(annotated.period_invoice_count, invoices.count())
+        self.assertAlmostEqual(annotated.period_net, 100.0 * invoices.count())
+
+    def test_command_rebuilds_and_verifies(self):
+        Invoice.objects.bulk_create([  # no signals
+            Invoice(invoice_number="INV9001", customer=self.customer, invoice_date=datetime.date(2024, 3, 5),
+                    total_amount=100.0, grand_total=105.0),
+        ])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_revenue_rollups', '--verify', stdout=io.StringIO(), stderr=io.StringIO())
+        call_command('rebuild_revenue_rollups', stdout=io.StringIO())
+        self.assertEqual(rollups.verify(), [])
+        self.assertEqual(self.figures(DailyRevenue, day=datetime.date(2024, 3, 5)), (1, 100.0, 5.0, 105.0))
+
+    def test_home_dashboard(self):
+        today = timezone.localdate()
+        self.invoice(today)
+        self.invoice(today, net=300.0, customer=self.other)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['month_revenue'].invoice_count, 2)
+        self.assertAlmostEqual(response.context['year_revenue'], 420.0)
+        self.assertEqual([row.customer for row in response.context['top_customers']], [self.other, self.customer])
+
+
+@override_settings(PDF_PRERENDER=False)
+class RevenueRollupLockTests(TransactionTestCase):
+    """Outside a test transaction: saves must open their own."""
+
+    def test_stored_figures_are_read_in_the_write_transaction(self):
+        seen = []
+
+        def record(sender, **kwargs):
+            seen.append(connection.in_atomic_block)
+
+        pre_save.connect(record, sender=Invoice)
+        pre_delete.connect(record, sender=Invoice)
+        try:
+            invoice = Invoice.objects.create(invoice_date=datetime.date(2024, 3, 5), total_amount=100.0, grand_total=105.0)
+            invoice.total_amount, invoice.grand_total = 200.0, 210.0
+            invoice.save()
+            invoice.delete()
+        finally:
+            pre_save.disconnect(record, sender=Invoice)
+            pre_delete.disconnect(record, sender=Invoice)
+        self.assertEqual(seen, [True, True, True])
+        self.assertEqual(rollups.verify(), [])
+
+
+############ LINE ITEMS ############
+
+def item_post(lines, ids=None, **fields):
+    data = {
+        'item_name': [name for name, _, _ in lines],
+        'quantity': [str(qty) for _, qty, _ in lines],
+        'price': [str(price) for _, _, price in lines],
+        **fields,
+    }
+    if ids is not None:
+        data['item_id'] = ['' if pk is None else str(pk) for pk in ids]
+    return data
+
+
+# The on-commit callbacks these tests run would otherwise queue pre-renders
+# of test records in the real PDF_QUEUE_PATH
+@override_settings(PDF_PRERENDER=False)
+class LineItemTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Gulf Steel Trading")
+        self.lines = [(f"Item {n}", n + 1, 2.5) for n in range(20)]
+
+    def create_quotation(self, lines):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create_quotation'), item_post(
+                lines, customer=self.customer.pk, expected_delivery_date='2025-06-13',
+            ))
+        return Quotation.objects.latest('pk'), len(queries)
+
+    def edit_quotation(self, quotation, lines, tax='5', ids=None):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('quotation_edit', args=[quotation.pk]), item_post(
+                lines, ids, customer=self.customer.pk, expected_delivery_date='2025-06-13', tax=tax,
+            ))
+        return len(queries)
+
+    def items(self, parent):
+        return list(parent.items.order_by('pk').values_list('pk', 'item_name', 'quantity', 'price'))
+
+    def test_create_queries_do_not_grow_with_lines(self):
+        # Re-indexes anything earlier tests left scheduled, so it isn't counted
+        self.create_quotation(self.lines[:1])
+        quotation, few = self.create_quotation(self.lines[:2])
+        self.assertEqual([row[1:] for row in self.items(quotation)], self.lines[:2])
+        quotation, many = self.create_quotation(self.lines)
+        self.assertEqual([row[1:] for row in self.items(quotation)], self.lines)
+        self.assertEqual(few, many)
+
+    def test_edit_writes_only_the_difference(self):
+        quotation, _ = self.create_quotation(self.lines)
+        before = self.items(quotation)
+        lines = list(self.lines)
+        lines[3] = ("Item 3, laminated", 4, 3.0)
+        self.edit_quotation(quotation, lines)
+        after = self.items(quotation)
+        self.assertEqual([row[0] for row in after], [row[0] for row in before])  # same rows
+        self.assertEqual([row[1:] for row in after], lines)
+        self.assertEqual(search.find("laminated")[0], [('quotation', quotation.pk)])
+
+        # Lines removed from the end, then added back
+        self.edit_quotation(quotation, lines[:5])
+        self.assertEqual(self.items(quotation), after[:5])
+        self.edit_quotation(quotation, lines[:7])
+        self.assertEqual([row[1:] for row in self.items(quotation)], lines[:7])
+
+        quotation.refresh_from_db()
+        self.assertAlmostEqual(quotation.total_price, sum(qty * price for _, qty, price in lines[:7]))
+
+    def test_posted_ids_keep_their_rows(self):
+        quotation, _ = self.create_quotation(self.lines[:6])
+        before = self.items(quotation)
+        ids = [row[0] for row in before]
+
+        # Deleting the first line deletes its row and rewrites none
+        self.edit_quotation(quotation, self.lines[1:6], ids=ids[1:])
+        self.assertEqual(self.items(quotation), before[1:])
+
+        # A line inserted above others: the rows keep the line order
+        lines = self.lines[1:3] + [("Inserted", 1, 1.0)] + self.lines[3:6]
+        self.edit_quotation(quotation, lines, ids=ids[1:3] + [None] + ids[3:6])
+        after = self.items(quotation)
+        self.assertEqual([row[1:] for row in after], lines)
+        self.assertEqual([row[0] for row in after[:2]], ids[1:3])
+        self.assertEqual(search.find("inserted")[0], [('quotation', quotation.pk)])
+
+    def test_deletes_do_not_run_item_signals_per_row(self):
+        few, _ = self.create_quotation(self.lines)
+        many, _ = self.create_quotation(self.lines)
+        modified = few.updated_at
+        one = self.edit_quotation(few, self.lines[1:], ids=[row[0] for row in self.items(few)][1:])
+        all_but_one = self.edit_quotation(many, self.lines[:1], ids=[row[0] for row in self.items(many)][:1])
+        self.assertEqual(one, all_but_one)
+        few.refresh_from_db()
+        self.assertGreater(few.updated_at, modified)
+
+    def test_misaligned_ids_fall_back_to_positions(self):
+        quotation, _ = self.create_quotation(self.lines[:3])
+        ids = [row[0] for row in self.items(quotation)]
+        self.edit_quotation(quotation, self.lines[1:3], ids=ids)
+        self.assertEqual(self.items(quotation), [(pk, *line) for pk, line in zip(ids, self.lines[1:3])])
+
+    def test_edit_bumps_the_modification_time(self):
+        quotation, _ = self.create_quotation(self.lines[:3])
+        modified = quotation.updated_at
+        self.edit_quotation(quotation, self.lines[:4])
+        quotation.refresh_from_db()
+        self.assertGreater(quotation.updated_at, modified)
+
+    def test_invalid_edit_changes_nothing(self):
+        quotation, _ = self.create_quotation(self.lines[:3])
+        before = self.items(quotation)
+        self.edit_quotation(quotation, [("Good line", 1, 1.0), ("Bad line", 0, 1.0)])
+        self.assertEqual(self.items(quotation), before)
+
+    def test_invoice_edit(self):
+        self.client.post(reverse('create_invoice_no_quotation'), item_post(
+            self.lines, customer=self.customer.pk, invoice_date='2025-06-13',
+        ))
+        invoice = Invoice.objects.latest('pk')
+        before = self.items(invoice)
+        self.assertEqual([row[1:] for row in before], self.lines)
+
+        lines = self.lines[:10] + [("Delivery", 1, 50.0)]
+        self.client.post(reverse('edit_invoice', args=[invoice.pk]), item_post(
+            lines, customer=self.customer.pk, invoice_date='2025-06-13', tax='5',
+        ))
+        after = self.items(invoice)
+        self.assertEqual([row[0] for row in after[:10]], [row[0] for row in before[:10]])
+        self.assertEqual([row[1:] for row in after], lines)
+        self.assertEqual(rollups.verify(), [])
+
+
+############ PDF PAGINATION ############
+
+class PaginateTests(SimpleTestCase):
+    def test_empty_table_is_one_page(self):
+        self.assertEqual(paginate([], 100, 200, last_reserve=30), [(0, 0)])
+
+    def test_exact_fit_on_the_first_page(self):
+        self.assertEqual(paginate([10] * 10, 100), [(0, 10)])
+        self.assertEqual(paginate([10] * 11, 100), [(0, 10), (10, 11)])
+
+    def test_totals_spill_onto_a_new_page(self):
+        # The rows fit, the totals block below them doesn't: the trailing
+        # rows that fit with the totals move to a new page
+        self.assertEqual(paginate([10] * 10, 100, last_reserve=30), [(0, 3), (3, 10)])
+        # With room for the totals everything stays on one page
+        self.assertEqual(paginate([10] * 7, 100, last_reserve=30), [(0, 7)])
+
+    def test_row_taller_than_a_page(self):
+        # It gets a page of its own rather than being dropped or looping
+        self.assertEqual(paginate([10, 500, 10], 100), [(0, 1), (1, 2), (2, 3)])
+        self.assertEqual(paginate([500], 100), [(0, 1)])
+
+    def test_first_and_later_page_capacities(self):
+        pages = paginate([10] * 25, 50, 100)
+        self.assertEqual(pages, [(0, 5), (5, 15), (15, 25)])
+        # Every row is on exactly one page, in order
+        self.assertEqual([i for start, stop in pages for i in range(start, stop)], list(range(25)))
+
+    def test_row_taller_than_a_page_with_totals(self):
+        # The totals can't share its page, so they get the next one
+        self.assertEqual(paginate([500], 100, last_reserve=30), [(0, 1), (1, 1)])
+
+    def test_quotation_page_counts(self):
+        from .utils import QUOTATION_TEMPLATE
+
+        # One-line rows are all table.row_height high, so the page count
+        # follows from the template's geometry
+        plan = QUOTATION_TEMPLATE.plan
+        self.assertEqual(plan.first_capacity, plan.capacity)
+        per_page = int(plan.capacity // plan.table.row_height)
+        with_totals = int((plan.capacity - plan.last_reserve) // plan.table.row_height)
+
+        def expected(count):
+            pages = max(1, -(-count // per_page))
+            on_last = count - (pages - 1) * per_page
+            return pages + (on_last > with_totals)
+
+        quotation = Quotation(customer=Customer(name="Test Customer"),
+                              expected_delivery_date=datetime.date(2025, 6, 13),
+                              total_price=0.0, grand_total=0.0)
+        counts = sorted({0, 1, with_totals, with_totals + 1, per_page, per_page + 1, 40, 300})
+        for count in counts:
+            items = [QuotationItem(quotation=quotation, item_name=f"Item {n}", quantity=1, price=1.0)
+                     for n in range(count)]
+            with self.subTest(items=count):
+                self.assertEqual(len(QUOTATION_TEMPLATE.layout(items).pages), expected(count))
+
+
+############ PARALLEL PAGES ############
+
+class SplitPagesTests(SimpleTestCase):
+    def test_contiguous_batches_of_near_equal_size(self):
+        self.assertEqual(split_pages(10, 3), [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(split_pages(8, 4), [(0, 2), (2, 4), (4, 6), (6, 8)])
+
+    def test_no_more_batches_than_pages(self):
+        self.assertEqual(split_pages(2, 8), [(0, 1), (1, 2)])
+        self.assertEqual(split_pages(1, 4), [(0, 1)])
+
+
+@unittest.skipUnless(merge_backend(), "needs pypdf or pypdfium2")
+class ParallelRenderTests(TestCase):
+    def test_batches_concatenate_to_the_serial_document(self):
+        import pypdfium2 as pdfium
+        from .utils import QUOTATION_TEMPLATE
+
+        quotation = make_quotation(Customer.objects.create(name="Test Customer"))
+        items = [
+            QuotationItem(quotation=quotation, item_name=f"Item {n}", quantity=n + 1, price=1.25)
+            for n in range(120)
+        ]
+        serial, merged = io.BytesIO(), io.BytesIO()
+        QUOTATION_TEMPLATE.render(serial, quotation, items)
+        with ThreadPoolExecutor(3) as executor:
+            render_parallel('stats.utils.QUOTATION_TEMPLATE', merged, quotation, items, executor=executor, workers=3)
+
+        def page_texts(buf):
+            document = pdfium.PdfDocument(buf.getvalue())
+            return [page.get_textpage().get_text_range() for page in document]
+
+        expected = page_texts(serial)
+        self.assertGreaterEqual(len(expected), 3)
+        # Same pages, page numbers, item numbers and totals, in order
+        self.assertEqual(page_texts(merged), expected)
+
+
+############ PDF CACHE ############
+
+class PDFCacheTests(TestCase):
+    def setUp(self):
+        self.root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(PDF_CACHE_DIR=self.root, PDF_CACHE_MAX_BYTES=1000, PDF_PRERENDER=False))
+        self.customer = Customer.objects.create(name="Gulf Steel Trading")
+        self.quotation = make_quotation(self.customer, invoiced=True)
+        self.invoice = self.quotation.invoices.get()
+
+    def cached(self, kind, pk, size=10):
+        path, _ = pdf_cache.get_or_render(kind, pk, 'key', lambda f: f.write(b'%' * size))
+        return path
+
+    def test_miss_then_hit(self):
+        cache = PDFCache()
+        rendered = []
+
+        def render(f):
+            rendered.append(1)
+            f.write(b'%PDF')
+
+        first, hit = cache.get_or_render('quotation', 1, 'abc', render)
+        self.assertFalse(hit)
+        second, hit = cache.get_or_render('quotation', 1, 'abc', render)
+        self.assertTrue(hit)
+        self.assertEqual(first, second)
+        self.assertEqual(len(rendered), 1)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_item_edit_changes_the_key(self):
+        item = QuotationItem.objects.create(quotation=self.quotation, item_name="Flyers", quantity=100, price=0.5)
+        before = quotation_key(self.quotation, [item])
+        item.price = 0.45
+        self.assertNotEqual(quotation_key(self.quotation, [item]), before)
+
+    def test_item_save_invalidates_the_quotation(self):
+        path = self.cached('quotation', self.quotation.pk)
+        QuotationItem.objects.create(quotation=self.quotation, item_name="Flyers", quantity=100, price=0.5)
+        self.assertFalse(os.path.exists(path))
+
+    def test_customer_edit_invalidates_their_documents(self):
+        other = make_quotation(Customer.objects.create(name="Marina Interiors"))
+        theirs = [self.cached('quotation', self.quotation.pk)]
+        theirs += [self.cached(kind, self.invoice.pk) for kind in INVOICE_DOCUMENTS]
+        unrelated = self.cached('quotation', other.pk)
+
+        self.customer.phone = "055 123 4567"
+        self.customer.save()
+        self.assertEqual([path for path in theirs if os.path.exists(path)], [])
+        self.assertTrue(os.path.exists(unrelated))
+
+    def test_evict_least_recently_used(self):
+        cache = PDFCache()
+        paths = []
+        for pk in range(4):
+            path, _ = cache.get_or_render('quotation', pk, 'key', lambda f: f.write(b'%' * 300))
+            os.utime(path, (1000 + pk, 1000 + pk))
+            paths.append(path)
+        # 1200 bytes written, the oldest one went to stay within 1000
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, True, True])
+        self.assertEqual(cache.evictions, 1)
+
+        # A hit makes a file recent again
+        self.assertEqual(cache.get('quotation', 1, 'key'), paths[1])
+        cache.get_or_render('quotation', 9, 'key', lambda f: f.write(b'%' * 300))
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, False, True])
+
+    def test_evict_keeps_the_new_file(self):
+        cache = PDFCache()
+        small = self.cached('quotation', 1)
+        big, _ = cache.get_or_render('quotation', 2, 'key', lambda f: f.write(b'%' * 2000))
+        # Over the limit on its own, but just rendered for the request
+        self.assertTrue(os.path.exists(big))
+        self.assertFalse(os.path.exists(small))
+
+    def test_evict_counts_previews(self):
+        cache = PDFCache()
+        preview = os.path.splitext(self.cached('quotation', 1))[0] + '.png'
+        with open(preview, 'wb') as f:
+            f.write(b'\x89PNG' * 200)
+        os.utime(preview, (1000, 1000))
+        path, _ = cache.get_or_render('quotation', 2, 'key', lambda f: f.write(b'%' * 300))
+        # 810 bytes of PDFs fit; with the 800-byte PNG they don't, and it is the oldest
+        self.assertFalse(os.path.exists(preview))
+        self.assertTrue(os.path.exists(path))
+
+    def test_walks_only_when_the_running_total_is_over_the_limit(self):
+        cache = PDFCache()
+        with unittest.mock.patch.object(cache, 'scan', wraps=cache.scan) as scan:
+            for pk in range(3):
+                cache.get_or_render('quotation', pk, 'key', lambda f: f.write(b'%' * 300))
+            # Counted from disk on the first write only
+            self.assertEqual(scan.call_count, 1)
+
+            cache.invalidate('quotation', 0)  # walks its own directory
+            cache.get_or_render('quotation', 3, 'key', lambda f: f.write(b'%' * 300))
+            self.assertEqual(scan.call_count, 2)
+            self.assertEqual(cache.evictions, 0)
+
+            # 1200 bytes: recounted, and evicted down to 900
+            cache.get_or_render('quotation', 4, 'key', lambda f: f.write(b'%' * 300))
+            self.assertEqual(scan.call_count, 3)
+            self.assertEqual(cache.evictions, 1)
+            self.assertEqual(sum(size for _, size, _ in cache.scan()), 900)
+
+
+############ PDF VIEWS ############
+
+def content(response):
+    if getattr(response, 'streaming', False):
+        body = b''.join(response.streaming_content)
+        response.close()
+        return body
+    return response.content
+
+
+class PDFViewTestCase(TestCase):
+    """Renders inline on the test's connection, into a temporary cache."""
+
+    def setUp(self):
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(PDF_CACHE_DIR=root, PDF_RENDER_INLINE=True, PDF_PRERENDER=False))
+        self.customer = Customer.objects.create(name="Gulf Steel Trading", city="Dubai")
+        self.quotation = make_quotation(self.customer, invoiced=True)
+        QuotationItem.objects.create(quotation=self.quotation, item_name="Flyers", quantity=100, price=0.5)
+        self.invoice = self.quotation.invoices.get()
+        self.invoice.invoice_date = datetime.date(2025, 6, 13)
+        self.invoice.save()
+        InvoiceItem.objects.create(invoice=self.invoice, item_name="Flyers", quantity=100, price=0.5)
+
+    def urls(self):
+        return [
+            reverse('quotation_pdf', args=[self.quotation.pk]),
+            reverse('invoice_pdf', args=[self.invoice.pk]),
+            reverse('do_pdf', args=[self.invoice.pk]),
+            reverse('dispatch_pdf', args=[self.invoice.pk]),
+        ]
+
+
+class PDFViewTests(PDFViewTestCase):
+    def test_renders_then_serves_from_the_cache(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first['Content-Type'], 'application/pdf')
+                self.assertTrue(content(first).startswith(b'%PDF'))
+                self.assertEqual(first['X-PDF-Cache'], 'miss')
+                second = self.client.get(url)
+                content(second)
+                self.assertEqual(second['X-PDF-Cache'], 'hit')
+
+    def test_missing_record(self):
+        self.assertEqual(self.client.get(reverse('quotation_pdf', args=[999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('invoice_pdf', args=[999])).status_code, 404)
+
+    def test_busy_renderer_answers_503_but_still_revalidates(self):
+        url = reverse('invoice_pdf', args=[self.invoice.pk])
+        first = self.client.get(url)
+        content(first)
+        etag = first['ETag']
+        executor = get_render_executor()
+        pending, executor.pending = executor.pending, executor.limit
+        try:
+            busy = self.client.get(url)
+            self.assertEqual(busy.status_code, 503)
+            self.assertIn('Retry-After', busy)
+            # A revalidation needs no render slot
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        finally:
+            executor.pending = pending
+
+
+############ HTML PDF ############
+
+class StaticFetcherTests(SimpleTestCase):
+    """WeasyPrint's url_fetcher; reading static files doesn't need WeasyPrint."""
+
+    def test_static_file(self):
+        found = html_pdf.static_path('/static/css/quotation_pdf.css')
+        self.assertTrue(found.endswith(os.path.join('css', 'quotation_pdf.css')))
+
+        fetched = html_pdf.fetch_static(html_pdf.BASE_URL + 'static/css/quotation_pdf.css')
+        with fetched['file_obj'] as f:
+            self.assertEqual(f.name, found)
+        self.assertEqual(fetched['mime_type'], 'text/css')
+
+    def test_no_way_out_of_the_static_directories(self):
+        for path in ('/static/../manage.py', '/static/%2e%2e/manage.py', '/static/css/../../ifex/settings.py'):
+            with self.subTest(path=path):
+                self.assertIsNone(html_pdf.static_path(path))
+                with self.assertRaises(ValueError):
+                    html_pdf.fetch_static('file://' + path)
+        self.assertIsNone(html_pdf.static_path('/media/logo.png'))
+
+    def test_nothing_is_fetched_over_the_network(self):
+        for url in ('http://example.com/logo.png', 'https://testserver/static/css/quotation_pdf.css'):
+            with self.subTest(url=url), self.assertRaises(ValueError):
+                html_pdf.fetch_static(url)
+
+
+class HTMLQuotationTests(PDFViewTestCase):
+    @unittest.skipUnless(html_pdf.available(), "needs WeasyPrint")
+    def test_renders(self):
+        response = self.client.get(reverse('quotation_pdf_html', args=[self.quotation.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(content(response).startswith(b'%PDF'))
+
+    @unittest.skipIf(html_pdf.available(), "WeasyPrint is installed")
+    def test_without_weasyprint(self):
+        response = self.client.get(reverse('quotation_pdf_html', args=[self.quotation.pk]))
+        self.assertEqual(response.status_code, 501)
+
+
+############ BULK EXPORT ############
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """Notes how many invoices had been read, and renders were in flight, at each submit."""
+
+    def __init__(self, read):
+        super().__init__(max_workers=1)
+        self.read = read
+        self.submits = []
+        self.futures = []
+
+    def submit(self, fn, *args, **kwargs):
+        in_flight = sum(not future.done() for future in self.futures)
+        self.submits.append((len(self.read), in_flight))
+        future = super().submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+
+class BulkExportTests(PDFViewTestCase):
+    def setUp(self):
+        super().setUp()
+        for n in range(5):
+            invoice = Invoice.objects.create(
+                customer=self.customer, invoice_date=datetime.date(2025, 6, 14 + n),
+                total_amount=50.0, grand_total=52.5,
+            )
+            InvoiceItem.objects.create(invoice=invoice, item_name=f"Item {n}", quantity=1, price=50)
+
+    def test_submits_as_it_reads_within_the_window(self):
+        invoices = Invoice.objects.prefetch_related('items').order_by('pk')
+        read = []
+
+        def reading():
+            for invoice in invoices:
+                read.append(invoice.pk)
+                yield invoice
+
+        with RecordingExecutor(read) as executor:
+            names = [name for name, pdf in bulk_export.render_invoices(reading(), executor, window=2)]
+        self.assertEqual(len(names), 6)
+        # The first render starts before the rest of the range is read
+        self.assertEqual(executor.submits[0][0], 1)
+        self.assertLessEqual(max(in_flight for _, in_flight in executor.submits), 1)
+
+    def test_zip_of_the_period(self):
+        # The render pool runs in other processes; serve everything from the cache
+        for invoice in Invoice.objects.all():
+            with self.subTest(invoice=invoice.pk):
+                content(self.client.get(reverse('invoice_pdf', args=[invoice.pk])))
+        response = self.client.get(reverse('export_invoices_zip'), {'from': '2025-06-01', 'to': '2025-06-30'})
+        archive = zipfile.ZipFile(io.BytesIO(content(response)))
+        self.assertEqual(len(archive.namelist()), 6)
+        self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in archive.namelist()))
+
+
+############ ASGI ############
+
+class ASGIStreamingTests(TransactionTestCase):
+    """Through Django's ASGI handler, whose threads can't see a test transaction."""
+
+    def setUp(self):
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(PDF_CACHE_DIR=root, PDF_RENDER_INLINE=True, PDF_PRERENDER=False))
+        customer = Customer.objects.create(name="Gulf Steel Trading", city="Dubai")
+        self.quotation = make_quotation(customer, invoiced=True)
+        QuotationItem.objects.create(quotation=self.quotation, item_name="Flyers", quantity=100, price=0.5)
+        self.invoice = self.quotation.invoices.get()
+        self.invoice.invoice_date = datetime.date(2025, 6, 13)
+        self.invoice.save()
+        InvoiceItem.objects.create(invoice=self.invoice, item_name="Flyers", quantity=100, price=0.5)
+
+    async def get(self, path, query=b''):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'query_string': query,
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+        }
+        requests = [{'type': 'http.request', 'body': b''}]
+        sent = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Future()  # until the handler stops listening for a disconnect
+
+        async def send(message):
+            sent.append(message)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            await ASGIHandler()(scope, receive, send)
+        # The handler warns whenever it has to buffer a synchronous iterator
+        self.assertEqual([str(w.message) for w in caught if 'iterators' in str(w.message)], [])
+        self.assertEqual(sent[0]['status'], 200)
+        return b''.join(message.get('body', b'') for message in sent[1:])
+
+    async def test_pdfs_stream_from_an_async_iterator(self):
+        for url in (
+            reverse('quotation_pdf', args=[self.quotation.pk]),
+            reverse('invoice_pdf', args=[self.invoice.pk]),
+        ):
+            with self.subTest(url=url):
+                # Rendered into the cache, then served from it
+                self.assertTrue((await self.get(url)).startswith(b'%PDF'))
+                self.assertTrue((await self.get(url)).startswith(b'%PDF'))
+
+    async def test_export_streams_from_an_async_iterator(self):
+        # The render pool runs in other processes; serve the invoice from the cache
+        await self.get(reverse('invoice_pdf', args=[self.invoice.pk]))
+        body = await self.get(reverse('export_invoices_zip'), b'from=2025-06-01&to=2025-06-30')
+        archive = zipfile.ZipFile(io.BytesIO(body))
+        self.assertEqual(len(archive.namelist()), 1)
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+
+
+############ THUMBNAILS ############
+
+@unittest.skipUnless(thumbnails.enabled(), "needs pypdfium2")
+class ThumbnailTests(PDFViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(PDF_PRERENDER=True))
+        self.url = reverse('thumbnail', args=['quotation', self.quotation.pk])
+
+    def test_placeholder_queues_a_render_then_serves_the_preview(self):
+        with self.captureOnCommitCallbacks() as queued:
+            response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertEqual(len(queued), 1)
+
+        render_queue.render_job('quotation', self.quotation.pk)
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(content(response).startswith(b'\x89PNG'))
+        self.assertIn('immutable', response['Cache-Control'])
+
+        # The preview of an older version of the record isn't served
+        item = QuotationItem.objects.create(quotation=self.quotation, item_name="Banner", quantity=1, price=10)
+        render_queue.render_job('quotation', self.quotation.pk)
+        item.price = 12
+        item.save()
+        self.assertEqual(self.client.get(self.url)['Content-Type'], 'image/svg+xml')
+
+    def test_served_by_the_list_url_version_without_loading_items(self):
+        render_queue.render_job('quotation', self.quotation.pk)
+        listed = content(self.client.get(reverse('quotation_list'))).decode()
+        version = listed.split(f'{self.url}?v=', 1)[1].split('"', 1)[0]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'v': version})
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], f'"{version}"')
+
+    def test_missing_record_is_not_queued(self):
+        for kind in ('quotation', 'invoice'):
+            with self.subTest(kind=kind), self.captureOnCommitCallbacks() as queued:
+                response = self.client.get(reverse('thumbnail', args=[kind, 999]))
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(queued, [])
+
+    def test_list_urls_carry_the_document_version(self):
+        response = self.client.get(reverse('quotation_list'))
+        self.assertContains(response, f'-{document_version()}"')
+
+
+############ CONDITIONAL GET ############
+
+class ConditionalGetTests(PDFViewTestCase):
+    def test_etag_and_last_modified_revalidate_to_304(self):
+        urls = self.urls() + [
+            reverse('quotation_detail', args=[self.quotation.pk]),
+            reverse('invoice_detail', args=[self.invoice.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                content(first)
+                self.assertEqual(first.status_code, 200)
+                self.assertIn('no-cache', first['Cache-Control'])
+                etag, modified = first['ETag'], first['Last-Modified']
+
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+                stale = self.client.get(url, HTTP_IF_NONE_MATCH='"something-else"')
+                content(stale)
+                self.assertEqual(stale.status_code, 200)
+
+    def test_each_representation_has_its_own_etag(self):
+        etags = set()
+        for url in self.urls()[1:]:  # the invoice's three PDFs
+            response = self.client.get(url)
+            content(response)
+            etags.add(response['ETag'])
+        self.assertEqual(len(etags), 3)
+
+    def test_item_saves_bump_the_modification_time(self):
+        for parent, item in (
+            (self.quotation, self.quotation.items.get()),
+            (self.invoice, self.invoice.items.get()),
+        ):
+            with self.subTest(parent=parent):
+                parent.refresh_from_db()
+                before = parent.updated_at
+                item.quantity += 1
+                item.save()
+                parent.refresh_from_db()
+                self.assertGreater(parent.updated_at, before)
+
+                before = parent.updated_at
+                item.delete()
+                parent.refresh_from_db()
+                self.assertGreater(parent.updated_at, before)
+
+    def test_invoice_changes_revalidate_the_quotation_page(self):
+        quotation = make_quotation(self.customer)
+        other = make_quotation(self.customer)
+        url = reverse('quotation_detail', args=[quotation.pk])
+
+        def revalidate():
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            return lambda: self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        again = revalidate()
+        invoice = Invoice.objects.create(quotation=quotation, customer=self.customer, total_amount=1.0, grand_total=1.05)
+        response = again()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('edit_invoice', args=[invoice.pk]))
+
+        again = revalidate()
+        invoice.quotation = other
+        invoice.save()
+        self.assertEqual(again().status_code, 200)
+
+        invoice.quotation = quotation
+        invoice.save()
+        again = revalidate()
+        invoice.delete()
+        self.assertEqual(again().status_code, 200)
+
+    def test_item_edit_changes_the_etag(self):
+        url = reverse('quotation_pdf', args=[self.quotation.pk])
+        first = self.client.get(url)
+        content(first)
+        item = self.quotation.items.get()
+        item.price = 0.45
+        item.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response['X-PDF-Cache'], 'miss')
+        content(response)
@@ -0,0 +1,130 @@
+"""First-page PNG previews of cached quotation and invoice PDFs.
+
+The list pages link to ``thumbnail`` with a version in the query string:
+the record's modification time (see conditional) and
+``pdf_cache.document_version()``, so the URL changes with the record and
+with the layout. Previews are stored under that version, in the record's
+PDF cache directory (``<kind>/<pk>/preview-<version>.png``), so they go
+away with its PDFs when the record changes and count towards
+PDF_CACHE_MAX_BYTES like them.
+
+The render queue worker (render_queue.render_job) reads the version before
+it renders a PDF and rasterizes page one to the preview of that version.
+The view reads the record's current version in the one query the
+conditional GET views use, without loading the items, and only ever
+serves the preview of that version, with long-lived cache headers. When
+there is none yet it queues a render job and returns a placeholder that
+isn't cached; a record that doesn't exist is a 404.
+
+Rasterizing needs pypdfium2 (in requirements.txt). Without it, or with
+PDF_THUMBNAIL_WIDTH set to None, no previews are made and the list pages
+don't show them.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, FileResponse
+from django.utils import dateformat
+
+from . import render_queue
+from .conditional import invoice_modified, quotation_modified
+from .pdf_cache import cache as pdf_cache, document_version
+
+
+MODIFIED = {'quotation': quotation_modified, 'invoice': invoice_modified}
+
+# A year: the URL changes whenever the document does
+MAX_AGE = 365 * 24 * 60 * 60
+
+PLACEHOLDER_SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="84" height="119" viewBox="0 0 84 119">
+<rect x="0.5" y="0.5" width="83" height="118" fill="#f9fafb" stroke="#d1d5db"/>
+<g fill="#e5e7eb"><rect x="10" y="12" width="40" height="8"/><rect x="10" y="34" width="64" height="4"/>
+<rect x="10" y="44" width="64" height="4"/><rect x="10" y="54" width="64" height="4"/>
+<rect x="10" y="64" width="48" height="4"/></g></svg>"""
+
+
+def thumbnail_width():
+    return getattr(settings, 'PDF_THUMBNAIL_WIDTH', 240)
+
+
+def enabled():
+    if not thumbnail_width():
+        return False
+    try:
+        import pypdfium2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def preview_version(modified):
+    """The version in the list pages' preview URLs (``?v=``) for a modification time."""
+    return f"{dateformat.format(modified, 'U.u')}-{document_version()}"
+
+
+def thumbnail_path(kind, pk, version):
+    return os.path.join(pdf_cache.root, kind, str(pk), f'preview-{version}.png')
+
+
+def rasterize(pdf_path, target, width):
+    """Write page one of ``pdf_path`` as a PNG ``width`` pixels wide."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page = pdf[0]
+        bitmap = page.render(scale=width / page.get_width())
+        image = bitmap.to_pil()
+        image.save(target, 'PNG', optimize=True)
+    finally:
+        pdf.close()
+
+
+def ensure_thumbnail(pdf_path, kind, pk, modified):
+    """Make the preview of a cached PDF unless it exists; returns its path or None.
+
+    ``modified`` is the record's modification time read before the PDF was
+    rendered, so the preview is never older than its version.
+    """
+    if not enabled():
+        return None
+    path = thumbnail_path(kind, pk, preview_version(modified))
+    if os.path.exists(path):
+        return path
+    # Renamed into place so the view never serves a partial PNG
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            rasterize(pdf_path, f, thumbnail_width())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    pdf_cache.add(path)
+    return path
+
+
+############ VIEW ############
+
+def thumbnail(request, kind, object_id):
+    if kind not in MODIFIED or not enabled():
+        raise Http404("No preview")
+
+    modified = MODIFIED[kind](request, object_id)
+    if modified is None:
+        raise Http404("No such document")
+    version = preview_version(modified)
+
+    try:
+        png = open(thumbnail_path(kind, object_id, version), 'rb')
+    except FileNotFoundError:  # not rendered yet, or evicted
+        render_queue.enqueue(kind, object_id)
+        response = HttpResponse(PLACEHOLDER_SVG, content_type='image/svg+xml')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    response = FileResponse(png, content_type='image/png')
+    response['Cache-Control'] = f'private, max-age={MAX_AGE}, immutable'
+    response['ETag'] = '"%s"' % version
+    return response
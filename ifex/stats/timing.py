@@ -0,0 +1,160 @@
+"""Per-request stage timing, reported as a Server-Timing header and a log line.
+
+With SERVER_TIMING on, ServerTimingMiddleware times every request, every
+database query it runs on any thread (stage ``db``) and every
+``with stage(name):`` block the code passes through: ``num2words``,
+``images``, ``layout`` (measuring and paginating rows), ``table`` (building
+and drawing item tables), ``save`` (serializing the PDF) and, for parallel
+renders, ``workers`` and ``merge``.
+Time spent in a stage that is already open is not counted twice.
+
+The response gets a header such as::
+
+    Server-Timing: db;dur=2.1;desc="3 queries", layout;dur=4.0, save;dur=1.2, total;dur=15.3
+
+and the ``stats.timing`` logger one JSON line per request. With
+SERVER_TIMING off the middleware removes itself at startup and ``stage()``
+returns a shared no-op context manager after one context variable lookup.
+
+The timer lives in a context variable, which asgiref copies into
+sync_to_async threads, so views and renders running on executor threads
+(see pdf_executor) report into their request.
+"""
+import json
+import logging
+from contextlib import nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+_timer = ContextVar('stage_timer', default=None)
+_off = nullcontext()
+
+
+class StageTimer:
+    def __init__(self):
+        self.started = perf_counter()
+        self.durations = {}
+        self.counts = {}
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def total(self):
+        return perf_counter() - self.started
+
+    def header(self, total):
+        parts = []
+        for name, seconds in self.durations.items():
+            part = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                part += f';desc="{self.counts[name]} queries"'
+            parts.append(part)
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+class Stage:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.active.add(self.name)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, perf_counter() - self.start)
+        self.timer.active.discard(self.name)
+        return False
+
+
+def stage(name):
+    """Context manager timing the enclosed block as ``name`` in the current request."""
+    timer = _timer.get()
+    if timer is None or name in timer.active:
+        return _off
+    return Stage(timer, name)
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper: time every query as ``db`` while a request is timed."""
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.add('db', perf_counter() - start)
+
+
+def install_query_timer(sender=None, connection=None, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class ServerTimingMiddleware:
+    """Time each request; goes first in MIDDLEWARE so ``total`` covers the rest."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        # Every connection, on whichever thread opens it
+        connection_created.connect(install_query_timer, dispatch_uid='stats.timing')
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection=connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = StageTimer()
+        token = _timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        return self.report(request, response, timer)
+
+    async def __acall__(self, request):
+        timer = StageTimer()
+        token = _timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        return self.report(request, response, timer)
+
+    def report(self, request, response, timer):
+        total = timer.total()
+        response['Server-Timing'] = timer.header(total)
+        match = request.resolver_match
+        logger.info('request timing %s', json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'stages_ms': {name: round(s * 1000, 1) for name, s in timer.durations.items()},
+            'queries': timer.counts.get('db', 0),
+        }))
+        return response
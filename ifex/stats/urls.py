@@ -5,6 +5,8 @@ from django.urls import path
 from .views import *
 from stats import utils
 from stats import invoice_pdf
+from stats import bulk_export
+from stats import search, thumbnails
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -24,11 +26,16 @@ urlpatterns = [
     path('invoices/<int:quotation_id>/create/', create_invoice, name='create_invoice'),  # with quotation_id
     path('invoices/create/dropdown', create_invoice_from_dropdown, name='create_invoice_dropdown'),
     path('invoices/<int:invoice_id>/edit/', edit_invoice, name='edit_invoice'),
+    path('invoices/export/', bulk_export.export_invoices_zip, name='export_invoices_zip'),
 
 
     path('quotation/<int:quotation_id>/pdf/', utils.quotation_pdf2, name='quotation_pdf'),
+    path('quotation/<int:quotation_id>/pdf/html/', views.quotation_pdf_html, name='quotation_pdf_html'),
     path('invoice/<int:invoice_id>/pdf/', invoice_pdf.generate_invoice_pdf, name='invoice_pdf'),
-    path('do/<int:invoice_id>/pdf/', utils.disabled_view, name='do_pdf'),
+    path('do/<int:invoice_id>/pdf/', invoice_pdf.delivery_order_pdf, name='do_pdf'),
+    path('dispatch/<int:invoice_id>/pdf/', invoice_pdf.dispatch_pdf, name='dispatch_pdf'),
+    path('thumbnails/<str:kind>/<int:object_id>.png', thumbnails.thumbnail, name='thumbnail'),
+    path('search/', search.search, name='search'),
 
 
 ]
@@ -1,8 +1,21 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from .models import *
 from django.utils import timezone
 from django.contrib import messages
-from django.db.models import Sum
+from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+from . import html_pdf, render_queue, rollups, search, thumbnails
+from .line_items import posted_ids, save_items
+from .pagination import NumberedPage, keyset_page, page_number, page_size
+from .pdf_cache import document_version
+from .pdf_executor import bounded_render
+from .periods import requested_period
+from .responses import spooled_pdf_response
+from .conditional import (
+    QUOTATION_MODIFIED, INVOICE_MODIFIED,
+    conditional, pdf_tag, quotation_modified, invoice_modified,
+)
 def create_quotation(request):
     if request.method == 'POST':
         customer_id = request.POST.get('customer')
@@ -43,23 +56,18 @@ def create_quotation(request):
         tax_amount = total_price * tax / 100
         grand_total = total_price + tax_amount
 
-        quotation = Quotation.objects.create(
-            customer=customer,
-            expected_delivery_date=expected_delivery_date,
-            payment_term=payment_term,
-            tax=tax,
-            total_price=total_price,
-            grand_total=grand_total
-        )
-
-        for item in item_data:
-            QuotationItem.objects.create(
-                quotation=quotation,
-                item_name=item['item_name'],
-                quantity=item['quantity'],
-                price=item['price']
+        with transaction.atomic():
+            quotation = Quotation.objects.create(
+                customer=customer,
+                expected_delivery_date=expected_delivery_date,
+                payment_term=payment_term,
+                tax=tax,
+                total_price=total_price,
+                grand_total=grand_total
             )
+            save_items(quotation, item_data, existing=[])
 
+        render_queue.enqueue('quotation', quotation.id)
         return redirect('quotation_list')
     
     else:
@@ -78,14 +86,67 @@ def create_quotation(request):
         })
 
 
+# Invoice status of each quotation, computed in the list query rather than
+# with q.invoices.exists / q.invoices.first per row
+HAS_INVOICE = Exists(Invoice.objects.filter(quotation=OuterRef('pk')))
+FIRST_INVOICE_ID = Subquery(
+    Invoice.objects.filter(quotation=OuterRef('pk')).order_by('pk').values('pk')[:1]
+)
 
-def quotation_list(request):
-    quotations = Quotation.objects.select_related('customer').order_by('-created_at')
-    return render(request, 'stats/quotation_list.html', {'quotations': quotations})
+# List orderings, paged by keyset (see pagination); each ends in the id
+QUOTATION_ORDER = ('-created_at', '-id')
+INVOICE_ORDER = ('-invoice_date', '-id')
+CUSTOMER_ORDER = ('id',)
 
-from django.shortcuts import get_object_or_404
+def search_page(request, query, kind, rows, matching):
+    """The requested page of ``rows`` matching ``query``, in rank order.
 
+    ``matching`` is the plain queryset ``rows`` annotates, which the search
+    index filters by.
+    """
+    number, size = page_number(request), page_size(request)
+    keys, has_next = search.find(query, kind, number, size, within=matching)
+    rank = {pk: i for i, (kind_, pk) in enumerate(keys)}
+    found = sorted(rows.filter(pk__in=rank), key=lambda row: rank[row.pk])
+    return NumberedPage(found, request.GET, number, has_next)
 
+def quotation_list(request):
+    query = request.GET.get('search', '').strip()
+    status = request.GET.get('status', '')
+
+    matching = Quotation.objects.all()
+    if status == 'invoiced':
+        matching = matching.filter(HAS_INVOICE)
+    elif status == 'pending':
+        matching = matching.filter(~HAS_INVOICE)
+    quotations = matching.select_related('customer').annotate(
+        modified=QUOTATION_MODIFIED,  # versions the preview URL
+        has_invoice=HAS_INVOICE,
+        first_invoice_id=FIRST_INVOICE_ID,
+    )
+
+    if query:
+        # Ranked by the search index rather than by date; the status filter
+        # is applied by the index query, before it ranks and pages
+        page = search_page(request, query, 'quotation', quotations, matching)
+        quotations = page.rows
+        total = search.count(query, 'quotation', within=matching) if page.has_other_pages else len(quotations)
+    else:
+        page = keyset_page(request, quotations, QUOTATION_ORDER)
+        quotations, total = page.rows, matching.count()
+
+    return render(request, 'stats/quotation_list.html', {
+        'quotations': quotations,
+        'page': page,
+        'total': total,
+        'search': query,
+        'status': status,
+        'thumbnails': thumbnails.enabled(),
+        'document_version': document_version(),
+    })
+
+
+@conditional(quotation_modified, 'quotation_detail')
 def quotation_detail(request, quotation_id):
     quotation = get_object_or_404(Quotation, id=quotation_id)
     items = quotation.items.all()
@@ -125,9 +186,10 @@ def edit_quotation(request, quotation_id):
                 raise ValueError("Mismatched item data count")
 
             total_price = 0
-            quotation.items.all().delete()  # Clear existing items
+            item_data = []
+            item_ids = posted_ids(request.POST, len(item_names)) or [None] * len(item_names)
 
-            for name, qty_str, price_str in zip(item_names, quantities, prices):
+            for name, qty_str, price_str, item_id in zip(item_names, quantities, prices, item_ids):
                 try:
                     qty = int(qty_str)
                     price = float(price_str)
@@ -137,12 +199,12 @@ def edit_quotation(request, quotation_id):
                     item_total = qty * price
                     total_price += item_total
 
-                    QuotationItem.objects.create(
-                        quotation=quotation,
-                        item_name=name.strip(),
-                        quantity=qty,
-                        price=price,
-                    )
+                    item_data.append({
+                        'id': item_id,
+                        'item_name': name.strip(),
+                        'quantity': qty,
+                        'price': price,
+                    })
                 except (ValueError, TypeError) as e:
                     raise ValueError(f"Invalid item data: {str(e)}")
 
@@ -151,7 +213,11 @@ def edit_quotation(request, quotation_id):
             quotation.total_price = total_price
             quotation.grand_total = total_price + tax_amount
             
-            quotation.save()
+            # The quotation and its changed lines, all or nothing
+            with transaction.atomic():
+                quotation.save()
+                save_items(quotation, item_data)
+            render_queue.enqueue('quotation', quotation.id)
             messages.success(request, "Quotation updated successfully")
             return redirect('quotation_detail', quotation_id=quotation.id)
 
@@ -173,13 +239,15 @@ def edit_quotation(request, quotation_id):
     })
 
 ############ CUSTOMER VIEWS ############
-from django.shortcuts import render, redirect, get_object_or_404
-from .models import Customer
 
 # List all customers
 def customer_list(request):
-    customers = Customer.objects.all()
-    return render(request, 'customer/customer_list.html', {'customers': customers})
+    page = keyset_page(request, Customer.objects.all(), CUSTOMER_ORDER)
+    return render(request, 'customer/customer_list.html', {
+        'customers': page.rows,
+        'page': page,
+        'total': Customer.objects.count(),
+    })
 
 
 # Create a new customer
@@ -277,26 +345,23 @@ def create_invoice(request, quotation_id=None):
                 new_number = last_invoice.id + 1
         invoice_number = f"INV-{timezone.now().year}-{new_number:05d}"
 
-        # Create invoice
-        invoice = Invoice.objects.create(
-            invoice_number=invoice_number,
-            quotation=quotation,
-            customer=customer,
-            invoice_date=invoice_date,
-            total_amount=total_amount,
-            tax=tax,
-            grand_total=grand_total
-        )
-
-        # Create invoice items
-        for item in items:
-            InvoiceItem.objects.create(
-                invoice=invoice,
-                item_name=item['name'],
-                quantity=item['qty'],
-                price=item['price']
+        # Create invoice and its items
+        with transaction.atomic():
+            invoice = Invoice.objects.create(
+                invoice_number=invoice_number,
+                quotation=quotation,
+                customer=customer,
+                invoice_date=invoice_date,
+                total_amount=total_amount,
+                tax=tax,
+                grand_total=grand_total
             )
+            save_items(invoice, [
+                {'item_name': item['name'], 'quantity': item['qty'], 'price': item['price']}
+                for item in items
+            ], existing=[])
 
+        render_queue.enqueue('invoice', invoice.id)
         return redirect('invoice_detail', invoice_id=invoice.id)
 
     # GET request: Render the form
@@ -320,12 +385,47 @@ def create_invoice(request, quotation_id=None):
     return render(request, 'invoice/create_invoice.html', context)
 
 def invoice_list(request):
-    invoices = Invoice.objects.select_related('quotation').all()
-    now = timezone.now()
-    invoices = invoices.filter(invoice_date__year=now.year, invoice_date__month=now.month)
-    total_revenue = invoices.aggregate(total=Sum('grand_total'))['total'] or 0
-    return render(request, 'invoice/invoice_list.html', {'invoices': invoices, 'total_revenue': total_revenue})
+    date_from, date_to = requested_period(request)
+    # Range predicates the invoice_date index serves (not __year/__month)
+    in_period = Invoice.objects.filter(invoice_date__gte=date_from, invoice_date__lte=date_to)
+    invoices = in_period.select_related('customer', 'quotation').annotate(
+        modified=INVOICE_MODIFIED,  # versions the preview URL
+    )
+    query = request.GET.get('search', '').strip()
+    if query:
+        # Matches within the period, ranked by the search index; the cards
+        # add up the matches, not the whole period
+        page = search_page(request, query, 'invoice', invoices, in_period)
+        totals = search.matching(query, 'invoice', in_period).aggregate(
+            invoice_count=Count('pk'), grand_total=Sum('grand_total'),
+        )
+        total, revenue = totals['invoice_count'], totals['grand_total']
+    else:
+        # Uncorrelated subqueries over the revenue rollups, read once for the
+        # whole period in the same round trip as the page
+        invoices = invoices.annotate(
+            **rollups.period_annotations(date_from, date_to, ('invoice_count', 'grand_total')),
+        )
+        page = keyset_page(request, invoices, INVOICE_ORDER)
+        if page.rows:
+            total, revenue = page.rows[0].period_invoice_count, page.rows[0].period_grand_total
+        else:
+            totals = rollups.period_totals(date_from, date_to)
+            total, revenue = totals['invoice_count'], totals['grand_total']
+
+    return render(request, 'invoice/invoice_list.html', {
+        'invoices': page.rows,
+        'page': page,
+        'total': total,
+        'total_revenue': revenue or 0,
+        'search': query,
+        'date_from': date_from,
+        'date_to': date_to,
+        'thumbnails': thumbnails.enabled(),
+        'document_version': document_version(),
+    })
 
+@conditional(invoice_modified, 'invoice_detail')
 def invoice_detail(request, invoice_id):
     invoice = get_object_or_404(Invoice, id=invoice_id)
     items = invoice.items.all()
@@ -338,7 +438,6 @@ def invoice_detail(request, invoice_id):
     })
 
 def create_invoice_from_dropdown(request):
-    quotations = Quotation.objects.all()
 
     if request.method == 'POST':
         quotation_id = request.POST.get('quotation_id')
@@ -353,8 +452,10 @@ def create_invoice_from_dropdown(request):
             else:
                 return redirect('create_invoice', quotation_id=quotation.id)
 
+    page = keyset_page(request, Quotation.objects.select_related('customer'), QUOTATION_ORDER)
     return render(request, 'invoice/create_invoice_select.html', {
-        'quotations': quotations
+        'quotations': page.rows,
+        'page': page,
     })
 
 
@@ -389,13 +490,15 @@ def edit_invoice(request, invoice_id):
         # Calculate totals
         total_amount = 0
         items_data = []
-        for name, qty, price in zip(item_names, quantities, prices):
+        item_ids = posted_ids(request.POST, len(item_names)) or [None] * len(item_names)
+        for name, qty, price, item_id in zip(item_names, quantities, prices, item_ids):
             if name and qty and price:
                 try:
                     qty = int(qty)
                     price = float(price)
                     total_amount += qty * price
                     items_data.append({
+                        'id': item_id,
                         'name': name,
                         'qty': qty,
                         'price': price,
@@ -416,18 +519,16 @@ def edit_invoice(request, invoice_id):
         invoice.total_amount = total_amount
         invoice.tax = tax
         invoice.grand_total = grand_total
-        invoice.save()
-
-        # Delete existing items and create new ones
-        invoice.items.all().delete()
-        for item in items_data:
-            InvoiceItem.objects.create(
-                invoice=invoice,
-                item_name=item['name'],
-                quantity=item['qty'],
-                price=item['price']
-            )
 
+        # Save it and write only the changed items, all or nothing
+        with transaction.atomic():
+            invoice.save()
+            save_items(invoice, [
+                {'id': item['id'], 'item_name': item['name'], 'quantity': item['qty'], 'price': item['price']}
+                for item in items_data
+            ])
+
+        render_queue.enqueue('invoice', invoice.id)
         messages.success(request, "Invoice updated successfully")
         return redirect('invoice_detail', invoice_id=invoice.id)
 
@@ -445,74 +546,37 @@ def edit_invoice(request, invoice_id):
 
 #######################   PDF EXPORT   #######################
 
-from django.template.loader import render_to_string
-from django.http import HttpResponse
-
-from django.shortcuts import get_object_or_404
-from num2words import num2words
-
+@conditional(quotation_modified, pdf_tag('quotation_html'))
+@bounded_render
 def quotation_pdf_html(request, quotation_id):
-    quotation = get_object_or_404(Quotation, id=quotation_id)
-    items = quotation.items.all()
-    customer = quotation.customer
-    amount_in_words = num2words(quotation.grand_total, lang='en').title() + " Dirhams Only"
-    
-
-    html_string = render_to_string('stats/quotation_pdf.html', {
-        'quotation': quotation,
-        'items': items,
-        'customer': customer
-    })
+    if not html_pdf.available():
+        return HttpResponse("The HTML PDF engine (WeasyPrint) is not installed.", status=501, content_type='text/plain')
 
-    html = HTML(string=html_string, base_url=request.build_absolute_uri())
-    pdf_file = html.write_pdf()
-
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'filename="Quotation_{quotation.quotation_number}.pdf"'
-    return response
-
-
-    
-def do_pdf(request, invoice_id):
-    invoice = Invoice.objects.get(id=invoice_id)
-    items = invoice.items.all()
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="DO_{invoice.invoice_number}.pdf"'
-
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-    y = height - 50
-
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, y, f"Delivery Order")
-    y -= 30
-
-    p.setFont("Helvetica", 12)
-    p.drawString(50, y, f"Invoice #: {invoice.invoice_number}")
-    y -= 20
-    p.drawString(50, y, f"Customer: {invoice.quotation.customer.name}")
-    y -= 20
-    p.drawString(50, y, f"Issued Date: {invoice.issued_date}")
-    y -= 30
-
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y, "Items (No Pricing):")
-    y -= 20
-
-    p.setFont("Helvetica", 11)
-    for item in items:
-        p.drawString(60, y, f"{item.item_name} — Qty: {item.quantity}")
-        y -= 18
-        if y < 100:  # page break if needed
-            p.showPage()
-            y = height - 50
-            p.setFont("Helvetica", 11)
+    quotation = get_object_or_404(Quotation.objects.select_related('customer'), id=quotation_id)
+    items = list(quotation.items.all())
 
-    p.showPage()
-    p.save()
-    return response
+    return spooled_pdf_response(
+        lambda f: html_pdf.render_quotation_html(f, quotation, items),
+        f"Quotation_{quotation.quotation_number}.pdf",
+        as_attachment=False,
+    )
 
 
 def home(request):
-    return render(request, 'stats/home.html')
\ No newline at end of file
+    # A dozen rollup rows, however many invoices there are
+    this_month = timezone.localdate().replace(day=1)
+    months = list(MonthlyRevenue.objects.filter(
+        month__gt=this_month.replace(year=this_month.year - 1),
+    ).order_by('month'))
+    this_year = [m for m in months if m.month.year == this_month.year]
+    top_customers = CustomerMonthlyRevenue.objects.filter(
+        month=this_month, customer__isnull=False, invoice_count__gt=0,
+    ).select_related('customer').order_by('-grand_total')[:5]
+
+    return render(request, 'stats/home.html', {
+        'month_revenue': next((m for m in months if m.month == this_month), None),
+        'year_count': sum(m.invoice_count for m in this_year),
+        'year_revenue': sum(m.grand_total for m in this_year),
+        'recent_months': months,
+        'top_customers': top_customers,
+    })
\ No newline at end of file